@@ -0,0 +1,77 @@
+import time
+from datetime import datetime, timezone
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = f"bench-user-{user_id}"
+
+class FakeMessage:
+    """Follow-up message that records when it is edited"""
+
+    def __init__(self, interaction, content):
+        self._interaction = interaction
+        self.content = content
+
+    async def edit(self, content=None, attachments=None, **kwargs):
+        for file in attachments or []:
+            file.close()
+
+        self._interaction.record("edit")
+        if content is not None:
+            self.content = content
+        return self
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    async def defer(self, ephemeral=False, thinking=False):
+        self._done = True
+        self._interaction.record("defer")
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        self._interaction.record("send")
+
+    async def edit_message(self, **kwargs):
+        self._interaction.record("edit")
+
+    def is_done(self):
+        return self._done
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, content=None, *, embed=None, embeds=None, files=None, view=None, ephemeral=False, wait=False, **kwargs):
+        # Release attachment handles the way discord.py does after uploading
+        for file in files or []:
+            file.close()
+
+        self._interaction.record("send")
+        return FakeMessage(self._interaction, content)
+
+class FakeInteraction:
+    """Stand-in for discord.Interaction that records reply timings"""
+
+    def __init__(self, user_id):
+        self.id = user_id
+        self.user = FakeUser(user_id)
+        self.created_at = datetime.now(timezone.utc)
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.started = time.perf_counter()
+        self.events = []
+
+    def record(self, kind):
+        self.events.append((kind, time.perf_counter() - self.started))
+
+    def first(self, kind):
+        """Seconds from the start of the command to the first event of a kind, or None"""
+        return next((elapsed for event, elapsed in self.events if event == kind), None)
+
+    def last(self):
+        """Seconds from the start of the command to its last reply event"""
+        return self.events[-1][1] if self.events else 0.0
@@ -0,0 +1,324 @@
+"""
+End-to-end latency benchmark for /findbook and /recommend
+
+Drives the real cogs with a fake discord.Interaction while OpenAI, Google Books,
+Open Library and the cover hosts are replaced by local stub servers.
+
+Usage:
+    python -m benchmarks.run_benchmarks --profile realistic --requests 50 --concurrency 1 5 20
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --baseline results.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from benchmarks.fake_discord import FakeInteraction
+from benchmarks.stubs import PROFILES, StubUpstreams
+
+FINDBOOK_QUERIES = [
+    "fantasy books with complex magic systems",
+    "mystery novels set in Victorian London",
+    "something similar to The Martian but fantasy",
+    "samurai books",
+    "books by Brandon Sanderson",
+    "cozy murder mysteries"
+]
+RECOMMEND_PREFERENCES = [
+    "I enjoyed The Name of the Wind and Dune",
+    "dark fantasy with strong character development",
+    "surprise me",
+    "hard science fiction with humour"
+]
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of seconds"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class StageRecorder:
+    """Collects latency samples per pipeline stage"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def record(self, stage, seconds):
+        self.samples[stage].append(seconds)
+
+    def reset(self):
+        self.samples.clear()
+
+    def summary(self):
+        return {
+            stage: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p95_ms": round(percentile(values, 95) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1)
+            }
+            for stage, values in sorted(self.samples.items())
+        }
+
+def instrument(cls, name, stage, recorder):
+    """
+    Wrap a static method of a service so every call is timed as a stage
+
+    Streaming methods are timed until exhausted and also record their first
+    chunk as "<stage>.first_chunk".
+    """
+    original = getattr(cls, name)
+
+    if inspect.isasyncgenfunction(original):
+        @functools.wraps(original)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            first = True
+            try:
+                async for chunk in original(*args, **kwargs):
+                    if first:
+                        recorder.record(f"{stage}.first_chunk", time.perf_counter() - started)
+                        first = False
+                    yield chunk
+            finally:
+                recorder.record(stage, time.perf_counter() - started)
+    elif asyncio.iscoroutinefunction(original):
+        @functools.wraps(original)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                recorder.record(stage, time.perf_counter() - started)
+    else:
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                recorder.record(stage, time.perf_counter() - started)
+
+    setattr(cls, name, staticmethod(timed))
+
+async def run_level(commands, concurrency, total_requests, distinct, recorder):
+    """
+    Run one concurrency level
+
+    Args:
+        commands (list): (command name, callback taking interaction and text, sample inputs) tuples
+        concurrency (int): Commands in flight at once
+        total_requests (int): Commands to run in total
+        distinct (bool): Make every query unique so no cache can answer it
+        recorder (StageRecorder): Stage sample collector
+
+    Returns:
+        tuple: Throughput in commands per second and wall-clock seconds
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index):
+        command_name, invoke, inputs = commands[index % len(commands)]
+        text = inputs[index % len(inputs)]
+        if distinct:
+            text = f"{text} #{index}"
+
+        async with semaphore:
+            interaction = FakeInteraction(1000 + index % 50)
+            await invoke(interaction, text)
+
+        first_reply = interaction.first("send")
+        if first_reply is not None:
+            # Streamed replies make this the time to first visible text
+            recorder.record(f"{command_name}.first_reply", first_reply)
+        recorder.record(f"{command_name}.total", interaction.last())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total_requests)))
+    elapsed = time.perf_counter() - started
+    return total_requests / elapsed, elapsed
+
+def print_report(profile, concurrency, throughput, elapsed, summary):
+    print(f"\n=== profile={profile} concurrency={concurrency} "
+          f"throughput={throughput:.2f} cmd/s wall={elapsed:.2f}s ===")
+    print(f"{'stage':<40}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in summary.items():
+        print(f"{stage:<40}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+def print_service_stats(stats):
+    """Print the headline counters the services collected over the whole run"""
+    print("\n=== service stats ===")
+    for name, flight in stats["coalescing"].items():
+        if "coalesced" in flight:
+            print(f"coalescing {name:<29}{flight['coalesced']:>6} of {flight['calls']} calls shared")
+    for name, cache in stats["caches"].items():
+        print(f"cache      {name:<29}{cache['hit_rate']:>6.0%} of {cache['hits'] + cache['misses']} lookups hit")
+    covers = stats["covers"]
+    print(f"cache      {'covers':<29}{covers['hits']:>6} hits, {covers['misses']} misses, {covers['files']} files on disk")
+    for provider, health in stats["upstream_health"].items():
+        limiter = health["rate_limiter"]
+        wins = stats["providers"].get(provider, {}).get("wins", 0)
+        print(f"provider   {provider:<29}{wins:>6} wins, {health['state']}, "
+              f"{limiter['rejected']} rate-limited, {limiter['spared']} optional calls skipped")
+    for host, pool in stats["http"].items():
+        print(f"pool       {host:<29}{pool['connections_reused']:>6} reused, {pool['connections_opened']} opened")
+    for call_type, usage in stats["token_usage"].items():
+        print(f"tokens     {call_type:<29}{usage['prompt_tokens']:>6} prompt, {usage['completion_tokens']} completion "
+              f"over {usage['calls']} calls")
+    scheduler = stats["scheduler"]
+    print(f"scheduler  {'completions':<29}{scheduler['admitted']:>6} admitted, {scheduler['queue_full']} queue full, "
+          f"{scheduler['rejected_early']} rejected early, {scheduler['expired']} expired")
+    recommendations = stats["recommendations"]
+    if recommendations["calls"]:
+        print(f"recommend  {'structured output':<29}{recommendations['valid']:>6} valid of {recommendations['calls']}, "
+              f"{recommendations['repaired_locally'] + recommendations['repaired_by_model']} repaired, "
+              f"{recommendations['fallbacks']} fell back to text")
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Compare p95 latencies with a saved run
+
+    Returns:
+        list: Human readable regressions, empty when none exceed the tolerance
+    """
+    regressions = []
+    for level, current in results["levels"].items():
+        previous = baseline.get("levels", {}).get(level)
+        if not previous:
+            continue
+        for stage, stats in current["stages"].items():
+            before = previous["stages"].get(stage, {}).get("p95_ms")
+            if before and stats["p95_ms"] > before * (1 + tolerance):
+                regressions.append(f"concurrency {level} {stage}: p95 {before}ms -> {stats['p95_ms']}ms")
+    return regressions
+
+async def main(args):
+    stubs = StubUpstreams(PROFILES[args.profile])
+    stubs.start()
+
+    data_dir = tempfile.mkdtemp(prefix="bookfinder-bench-")
+    os.environ.update(stubs.environment())
+    os.environ.update({
+        "CATALOG_DB_FILE": os.path.join(data_dir, "book_catalog.db"),
+        "COVER_CACHE_DIR": os.path.join(data_dir, "covers"),
+        "PARSE_CACHE_FILE": os.path.join(data_dir, "query_cache.db"),
+        "INTERACTION_LOG_FILE": os.path.join(data_dir, "user_interactions.log"),
+        "INTERACTION_INDEX_FILE": os.path.join(data_dir, "user_interactions.idx"),
+        "EMBEDDING_STORE_FILE": os.path.join(data_dir, "embeddings.npz")
+    })
+
+    # Import after the environment points the services at the stubs
+    from src.cogs.findbook import FindBookCog
+    from src.cogs.recommend import RecommendCog
+    from src.services.book_service import BookService
+    from src.services.catalog_service import CatalogService
+    from src.services.cover_service import CoverService
+    from src.services.openai_service import OpenAIService
+    from src.services.rag_service import RAGService
+    from src.utils.http_client import http_client
+
+    recorder = StageRecorder()
+    instrument(OpenAIService, "parse_book_query", "parse_book_query", recorder)
+    instrument(OpenAIService, "enhance_book_results", "enhance_book_results", recorder)
+    instrument(OpenAIService, "generate_response", "generate_response", recorder)
+    instrument(OpenAIService, "stream_response", "stream_response", recorder)
+    instrument(OpenAIService, "stream_enhance_book_results", "stream_enhance_book_results", recorder)
+    instrument(BookService, "search_books", "search_books", recorder)
+    instrument(RAGService, "log_interaction", "log_interaction", recorder)
+
+    findbook_cog = FindBookCog(None)
+    recommend_cog = RecommendCog(None)
+    available = {
+        "findbook": ("findbook", functools.partial(findbook_cog.findbook.callback, findbook_cog), FINDBOOK_QUERIES),
+        "recommend": ("recommend", functools.partial(recommend_cog.recommend.callback, recommend_cog), RECOMMEND_PREFERENCES)
+    }
+    commands = list(available.values()) if args.command == "mixed" else [available[args.command]]
+
+    results = {"profile": args.profile, "command": args.command, "levels": {}}
+    try:
+        OpenAIService.load_tokenizers()
+        await RAGService.start()
+        for concurrency in args.concurrency:
+            recorder.reset()
+            throughput, elapsed = await run_level(commands, concurrency, args.requests, args.distinct, recorder)
+            summary = recorder.summary()
+            print_report(args.profile, concurrency, throughput, elapsed, summary)
+            results["levels"][str(concurrency)] = {
+                "throughput": round(throughput, 3),
+                "wall_seconds": round(elapsed, 3),
+                "stages": summary
+            }
+        results["upstream_requests"] = dict(stubs.requests)
+        coalescing = OpenAIService.get_coalescing_stats()
+        results["service_stats"] = {
+            "coalescing": {"search_books": BookService.get_coalescing_stats(), **coalescing},
+            "caches": {
+                "search": BookService.get_cache_stats(),
+                "parse": coalescing["parse_cache"],
+                "enhance": coalescing["enhance_cache"]
+            },
+            "http": http_client.get_stats(),
+            "providers": BookService.get_provider_stats(),
+            "upstream_health": BookService.get_upstream_health(),
+            "covers": CoverService.get_stats(),
+            "token_usage": OpenAIService.get_token_usage(),
+            "scheduler": OpenAIService.get_scheduler_stats(),
+            "recommendations": OpenAIService.get_recommend_stats()
+        }
+        print_service_stats(results["service_stats"])
+    finally:
+        # Same shutdown order as src/bot.py
+        await CoverService.close()
+        await OpenAIService.close()
+        await http_client.close()
+        CatalogService.close()
+        await RAGService.close()
+        stubs.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding='utf-8') as f:
+            regressions = compare_with_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions beyond tolerance:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions beyond tolerance")
+    return 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark /findbook and /recommend against local stub upstreams")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast", help="Upstream latency/error profile")
+    parser.add_argument("--command", choices=["findbook", "recommend", "mixed"], default="mixed")
+    parser.add_argument("--requests", type=int, default=40, help="Commands per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--distinct", action="store_true", help="Make every query unique to defeat caching")
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare p95 latencies against a previous JSON result")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative p95 increase")
+    parser.add_argument("--verbose", action="store_true", help="Show bot logging")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    logging.basicConfig(
+        level=logging.INFO if arguments.verbose else logging.CRITICAL,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    sys.exit(asyncio.run(main(arguments)))
@@ -0,0 +1,305 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+
+from aiohttp import web
+
+@dataclass
+class UpstreamProfile:
+    """Latency and error behaviour of one stubbed upstream"""
+
+    latency: float = 0.1
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    token_interval: float = 0.0
+    # Extra latency for requests naming one of these models
+    model_latency: dict = field(default_factory=dict)
+
+    async def delay(self, model=None):
+        """Sleep for the configured latency plus uniform jitter"""
+        extra = self.model_latency.get(model, 0.0)
+        await asyncio.sleep(max(0.0, self.latency + extra + random.uniform(-self.jitter, self.jitter)))
+
+    def should_fail(self):
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+# Named profiles selectable from the command line
+PROFILES = {
+    "fast": {
+        "openai": UpstreamProfile(latency=0.05, token_interval=0.002),
+        "google_books": UpstreamProfile(latency=0.02),
+        "open_library": UpstreamProfile(latency=0.03),
+        "covers": UpstreamProfile(latency=0.01)
+    },
+    "realistic": {
+        "openai": UpstreamProfile(latency=0.4, jitter=0.2, token_interval=0.03),
+        "google_books": UpstreamProfile(latency=0.3, jitter=0.1),
+        "open_library": UpstreamProfile(latency=0.6, jitter=0.3),
+        "covers": UpstreamProfile(latency=0.15, jitter=0.1)
+    },
+    "degraded": {
+        "openai": UpstreamProfile(latency=1.0, jitter=0.5, error_rate=0.05, token_interval=0.05, model_latency={"gpt-4o": 8.0}),
+        "google_books": UpstreamProfile(latency=1.5, jitter=1.0, error_rate=0.3, error_status=429),
+        "open_library": UpstreamProfile(latency=1.0, jitter=0.5, error_rate=0.1),
+        "covers": UpstreamProfile(latency=0.5, jitter=0.3, error_rate=0.2)
+    }
+}
+
+SAMPLE_TITLES = [
+    "The Name of the Wind", "Mistborn", "Dune", "The Martian", "Project Hail Mary",
+    "The Thursday Murder Club", "Beach Read", "Atomic Habits", "Shogun", "Musashi"
+]
+SAMPLE_AUTHORS = [
+    "Patrick Rothfuss", "Brandon Sanderson", "Frank Herbert", "Andy Weir", "Andy Weir",
+    "Richard Osman", "Emily Henry", "James Clear", "James Clavell", "Eiji Yoshikawa"
+]
+
+class StubUpstreams:
+    """
+    Local HTTP server impersonating OpenAI, Google Books, Open Library and cover hosts
+
+    The server runs on its own thread and event loop, so a client that blocks the
+    bot's event loop slows the bot down instead of deadlocking the stubs.
+    """
+
+    def __init__(self, profiles, host="127.0.0.1", port=0):
+        """
+        Args:
+            profiles (dict): UpstreamProfile per upstream name
+            host (str): Interface to bind
+            port (int): Port to bind, 0 picks a free one
+        """
+        self.profiles = profiles
+        self.host = host
+        self.port = port
+        self.requests = {name: 0 for name in profiles}
+        self._runner = None
+        self._loop = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        """Start serving on a background thread and wait until the port is bound"""
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._start_site())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=serve, name="stub-upstreams", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        """Shut the server down and join its thread"""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _start_site(self):
+        app = web.Application()
+        app.router.add_post('/openai/v1/chat/completions', self._chat_completions)
+        app.router.add_get('/books/v1/volumes', self._google_search)
+        app.router.add_get('/books/v1/volumes/{volume_id}', self._google_volume)
+        app.router.add_get('/openlibrary/search.json', self._open_library_search)
+        app.router.add_get('/covers/{name}', self._cover)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def environment(self):
+        """Environment variables that point the bot at these stubs"""
+        return {
+            "OPENAI_API_KEY": "stub-key",
+            "OPENAI_BASE_URL": f"{self.base_url}/openai/v1",
+            "GOOGLE_BOOKS_API_KEY": "stub-key",
+            "GOOGLE_BOOKS_BASE_URL": f"{self.base_url}/books/v1",
+            "OPEN_LIBRARY_BASE_URL": f"{self.base_url}/openlibrary"
+        }
+
+    async def _simulate(self, upstream, model=None):
+        """Apply latency and maybe an error for one request, returning the error response if any"""
+        self.requests[upstream] += 1
+        profile = self.profiles[upstream]
+        await profile.delay(model)
+        if profile.should_fail():
+            return web.Response(
+                status=profile.error_status,
+                text=json.dumps({"error": {"message": "stubbed failure"}}),
+                content_type="application/json"
+            )
+        return None
+
+    async def _chat_completions(self, request):
+        body = await request.json()
+        failure = await self._simulate("openai", body.get("model"))
+        if failure is not None:
+            return failure
+
+        messages = body.get("messages", [])
+        system_prompt = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user_prompt = next((m["content"] for m in messages if m["role"] == "user"), "")
+        content = self._completion_for(system_prompt, user_prompt)
+        pieces = [piece + " " for piece in content.split(" ")]
+        pieces[-1] = pieces[-1][:-1]
+
+        if body.get("stream"):
+            return await self._stream_completion(request, body, pieces, self._usage(system_prompt, user_prompt, content))
+
+        # Non-streamed completions take as long as streaming every token
+        await asyncio.sleep(self.profiles["openai"].token_interval * len(pieces))
+        return web.json_response({
+            "id": f"chatcmpl-{random.getrandbits(48):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": self._usage(system_prompt, user_prompt, content)
+        })
+
+    @staticmethod
+    def _usage(system_prompt, user_prompt, content):
+        return {
+            "prompt_tokens": (len(system_prompt) + len(user_prompt)) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(system_prompt) + len(user_prompt) + len(content)) // 4
+        }
+
+    async def _stream_completion(self, request, body, pieces, usage):
+        """Send a completion as server-sent chat.completion.chunk events"""
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        completion_id = f"chatcmpl-{random.getrandbits(48):x}"
+
+        def event(delta=None, finish_reason=None, usage=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                "usage": usage
+            }
+            return f"data: {json.dumps(chunk)}\n\n".encode()
+
+        try:
+            await response.write(event({"role": "assistant", "content": ""}))
+            for piece in pieces:
+                await asyncio.sleep(self.profiles["openai"].token_interval)
+                await response.write(event({"content": piece}))
+            await response.write(event({}, "stop"))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                await response.write(event(usage=usage))
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            # The client gave up on the stream, e.g. after a latency SLO failover
+            pass
+        return response
+
+    @staticmethod
+    def _completion_for(system_prompt, user_prompt):
+        """Return a plausible completion for the bot's known prompts"""
+        if "extracts search parameters" in system_prompt:
+            # Only some queries carry extractable fields, as with the real model
+            if "fantasy" in user_prompt.lower():
+                return json.dumps({"genre": "fantasy", "general_query": user_prompt})
+            return json.dumps({"general_query": user_prompt})
+
+        picks = random.sample(range(len(SAMPLE_TITLES)), 3)
+        message = "Here are a few books you might enjoy: " + "; ".join(
+            f"\"{SAMPLE_TITLES[i]}\" by {SAMPLE_AUTHORS[i]}, a well-loved read" for i in picks
+        ) + ". Each of them matches what you described."
+
+        # Structured /recommend answers (and their repairs) carry the schema in the prompt
+        if '"books"' in system_prompt:
+            return json.dumps({
+                "message": message,
+                "books": [{"title": SAMPLE_TITLES[i], "author": SAMPLE_AUTHORS[i]} for i in picks]
+            })
+        return message
+
+    def _volume(self, volume_id, title, author):
+        return {
+            "id": volume_id,
+            "volumeInfo": {
+                "title": title,
+                "authors": [author],
+                "description": "A stubbed description. " * 20,
+                "publishedDate": "2001",
+                "categories": ["Fiction"],
+                "imageLinks": {"thumbnail": f"{self.base_url}/covers/{volume_id}.jpg"},
+                "previewLink": f"https://books.example/{volume_id}",
+                "pageCount": 320,
+                "publisher": "Stub Press",
+                "averageRating": 4.2,
+                "ratingsCount": 1000
+            }
+        }
+
+    async def _google_search(self, request):
+        failure = await self._simulate("google_books")
+        if failure is not None:
+            return failure
+
+        query = request.query.get("q", "")
+        start = int(request.query.get("startIndex", 0))
+        items = []
+        for i in range(int(request.query.get("maxResults", 10))):
+            index = (start + i) % len(SAMPLE_TITLES)
+            volume_id = f"vol{zlib.crc32(f'{query}:{start + i}'.encode())}"
+            items.append(self._volume(volume_id, SAMPLE_TITLES[index], SAMPLE_AUTHORS[index]))
+        return web.json_response({"kind": "books#volumes", "totalItems": 100, "items": items})
+
+    async def _google_volume(self, request):
+        failure = await self._simulate("google_books")
+        if failure is not None:
+            return failure
+        volume_id = request.match_info["volume_id"]
+        return web.json_response(self._volume(volume_id, SAMPLE_TITLES[0], SAMPLE_AUTHORS[0]))
+
+    async def _open_library_search(self, request):
+        failure = await self._simulate("open_library")
+        if failure is not None:
+            return failure
+
+        query = request.query.get("q", "")
+        docs = [
+            {
+                "key": f"/works/OL{zlib.crc32(f'{query}:{i}'.encode())}W",
+                "title": SAMPLE_TITLES[i],
+                "author_name": [SAMPLE_AUTHORS[i]],
+                "first_publish_year": 1990 + i,
+                "subject": ["Fiction"]
+            }
+            for i in range(5)
+        ]
+        return web.json_response({"numFound": len(docs), "docs": docs})
+
+    async def _cover(self, request):
+        failure = await self._simulate("covers")
+        if failure is not None:
+            return failure
+        return web.Response(body=b'\xff\xd8\xff\xe0' + os.urandom(4096), content_type="image/jpeg")
@@ -5,6 +5,11 @@ import os
 import logging
 import traceback
 from src import config
+from src.services.catalog_service import CatalogService
+from src.services.cover_service import CoverService
+from src.services.openai_service import OpenAIService
+from src.services.rag_service import RAGService
+from src.utils.http_client import http_client
 
 # Set up logging
 logging.basicConfig(
@@ -74,8 +79,20 @@ async def load_extensions():
 # Main function to run the bot
 async def main():
     async with bot:
-        await load_extensions()
-        await bot.start(config.DISCORD_TOKEN)
+        # Open the shared HTTP pools once for the lifetime of the bot
+        await http_client.start([config.GOOGLE_BOOKS_BASE_URL, config.OPEN_LIBRARY_BASE_URL])
+        OpenAIService.load_tokenizers()
+        try:
+            # Index the interaction log before taking commands
+            await RAGService.start()
+            await load_extensions()
+            await bot.start(config.DISCORD_TOKEN)
+        finally:
+            await CoverService.close()
+            await OpenAIService.close()
+            await http_client.close()
+            CatalogService.close()
+            await RAGService.close()
 
 # Entry point
 if __name__ == "__main__":
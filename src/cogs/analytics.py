@@ -3,8 +3,12 @@ from discord import app_commands
 from discord.ext import commands
 import logging
 from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from src.services.book_service import BookService
+from src.services.cover_service import CoverService
+from src.services.openai_service import OpenAIService
 from src.services.rag_service import RAGService
-import json
+from src.utils.http_client import http_client
 
 logger = logging.getLogger('bookfinder.commands.analytics')
 
@@ -24,7 +28,7 @@ class AnalyticsCog(commands.Cog):
         
         try:
             # Get user's search history
-            history = RAGService.get_user_history(interaction.user.id, limit=10)
+            history = await RAGService.get_user_history(interaction.user.id, limit=10)
             
             if not history:
                 embed = discord.Embed(
@@ -36,7 +40,7 @@ class AnalyticsCog(commands.Cog):
                 return
             
             # Get user preferences analysis
-            preferences = RAGService.get_user_preferences(interaction.user.id)
+            preferences = await RAGService.get_user_preferences(interaction.user.id)
             
             # Create main embed
             embed = discord.Embed(
@@ -106,7 +110,7 @@ class AnalyticsCog(commands.Cog):
         
         try:
             # Get system analytics
-            analytics = RAGService.get_analytics()
+            analytics = await RAGService.get_analytics()
             
             embed = discord.Embed(
                 title="🤖 BookFinder AI Analytics Dashboard",
@@ -153,6 +157,157 @@ class AnalyticsCog(commands.Cog):
                 "Sorry, I couldn't retrieve the analytics right now. Please try again later."
             )
     
+    @app_commands.command(
+        name="health",
+        description="View upstream health and internal queues (administrators only)"
+    )
+    @app_commands.default_permissions(administrator=True)
+    async def health(self, interaction: discord.Interaction):
+        """
+        Show operator telemetry: circuit breakers, model latency, log writer and query parsing
+        """
+        if not await self._is_operator(interaction):
+            await interaction.response.send_message("Only server administrators can view bot health.", ephemeral=True)
+            return
+        
+        await interaction.response.defer(ephemeral=True)
+        
+        try:
+            embed = discord.Embed(
+                title="🩺 BookFinder AI Health",
+                description="Upstream and internal service state",
+                color=discord.Color.dark_grey()
+            )
+            
+            # Upstream circuit breaker and rate limiter state, with each provider's search record
+            health_lines = []
+            provider_stats = BookService.get_provider_stats()
+            for provider, health in BookService.get_upstream_health().items():
+                name = provider.replace('_', ' ').title()
+                searches = provider_stats.get(provider, {})
+                limiter = health['rate_limiter']
+                detail = (
+                    f"p95 {searches.get('p95_ms', 0.0):.0f}ms, {searches.get('wins', 0)} wins, "
+                    f"{health['short_circuited']} short-circuited, "
+                    f"{limiter['rejected']} rate-limited, {limiter['spared']} optional calls skipped"
+                )
+                if health['state'] == 'open':
+                    health_lines.append(f"🔴 **{name}**: open (retry in {health['retry_in_seconds']:.0f}s), {detail}")
+                elif health['state'] == 'half-open':
+                    health_lines.append(f"🟡 **{name}**: half-open, {detail}")
+                else:
+                    health_lines.append(f"🟢 **{name}**: closed, {detail}")
+            
+            catalog = provider_stats.get('local_catalog', {})
+            health_lines.append(
+                f"🟢 **Local catalog**: p95 {catalog.get('p95_ms', 0.0):.0f}ms, {catalog.get('wins', 0)} wins"
+            )
+            
+            # Models the AI cascade has used, with their recent latency
+            for model, health in OpenAIService.get_model_stats().items():
+                icon = {'open': "🔴", 'half-open': "🟡"}.get(health['state'], "🟢")
+                health_lines.append(f"{icon} **{model}**: p95 {health['p95_ms']:.0f}ms, {health['errors']}/{health['calls']} errors")
+            
+            # Background interaction log writer
+            writer_stats = RAGService.get_log_writer_stats()
+            compaction_stats = await RAGService.get_compaction_stats()
+            icon = "🟢" if not (writer_stats['dropped'] or writer_stats['failed']) else "🟡"
+            health_lines.append(
+                f"{icon} **Interaction log**: {writer_stats['queued']} queued, "
+                f"{writer_stats['dropped'] + writer_stats['failed']} lost, "
+                f"{compaction_stats['pending_segments']}/{compaction_stats['segments']} segments to compact"
+            )
+            
+            embed.add_field(
+                name="🩺 Upstream Health",
+                value="\n".join(health_lines),
+                inline=False
+            )
+            
+            # Share of queries parsed without the LLM or searched while parsing
+            parse_stats = OpenAIService.get_parse_stats()
+            speculation_stats = BookService.get_speculation_stats()
+            embed.add_field(
+                name="🧠 Query Parsing",
+                value=f"**Fast path**: {parse_stats['hit_rate']:.0%} of {parse_stats['attempts']} queries\n"
+                      f"**LLM time saved**: ~{parse_stats['latency_saved_seconds']:.1f}s\n"
+                      f"**Speculative search**: {speculation_stats['hit_rate']:.0%} used, "
+                      f"~{speculation_stats['latency_saved_seconds']:.1f}s saved",
+                inline=False
+            )
+            
+            # Identical concurrent calls served by one upstream call
+            coalescing = OpenAIService.get_coalescing_stats()
+            flights = {"Book search": BookService.get_coalescing_stats(), **{
+                name: stats for name, stats in coalescing.items()
+                if name in ("parse_book_query", "enhance_book_results")
+            }}
+            embed.add_field(
+                name="🔁 Coalescing",
+                value="\n".join(
+                    f"**{name.replace('_', ' ').capitalize()}**: {stats['coalesced']} of {stats['calls']} calls shared"
+                    for name, stats in flights.items()
+                ),
+                inline=False
+            )
+            
+            # Cache hit rates and connection reuse per upstream pool
+            caches = {
+                "Search cache": BookService.get_cache_stats(),
+                "Parse cache": coalescing["parse_cache"],
+                "Enhance cache": coalescing["enhance_cache"]
+            }
+            covers = CoverService.get_stats()
+            pool_lines = [
+                f"**{urlsplit(host).netloc}**: {pool['connections_reused']} reused, {pool['connections_opened']} opened"
+                for host, pool in http_client.get_stats().items()
+            ]
+            embed.add_field(
+                name="💾 Caches & Pools",
+                value="\n".join([
+                    f"**{name}**: {cache['hit_rate']:.0%} hit rate, {cache['size']} entries"
+                    for name, cache in caches.items()
+                ] + [
+                    f"**Cover cache**: {covers['hits']} hits, {covers['misses']} misses, {covers['files']} files"
+                ] + pool_lines),
+                inline=False
+            )
+            
+            # Completion load, token spend and structured recommendation outcomes
+            scheduler = OpenAIService.get_scheduler_stats()
+            recommendations = OpenAIService.get_recommend_stats()
+            usage_lines = [
+                f"**Scheduler**: {scheduler['running']} running, {sum(scheduler['queued'].values())} queued, "
+                f"{scheduler['queue_full'] + scheduler['rejected_early'] + scheduler['expired']} shed"
+            ]
+            for call_type, usage in OpenAIService.get_token_usage().items():
+                usage_lines.append(
+                    f"**{call_type.capitalize()}**: {usage['prompt_tokens'] + usage['completion_tokens']:,} tokens "
+                    f"over {usage['calls']} calls"
+                )
+            if recommendations['calls']:
+                usage_lines.append(
+                    f"**Recommendations**: {recommendations['valid']}/{recommendations['calls']} valid JSON, "
+                    f"{recommendations['fallbacks']} fell back to text"
+                )
+            embed.add_field(name="🤖 AI Usage", value="\n".join(usage_lines), inline=False)
+            
+            await interaction.followup.send(embed=embed, ephemeral=True)
+            
+        except Exception as e:
+            logger.error(f"Error executing health command: {e}")
+            await interaction.followup.send(
+                "Sorry, I couldn't retrieve the bot health right now. Please try again later.",
+                ephemeral=True
+            )
+    
+    async def _is_operator(self, interaction):
+        """Server administrators and the bot owner may see operator telemetry"""
+        permissions = getattr(interaction.user, "guild_permissions", None)
+        if permissions is not None and permissions.administrator:
+            return True
+        return await self.bot.is_owner(interaction.user)
+    
     @app_commands.command(
         name="clearhistory",
         description="Clear your personal search history"
@@ -194,9 +349,12 @@ class ClearHistoryView(discord.ui.View):
             await interaction.response.send_message("Only the original user can confirm this action.", ephemeral=True)
             return
         
+        # Deleting waits for queued log entries to be written, which can outlast Discord's 3 second deadline
+        await interaction.response.defer()
+        
         try:
             # Actually implement data deletion for GDPR compliance
-            deleted_count = self._delete_user_data(str(self.user_id))
+            deleted_count = await RAGService.delete_user_history(self.user_id)
             
             embed = discord.Embed(
                 title="✅ History Cleared",
@@ -204,60 +362,15 @@ class ClearHistoryView(discord.ui.View):
                 color=discord.Color.green()
             )
             
-            await interaction.response.edit_message(embed=embed, view=None)
+            await interaction.edit_original_response(embed=embed, view=None)
             
         except Exception as e:
             logger.error(f"Error clearing user history: {e}")
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 "Sorry, there was an error clearing your history. Please try again later.",
                 ephemeral=True
             )
     
-    def _delete_user_data(self, user_id: str) -> int:
-        """
-        Actually delete user data from the log file (GDPR compliance)
-        
-        Args:
-            user_id (str): User ID to delete data for
-            
-        Returns:
-            int: Number of interactions deleted
-        """
-        import os
-        from src.services.rag_service import RAGService
-        
-        if not os.path.exists(RAGService.LOG_FILE):
-            return 0
-            
-        # Read all lines and filter out user's data
-        remaining_lines = []
-        deleted_count = 0
-        
-        try:
-            with open(RAGService.LOG_FILE, "r", encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line.strip())
-                        if entry.get("user_id") == user_id:
-                            deleted_count += 1
-                        else:
-                            remaining_lines.append(line.strip())
-                    except json.JSONDecodeError:
-                        # Keep malformed lines
-                        remaining_lines.append(line.strip())
-            
-            # Write back the filtered data
-            with open(RAGService.LOG_FILE, "w", encoding='utf-8') as f:
-                for line in remaining_lines:
-                    f.write(line + "\n")
-                    
-            logger.info(f"GDPR: Deleted {deleted_count} interactions for user {user_id}")
-            return deleted_count
-            
-        except Exception as e:
-            logger.error(f"Error deleting user data: {e}")
-            raise
-    
     @discord.ui.button(label="Cancel", style=discord.ButtonStyle.secondary)
     async def cancel_clear(self, interaction: discord.Interaction, button: discord.ui.Button):
         if interaction.user.id != self.user_id:
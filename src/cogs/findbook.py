@@ -1,10 +1,15 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+import asyncio
 import logging
+import os
+from src import config
 from src.services.openai_service import OpenAIService
 from src.services.book_service import BookService
+from src.services.cover_service import CoverService
 from src.services.rag_service import RAGService
+from src.utils.streaming import StreamingReply
 
 logger = logging.getLogger('bookfinder.commands.findbook')
 
@@ -25,6 +30,13 @@ class FindBookCog(commands.Cog):
         """
         await interaction.response.defer()
         
+        # Drop AI calls still pending once the user has stopped waiting
+        OpenAIService.bind_interaction(interaction)
+        
+        # Search the raw query while the AI parses it, in case parsing adds nothing
+        speculation = BookService.start_speculative_search(query)
+        details = None
+        
         try:
             # Let the AI parse the natural language query
             search_params = await OpenAIService.parse_book_query(query)
@@ -32,10 +44,11 @@ class FindBookCog(commands.Cog):
             
             # Check if AI returned an error (for impossible queries)
             if "error" in search_params:
+                BookService.discard_speculative_search(speculation)
                 error_message = search_params["error"]
                 
                 # Log the interaction with RAG
-                RAGService.log_interaction(
+                await RAGService.log_interaction(
                     user_id=interaction.user.id,
                     query=query,
                     books_found=[],
@@ -46,15 +59,15 @@ class FindBookCog(commands.Cog):
                 await interaction.followup.send(error_message)
                 return
             
-            # Search for books
-            books = await BookService.search_books(search_params)
+            # Search for books, reusing the speculative search when the parse matches it
+            books = await BookService.resolve_speculative_search(speculation, query, search_params)
             
             if not books:
                 # If no books found, use AI to provide a helpful response
                 ai_response = await OpenAIService.enhance_book_results([], query)
                 
                 # Log the interaction with RAG
-                RAGService.log_interaction(
+                await RAGService.log_interaction(
                     user_id=interaction.user.id,
                     query=query,
                     books_found=[],
@@ -65,11 +78,18 @@ class FindBookCog(commands.Cog):
                 await interaction.followup.send(ai_response)
                 return
             
-            # Get AI to enhance the book results with context
-            ai_response = await OpenAIService.enhance_book_results(books, query)
+            # Load pages, publishers and ratings for the embeds while the AI text streams,
+            # with Google Books quota that searches don't need
+            if config.BOOK_DETAILS_IN_EMBEDS:
+                details = asyncio.ensure_future(BookService.get_book_details_many([book.id for book in books[:3]], optional=True))
+            
+            # Stream the AI's context about the books into the first reply
+            reply = StreamingReply(interaction)
+            ai_response = await reply.consume(OpenAIService.stream_enhance_book_results(books, query))
+            await reply.finish()
             
             # Log the interaction with RAG BEFORE creating embeds
-            RAGService.log_interaction(
+            await RAGService.log_interaction(
                 user_id=interaction.user.id,
                 query=query,
                 books_found=books,
@@ -77,51 +97,84 @@ class FindBookCog(commands.Cog):
                 response_text=ai_response
             )
             
+            # Embeds go out without the details that aren't loaded by now
+            book_details = {}
+            if details is not None:
+                try:
+                    book_details = await asyncio.wait_for(asyncio.shield(details), config.BOOK_DETAILS_EMBED_WAIT)
+                except asyncio.TimeoutError:
+                    logger.info("Book details still loading, sending embeds without them")
+            
             # Create embeds for the books
             embeds = []
+            files = []
             for book in books[:3]:  # Limit to top 3 books
+                description = book.description or 'No description available'
                 embed = discord.Embed(
-                    title=book['title'],
-                    description=book.get('description', 'No description available')[:300] + 
-                               ('...' if book.get('description', '') and len(book['description']) > 300 else ''),
+                    title=book.title,
+                    description=description[:300] + ('...' if len(description) > 300 else ''),
                     color=discord.Color.blue(),
-                    url=book.get('previewLink', '')
+                    url=book.preview_link or ''
                 )
                 
-                embed.set_author(name=", ".join(book.get('authors', ['Unknown Author'])))
+                embed.set_author(name=", ".join(book.authors or ['Unknown Author']))
                 
                 # Add fields
                 embed.add_field(
                     name="Published", 
-                    value=book.get('publishedDate', 'Unknown'), 
+                    value=book.published_date or 'Unknown', 
                     inline=True
                 )
                 
-                if book.get('categories'):
+                if book.categories:
                     embed.add_field(
                         name="Categories", 
-                        value=", ".join(book['categories']), 
+                        value=", ".join(book.categories), 
                         inline=True
                     )
                 
-                # Add thumbnail if available
-                if book.get('imageLinks', {}).get('thumbnail'):
-                    embed.set_thumbnail(url=book['imageLinks']['thumbnail'])
+                detail = book_details.get(book.id)
+                if detail and detail.page_count:
+                    embed.add_field(name="Pages", value=str(detail.page_count), inline=True)
+                if detail and detail.publisher:
+                    embed.add_field(name="Publisher", value=detail.publisher, inline=True)
+                if detail and detail.average_rating:
+                    embed.add_field(
+                        name="Rating",
+                        value=f"{detail.average_rating}/5 ({detail.ratings_count or 0} ratings)",
+                        inline=True
+                    )
+                
+                # Attach the cached cover so Discord doesn't have to fetch it
+                cover_path = CoverService.get_cached_path(book)
+                cover_file = None
+                if cover_path:
+                    filename = os.path.basename(cover_path)
+                    try:
+                        # The cache may have evicted the file since the lookup
+                        cover_file = discord.File(cover_path, filename=filename)
+                    except OSError as e:
+                        logger.warning(f"Cached cover {cover_path} is gone, linking it instead: {e}")
+                if cover_file is not None:
+                    files.append(cover_file)
+                    embed.set_thumbnail(url=f"attachment://{filename}")
+                elif book.thumbnail and not CoverService.is_missing(book):
+                    embed.set_thumbnail(url=book.thumbnail)
                 
                 embeds.append(embed)
             
-            # Send the AI's response first
-            await interaction.followup.send(content=ai_response)
-            
             # Then send the book embeds
             if embeds:
-                await interaction.followup.send(embeds=embeds)
+                await interaction.followup.send(embeds=embeds, files=files)
                 
         except Exception as e:
             logger.error(f"Error executing findbook command: {e}")
+            BookService.discard_speculative_search(speculation)
+            if details is not None:
+                details.cancel()
             
             # Log the error interaction
-            RAGService.log_interaction(
+            await RAGService.log_interaction(
                 user_id=interaction.user.id,
                 query=query,
                 books_found=[],
@@ -1,11 +1,13 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
 import logging
+import os
 from src.services.openai_service import OpenAIService
 from src.services.book_service import BookService
+from src.services.cover_service import CoverService
 from src.services.rag_service import RAGService
+from src.utils.streaming import StreamingReply
 
 logger = logging.getLogger('bookfinder.commands.recommend')
 
@@ -26,14 +28,20 @@ class RecommendCog(commands.Cog):
         """
         await interaction.response.defer()
         
+        # Drop AI calls still pending once the user has stopped waiting
+        OpenAIService.bind_interaction(interaction)
+        
         book_details = []  # Initialize here for logging
         success_response = None
+        reply = StreamingReply(interaction, prefix="📚 **Book Recommendations**\n\n")
         
         try:
             # Handle vague preferences
             if preferences.lower() in ["i have no idea", "no idea", "don't know", "anything", "surprise me", "jag vet inte", "ingen aning"]:
                 # Get user's previous preferences from RAG
-                user_prefs = RAGService.get_user_preferences(interaction.user.id)
+                user_prefs = await RAGService.get_user_preferences(interaction.user.id)
+                # Vague requests are matched against what they searched for recently
+                retrieval_query = " ".join(user_prefs.get("recent_queries", []))
                 
                 if user_prefs.get("genres") or user_prefs.get("authors"):
                     # Use their history for recommendations
@@ -43,65 +51,35 @@ class RecommendCog(commands.Cog):
                     enhanced_preferences = "Recommend popular, well-reviewed books across different genres for someone exploring new reads"
             else:
                 # Check if user has previous preferences from RAG
-                user_prefs = RAGService.get_user_preferences(interaction.user.id)
+                user_prefs = await RAGService.get_user_preferences(interaction.user.id)
                 enhanced_preferences = preferences
+                retrieval_query = preferences
                 
                 if user_prefs.get("genres") or user_prefs.get("authors"):
                     enhanced_preferences += f" (Previously liked: {', '.join(user_prefs.get('genres', [])[:3])})"
             
-            # Create a recommendation prompt for the AI
-            system_prompt = """
-            You are a knowledgeable librarian who helps users find books they might enjoy.
-            Based on the user's preferences, suggest 3-5 specific books they might like.
-            
-            IMPORTANT: Always respond with a simple, conversational recommendation text, NOT JSON.
-            Include:
-            - Book titles and authors
-            - Brief reasons why each book matches their preferences
-            - Mix of different genres if preferences are vague
+            # Ground the prompt in similar past searches and known books
+            context = await RAGService.retrieve_context(interaction.user.id, retrieval_query)
             
-            Keep your response natural and conversational, like a librarian talking to a customer.
-            """
+            # One structured call returns the text to show and the books to look up
+            recommendation = await OpenAIService.recommend_books(enhanced_preferences, on_text=reply.append, context=context)
+            ai_recommendation = recommendation["message"]
             
-            # Get recommendations from AI
-            ai_recommendation = await OpenAIService.generate_response(
-                f"Based on these preferences, recommend specific books: {enhanced_preferences}",
-                system_prompt
-            )
-            
-            # Try to extract book titles and authors from the AI response for searching
-            book_search_prompt = """
-            Extract book titles and authors from this recommendation text.
-            Return as JSON array with format: [{"title": "Book Title", "author": "Author Name"}]
-            If you can't extract clear titles/authors, return empty array: []
-            """
-            
-            try:
-                book_search_response = await OpenAIService.generate_response(
-                    f"Extract books from: {ai_recommendation}",
-                    book_search_prompt
-                )
-                book_searches = json.loads(book_search_response)
-                
-                # Search for actual book details
-                for search in book_searches[:3]:
-                    try:
-                        search_query = {
-                            'title': search.get('title'),
-                            'author': search.get('author')
-                        }
-                        
-                        books = await BookService.search_books(search_query)
-                        
-                        if books and len(books) > 0:
-                            book_details.append(books[0])
-                    except Exception as e:
-                        logger.error(f"Error searching for book: {e}")
-                        continue
-                        
-            except Exception as e:
-                logger.info(f"Could not extract book details for searching: {e}")
-                # Continue without book details - just use AI response
+            # Search for actual book details
+            for search in recommendation["books"][:3]:
+                try:
+                    search_query = {
+                        'title': search['title'],
+                        'author': search['author'] or None
+                    }
+                    
+                    books = await BookService.search_books(search_query)
+                    
+                    if books and len(books) > 0:
+                        book_details.append(books[0])
+                except Exception as e:
+                    logger.error(f"Error searching for book: {e}")
+                    continue
             
             # Create response message
             response_content = f"📚 **Book Recommendations**\n\n{ai_recommendation}"
@@ -111,47 +89,60 @@ class RecommendCog(commands.Cog):
             
             # Create embeds for found books (if any)
             embeds = []
+            files = []
             for book in book_details[:3]:
+                description = book.description or 'No description available'
                 embed = discord.Embed(
-                    title=book['title'],
-                    description=book.get('description', 'No description available')[:300] + 
-                               ('...' if book.get('description', '') and len(book['description']) > 300 else ''),
+                    title=book.title,
+                    description=description[:300] + ('...' if len(description) > 300 else ''),
                     color=discord.Color.green(),
-                    url=book.get('previewLink', '')
+                    url=book.preview_link or ''
                 )
                 
-                embed.set_author(name=", ".join(book.get('authors', ['Unknown Author'])))
+                embed.set_author(name=", ".join(book.authors or ['Unknown Author']))
                 
                 # Add fields
-                if book.get('publishedDate'):
+                if book.published_date:
                     embed.add_field(
                         name="Published", 
-                        value=book.get('publishedDate', 'Unknown'), 
+                        value=book.published_date, 
                         inline=True
                     )
                 
-                if book.get('categories'):
+                if book.categories:
                     embed.add_field(
                         name="Genre", 
-                        value=", ".join(book['categories']), 
+                        value=", ".join(book.categories), 
                         inline=True
                     )
                 
-                # Add thumbnail if available
-                if book.get('imageLinks', {}).get('thumbnail'):
-                    embed.set_thumbnail(url=book['imageLinks']['thumbnail'])
+                # Attach the cached cover so Discord doesn't have to fetch it
+                cover_path = CoverService.get_cached_path(book)
+                cover_file = None
+                if cover_path:
+                    filename = os.path.basename(cover_path)
+                    try:
+                        # The cache may have evicted the file since the lookup
+                        cover_file = discord.File(cover_path, filename=filename)
+                    except OSError as e:
+                        logger.warning(f"Cached cover {cover_path} is gone, linking it instead: {e}")
+                if cover_file is not None:
+                    files.append(cover_file)
+                    embed.set_thumbnail(url=f"attachment://{filename}")
+                elif book.thumbnail and not CoverService.is_missing(book):
+                    embed.set_thumbnail(url=book.thumbnail)
                 
                 embeds.append(embed)
             
-            # Send the response
+            # Complete the streamed reply with the found books
             if embeds:
-                await interaction.followup.send(content=response_content, embeds=embeds)
+                await reply.finish(content=response_content, embeds=embeds, files=files)
             else:
-                await interaction.followup.send(content=response_content)
+                await reply.finish(content=response_content)
             
             # Log successful interaction
             success_response = f"Recommended books based on: {preferences}"
-            RAGService.log_interaction(
+            await RAGService.log_interaction(
                 user_id=interaction.user.id,
                 query=preferences,
                 books_found=book_details,
@@ -175,10 +166,10 @@ Here are some popular books across different genres:
 
 Try being more specific about genres or authors you like for better personalized recommendations!"""
             
-            await interaction.followup.send(fallback_message)
+            await reply.finish(content=fallback_message)
             
             # Log the interaction
-            RAGService.log_interaction(
+            await RAGService.log_interaction(
                 user_id=interaction.user.id,
                 query=preferences,
                 books_found=[],
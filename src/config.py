@@ -12,11 +12,157 @@ BOT_PREFIX = os.getenv('BOT_PREFIX', '!')
 # OpenAI configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 AI_MODEL = os.getenv('AI_MODEL', 'gpt-3.5-turbo')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')  # Defaults to the official API when unset
 MAX_TOKENS = 500
+OPENAI_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '30'))
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '2'))
+OPENAI_MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '10'))
+OPENAI_POOL_SIZE = int(os.getenv('OPENAI_POOL_SIZE', '20'))
 
 # Google Books API configuration
 GOOGLE_BOOKS_API_KEY = os.getenv('GOOGLE_BOOKS_API_KEY')
-GOOGLE_BOOKS_BASE_URL = 'https://www.googleapis.com/books/v1'
+GOOGLE_BOOKS_BASE_URL = os.getenv('GOOGLE_BOOKS_BASE_URL', 'https://www.googleapis.com/books/v1')
 
 # Open Library API configuration
-OPEN_LIBRARY_BASE_URL = 'https://openlibrary.org' 
\ No newline at end of file
+OPEN_LIBRARY_BASE_URL = os.getenv('OPEN_LIBRARY_BASE_URL', 'https://openlibrary.org')
+
+# HTTP client configuration (shared keep-alive pools for book APIs)
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '20'))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '10'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '3'))
+GOOGLE_BOOKS_TIMEOUT = float(os.getenv('GOOGLE_BOOKS_TIMEOUT', '5'))
+OPEN_LIBRARY_TIMEOUT = float(os.getenv('OPEN_LIBRARY_TIMEOUT', '8'))
+
+# Book search cache configuration
+BOOK_SEARCH_DETERMINISTIC = os.getenv('BOOK_SEARCH_DETERMINISTIC', 'false').lower() == 'true'
+BOOK_SEARCH_PAGE_OFFSETS = [int(offset) for offset in os.getenv('BOOK_SEARCH_PAGE_OFFSETS', '0,5,10').split(',')]
+BOOK_CACHE_SIZE = int(os.getenv('BOOK_CACHE_SIZE', '512'))
+BOOK_CACHE_TTL = float(os.getenv('BOOK_CACHE_TTL', '900'))
+
+# Book search fan-out configuration
+BOOK_SEARCH_FANOUT = os.getenv('BOOK_SEARCH_FANOUT', 'false').lower() == 'true'
+OPEN_LIBRARY_HEDGE_DELAY = float(os.getenv('OPEN_LIBRARY_HEDGE_DELAY', '0.3'))
+BOOK_SEARCH_BUDGET = float(os.getenv('BOOK_SEARCH_BUDGET', '8'))
+
+# Local book catalog configuration
+CATALOG_ENABLED = os.getenv('CATALOG_ENABLED', 'true').lower() == 'true'
+CATALOG_DB_FILE = os.getenv('CATALOG_DB_FILE', 'book_catalog.db')
+CATALOG_MIN_RESULTS = int(os.getenv('CATALOG_MIN_RESULTS', '3'))
+# Seconds a fetched book may answer searches before the APIs are asked again; 0 never expires (offline dumps)
+CATALOG_MAX_AGE = float(os.getenv('CATALOG_MAX_AGE', '86400'))
+
+# Upstream rate limits (requests per second and burst size) and circuit breakers
+GOOGLE_BOOKS_RATE_LIMIT = float(os.getenv('GOOGLE_BOOKS_RATE_LIMIT', '5'))
+GOOGLE_BOOKS_RATE_BURST = int(os.getenv('GOOGLE_BOOKS_RATE_BURST', '10'))
+OPEN_LIBRARY_RATE_LIMIT = float(os.getenv('OPEN_LIBRARY_RATE_LIMIT', '2'))
+OPEN_LIBRARY_RATE_BURST = int(os.getenv('OPEN_LIBRARY_RATE_BURST', '5'))
+RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', '0.5'))
+# Google Books tokens optional calls (embed details) leave for searches; they never wait for a token,
+# so they only run while the bucket is close to full
+GOOGLE_BOOKS_OPTIONAL_RESERVE = int(os.getenv('GOOGLE_BOOKS_OPTIONAL_RESERVE', str(max(0, GOOGLE_BOOKS_RATE_BURST - 2))))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30'))
+
+# Book details configuration
+BOOK_DETAILS_CONCURRENCY = int(os.getenv('BOOK_DETAILS_CONCURRENCY', '5'))
+BOOK_DETAILS_CACHE_SIZE = int(os.getenv('BOOK_DETAILS_CACHE_SIZE', '1024'))
+BOOK_DETAILS_CACHE_TTL = float(os.getenv('BOOK_DETAILS_CACHE_TTL', '86400'))
+# Pages, publisher and rating in /findbook embeds, loaded only with Google Books quota left over from searches
+BOOK_DETAILS_IN_EMBEDS = os.getenv('BOOK_DETAILS_IN_EMBEDS', 'true').lower() == 'true'
+BOOK_DETAILS_EMBED_WAIT = float(os.getenv('BOOK_DETAILS_EMBED_WAIT', '1.0'))
+
+# Cover thumbnail cache configuration
+COVER_CACHE_ENABLED = os.getenv('COVER_CACHE_ENABLED', 'true').lower() == 'true'
+COVER_CACHE_DIR = os.getenv('COVER_CACHE_DIR', 'cover_cache')
+COVER_CACHE_MAX_BYTES = int(os.getenv('COVER_CACHE_MAX_BYTES', str(100 * 1024 * 1024)))
+COVER_MAX_BYTES = int(os.getenv('COVER_MAX_BYTES', str(2 * 1024 * 1024)))
+COVER_FETCH_TIMEOUT = float(os.getenv('COVER_FETCH_TIMEOUT', '5'))
+COVER_PREFETCH_CONCURRENCY = int(os.getenv('COVER_PREFETCH_CONCURRENCY', '4'))
+
+# Parsed query cache configuration (persists LLM query parsing across restarts)
+PARSE_CACHE_ENABLED = os.getenv('PARSE_CACHE_ENABLED', 'true').lower() == 'true'
+PARSE_CACHE_FILE = os.getenv('PARSE_CACHE_FILE', 'query_cache.db')
+PARSE_CACHE_SIZE = int(os.getenv('PARSE_CACHE_SIZE', '10000'))
+PARSE_CACHE_TTL = float(os.getenv('PARSE_CACHE_TTL', str(7 * 86400)))
+
+# Fast-path query parser configuration (rule-based parsing before the LLM)
+FAST_PARSE_ENABLED = os.getenv('FAST_PARSE_ENABLED', 'true').lower() == 'true'
+FAST_PARSE_THRESHOLD = float(os.getenv('FAST_PARSE_THRESHOLD', '0.8'))
+
+# Streaming reply configuration (progressive edits of the follow-up message)
+OPENAI_STREAMING = os.getenv('OPENAI_STREAMING', 'true').lower() == 'true'
+STREAM_EDIT_INTERVAL = float(os.getenv('STREAM_EDIT_INTERVAL', '1.0'))  # Discord allows ~5 edits per 5s per message
+
+# Token budgets (completion limits per call type and prompt input budgets)
+MAX_TOKENS_BY_CALL = {
+    'parse': int(os.getenv('PARSE_MAX_TOKENS', '150')),
+    'enhance': int(os.getenv('ENHANCE_MAX_TOKENS', '400')),
+    'recommend': int(os.getenv('RECOMMEND_MAX_TOKENS', '700')),
+    'repair': int(os.getenv('REPAIR_MAX_TOKENS', '700'))
+}
+ENHANCE_INPUT_BUDGET = int(os.getenv('ENHANCE_INPUT_BUDGET', '1200'))
+RECOMMEND_INPUT_BUDGET = int(os.getenv('RECOMMEND_INPUT_BUDGET', '300'))
+RECOMMEND_CONTEXT_BUDGET = int(os.getenv('RECOMMEND_CONTEXT_BUDGET', '250'))  # Retrieved history and books
+
+# Enhanced response cache configuration (variants > 1 rotates several cached texts)
+ENHANCE_CACHE_ENABLED = os.getenv('ENHANCE_CACHE_ENABLED', 'true').lower() == 'true'
+ENHANCE_CACHE_SIZE = int(os.getenv('ENHANCE_CACHE_SIZE', '512'))
+ENHANCE_CACHE_TTL = float(os.getenv('ENHANCE_CACHE_TTL', '3600'))
+ENHANCE_CACHE_VARIANTS = max(1, int(os.getenv('ENHANCE_CACHE_VARIANTS', '3')))
+
+# Speculative search configuration (raw query search while the query is parsed)
+# Off by default: each miss can still cost an upstream request and a rate-limit token
+SPECULATIVE_SEARCH = os.getenv('SPECULATIVE_SEARCH', 'false').lower() == 'true'
+
+# LLM scheduler configuration (priority queue limits and per-interaction deadline)
+LLM_QUEUE_LIMIT_INTERACTIVE = int(os.getenv('LLM_QUEUE_LIMIT_INTERACTIVE', '50'))
+LLM_QUEUE_LIMIT_GENERATION = int(os.getenv('LLM_QUEUE_LIMIT_GENERATION', '30'))
+LLM_QUEUE_LIMIT_BACKGROUND = int(os.getenv('LLM_QUEUE_LIMIT_BACKGROUND', '10'))
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', '60'))  # Seconds after the interaction was created
+
+# Model cascade configuration (comma-separated models tried in order per call type)
+def _models(value):
+    return list(dict.fromkeys(model.strip() for model in value.split(',') if model.strip()))
+
+MODEL_CASCADE = {
+    'parse': _models(os.getenv('PARSE_MODELS', f'gpt-4o-mini,{AI_MODEL}')),
+    'enhance': _models(os.getenv('ENHANCE_MODELS', f'{AI_MODEL},gpt-4o-mini')),
+    'recommend': _models(os.getenv('RECOMMEND_MODELS', f'gpt-4o,{AI_MODEL}')),
+    'repair': _models(os.getenv('REPAIR_MODELS', f'gpt-4o-mini,{AI_MODEL}'))
+}
+# Seconds to the full answer (or to the first streamed text) before failing over
+MODEL_LATENCY_SLO = {
+    'parse': float(os.getenv('PARSE_LATENCY_SLO', '3')),
+    'enhance': float(os.getenv('ENHANCE_LATENCY_SLO', '4')),
+    'recommend': float(os.getenv('RECOMMEND_LATENCY_SLO', '6')),
+    'repair': float(os.getenv('REPAIR_LATENCY_SLO', '6'))
+}
+MODEL_FAILURE_THRESHOLD = int(os.getenv('MODEL_FAILURE_THRESHOLD', '3'))
+MODEL_RESET_TIMEOUT = float(os.getenv('MODEL_RESET_TIMEOUT', '60'))
+
+# Interaction history configuration (segmented JSONL log plus a per-user offset index)
+INTERACTION_LOG_FILE = os.getenv('INTERACTION_LOG_FILE', 'user_interactions.log')  # Segments get a .000001 suffix
+INTERACTION_INDEX_FILE = os.getenv('INTERACTION_INDEX_FILE', 'user_interactions.idx')
+INTERACTION_SEGMENT_BYTES = int(os.getenv('INTERACTION_SEGMENT_BYTES', str(8 * 1024 * 1024)))
+INTERACTION_COMPACT_INTERVAL = float(os.getenv('INTERACTION_COMPACT_INTERVAL', '300'))  # Seconds between purges of deleted history
+# Background log writer: entries are written in batches of up to this size, or after the interval
+INTERACTION_BATCH_SIZE = int(os.getenv('INTERACTION_BATCH_SIZE', '100'))
+INTERACTION_FLUSH_INTERVAL = float(os.getenv('INTERACTION_FLUSH_INTERVAL', '1.0'))
+INTERACTION_QUEUE_SIZE = int(os.getenv('INTERACTION_QUEUE_SIZE', '10000'))
+INTERACTION_ENQUEUE_TIMEOUT = float(os.getenv('INTERACTION_ENQUEUE_TIMEOUT', '1.0'))  # Then the entry is dropped
+INTERACTION_FSYNC = os.getenv('INTERACTION_FSYNC', 'batch').lower()  # batch, interval or never
+INTERACTION_FSYNC_INTERVAL = float(os.getenv('INTERACTION_FSYNC_INTERVAL', '5.0'))
+
+# Embedding retrieval configuration (grounds /recommend in past interactions and known books)
+EMBEDDING_ENABLED = os.getenv('EMBEDDING_ENABLED', 'true').lower() == 'true'
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'hashing').lower()  # hashing, sentence-transformers or openai
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL')  # Defaults to all-MiniLM-L6-v2 or text-embedding-3-small
+EMBEDDING_DIM = int(os.getenv('EMBEDDING_DIM', '512'))  # Hashing backend only
+EMBEDDING_STORE_FILE = os.getenv('EMBEDDING_STORE_FILE', 'embeddings.npz')
+EMBEDDING_SAVE_EVERY = int(os.getenv('EMBEDDING_SAVE_EVERY', '1000'))  # Unsaved vector changes before a save
+EMBEDDING_TOP_K = int(os.getenv('EMBEDDING_TOP_K', '5'))
+EMBEDDING_MIN_SCORE = float(os.getenv('EMBEDDING_MIN_SCORE', '0.2'))
+# Approximate (IVF) search, trained once there are 40 vectors per list
+EMBEDDING_APPROXIMATE = os.getenv('EMBEDDING_APPROXIMATE', 'false').lower() == 'true'
+EMBEDDING_IVF_LISTS = int(os.getenv('EMBEDDING_IVF_LISTS', '64'))
+EMBEDDING_IVF_PROBES = int(os.getenv('EMBEDDING_IVF_PROBES', '8'))
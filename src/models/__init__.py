@@ -0,0 +1 @@
+# Models package initialization file
\ No newline at end of file
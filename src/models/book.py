@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+
+OPEN_LIBRARY_COVER_URL = "https://covers.openlibrary.org/b/id/{cover_id}-M.jpg"
+
+@dataclass(frozen=True)
+class Book:
+    """Compact, immutable book record shared by the services and cogs"""
+
+    __slots__ = (
+        'id', 'title', 'authors', 'description', 'published_date', 'categories',
+        'thumbnail', 'preview_link', 'info_link', 'page_count', 'publisher',
+        'language', 'average_rating', 'ratings_count'
+    )
+
+    id: str
+    title: str
+    authors: tuple
+    description: str
+    published_date: str
+    categories: tuple
+    thumbnail: str
+    preview_link: str
+    info_link: str
+    page_count: int
+    publisher: str
+    language: str
+    average_rating: float
+    ratings_count: int
+
+    @classmethod
+    def from_google(cls, item):
+        """
+        Build a book from a Google Books volume resource
+
+        Args:
+            item (dict): Volume JSON with id and volumeInfo
+
+        Returns:
+            Book: The parsed book
+        """
+        volume_info = item.get('volumeInfo') or {}
+        return cls(
+            id=item.get('id'),
+            title=volume_info.get('title', 'Unknown Title'),
+            authors=tuple(volume_info.get('authors') or ['Unknown Author']),
+            description=volume_info.get('description', 'No description available'),
+            published_date=volume_info.get('publishedDate'),
+            categories=tuple(volume_info.get('categories') or []),
+            thumbnail=(volume_info.get('imageLinks') or {}).get('thumbnail'),
+            preview_link=volume_info.get('previewLink'),
+            info_link=volume_info.get('infoLink'),
+            page_count=volume_info.get('pageCount'),
+            publisher=volume_info.get('publisher'),
+            language=volume_info.get('language'),
+            average_rating=volume_info.get('averageRating'),
+            ratings_count=volume_info.get('ratingsCount')
+        )
+
+    @classmethod
+    def from_open_library(cls, doc):
+        """
+        Build a book from an Open Library search document
+
+        Args:
+            doc (dict): Search result document
+
+        Returns:
+            Book: The parsed book
+        """
+        cover_id = doc.get('cover_i')
+        return cls(
+            id=doc.get('key'),
+            title=doc.get('title', 'Unknown Title'),
+            authors=tuple(doc.get('author_name') or ['Unknown Author']),
+            description=None,
+            published_date=str(doc.get('first_publish_year', '')),
+            categories=tuple(doc.get('subject') or []),
+            thumbnail=OPEN_LIBRARY_COVER_URL.format(cover_id=cover_id) if cover_id else None,
+            preview_link=f"https://openlibrary.org{doc.get('key')}",
+            info_link=None,
+            page_count=None,
+            publisher=None,
+            language=None,
+            average_rating=None,
+            ratings_count=None
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a book from the plain dict form produced by to_dict()
+
+        Args:
+            data (dict): Book data with Google Books style keys
+
+        Returns:
+            Book: The book
+        """
+        return cls(
+            id=data.get('id'),
+            title=data.get('title', 'Unknown Title'),
+            authors=tuple(data.get('authors') or ['Unknown Author']),
+            description=data.get('description'),
+            published_date=data.get('publishedDate'),
+            categories=tuple(data.get('categories') or []),
+            thumbnail=(data.get('imageLinks') or {}).get('thumbnail'),
+            preview_link=data.get('previewLink'),
+            info_link=data.get('infoLink'),
+            page_count=data.get('pageCount'),
+            publisher=data.get('publisher'),
+            language=data.get('language'),
+            average_rating=data.get('averageRating'),
+            ratings_count=data.get('ratingsCount')
+        )
+
+    def to_dict(self):
+        """
+        Convert to a JSON-serializable dict with Google Books style keys
+
+        Returns:
+            dict: Book data, omitting fields that are not set
+        """
+        data = {
+            'id': self.id,
+            'title': self.title,
+            'authors': list(self.authors),
+            'description': self.description,
+            'publishedDate': self.published_date,
+            'categories': list(self.categories),
+            'imageLinks': {'thumbnail': self.thumbnail} if self.thumbnail else None,
+            'previewLink': self.preview_link,
+            'infoLink': self.info_link,
+            'pageCount': self.page_count,
+            'publisher': self.publisher,
+            'language': self.language,
+            'averageRating': self.average_rating,
+            'ratingsCount': self.ratings_count
+        }
+        return {key: value for key, value in data.items() if value is not None}
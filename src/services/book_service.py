@@ -1,23 +1,190 @@
-import requests
+import asyncio
 import logging
-import random
+import time
+import aiohttp
 from src import config
+from src.models.book import Book
+from src.services.catalog_service import CatalogService
+from src.services.cover_service import CoverService
+from src.utils.cache import TTLCache
+from src.utils.http_client import http_client
+from src.utils.metrics import LatencyStats
+from src.utils.resilience import CircuitBreaker, TokenBucket, UpstreamUnavailable
+from src.utils.singleflight import SingleFlight
 
 logger = logging.getLogger('bookfinder.book')
 
+# Google Books results keyed by (normalized params, startIndex)
+_search_cache = TTLCache(maxsize=config.BOOK_CACHE_SIZE, ttl=config.BOOK_CACHE_TTL)
+
+# Detailed volumes keyed by Google Books ID, shared by single and batch lookups
+_details_cache = TTLCache(maxsize=config.BOOK_DETAILS_CACHE_SIZE, ttl=config.BOOK_DETAILS_CACHE_TTL)
+
+# Next page offset to serve per normalized query, used to rotate results for variety
+_page_rotation = TTLCache(maxsize=config.BOOK_CACHE_SIZE, ttl=config.BOOK_CACHE_TTL)
+
+# Which provider answered each search and how long each provider took
+_provider_stats = {
+    'local_catalog': {"wins": 0, "latency": LatencyStats()},
+    'google_books': {"wins": 0, "latency": LatencyStats()},
+    'open_library': {"wins": 0, "latency": LatencyStats()}
+}
+_fanout_stats = {"budget_exceeded": 0}
+
+# Per-provider quota limiters and circuit breakers
+_limiters = {
+    'google_books': TokenBucket(config.GOOGLE_BOOKS_RATE_LIMIT, config.GOOGLE_BOOKS_RATE_BURST),
+    'open_library': TokenBucket(config.OPEN_LIBRARY_RATE_LIMIT, config.OPEN_LIBRARY_RATE_BURST)
+}
+_breakers = {
+    provider: CircuitBreaker(provider, config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_TIMEOUT)
+    for provider in _limiters
+}
+
+# Raw-query searches started before parsing finished, and how often they were usable
+_speculation_stats = {"started": 0, "hits": 0, "misses": 0, "latency_saved": 0.0}
+
+# Identical concurrent searches and detail lookups share one upstream call
+_search_flight = SingleFlight()
+_details_flight = SingleFlight()
+
+# Partial-response masks so Google only sends the attributes we actually render
+GOOGLE_SEARCH_FIELDS = "items(id,volumeInfo(title,authors,description,publishedDate,categories,imageLinks/thumbnail,previewLink))"
+GOOGLE_DETAIL_FIELDS = (
+    "id,volumeInfo(title,authors,description,publishedDate,categories,imageLinks/thumbnail,"
+    "previewLink,infoLink,pageCount,publisher,language,averageRating,ratingsCount)"
+)
+OPEN_LIBRARY_FIELDS = "key,title,author_name,first_publish_year,subject,cover_i"
+
 class BookService:
     """Service for fetching book information from APIs"""
     
     @staticmethod
-    async def search_google_books(params):
+    def _normalize_params(params):
+        """
+        Build a cache key from the search parameters
+        
+        Args:
+            params (dict): Search parameters
+            
+        Returns:
+            tuple: Case- and whitespace-normalized title, author, genre and general query
+        """
+        def normalize(value):
+            return " ".join(str(value).casefold().split()) if value else ""
+        
+        return (
+            normalize(params.get('title')),
+            normalize(params.get('author')),
+            normalize(params.get('genre') or params.get('categories')),
+            normalize(params.get('general_query'))
+        )
+    
+    @staticmethod
+    def _next_start_index(cache_key, advance=True):
+        """
+        Pick the Google Books startIndex for a query
+        
+        In deterministic mode the first page is always used. Otherwise repeated
+        queries rotate through the configured page offsets, so every page ends up
+        cached and variety no longer costs an API call.
+        
+        Args:
+            cache_key (tuple): Normalized search parameters
+            advance (bool): Move the rotation on, False to only peek at the next page
+        """
+        offsets = config.BOOK_SEARCH_PAGE_OFFSETS
+        if config.BOOK_SEARCH_DETERMINISTIC or not offsets:
+            return 0
+        
+        position = _page_rotation.get(cache_key, 0)
+        if advance:
+            _page_rotation.set(cache_key, (position + 1) % len(offsets))
+        return offsets[position % len(offsets)]
+    
+    @staticmethod
+    def get_cache_stats():
+        """
+        Get search cache counters
+        
+        Returns:
+            dict: Hits, misses, hit rate and size of the search cache
+        """
+        return _search_cache.stats()
+    
+    @staticmethod
+    async def _guarded_get_json(provider, url, params, timeout, optional=False):
+        """
+        Call an upstream through its rate limiter and circuit breaker
+        
+        Args:
+            provider (str): Provider name
+            url (str): Request URL
+            params (dict): Query parameters
+            timeout (float): Request timeout in seconds
+            optional (bool): Only call if the limiter has tokens to spare beyond the
+                reserve kept for searches, without waiting
+            
+        Returns:
+            dict: Decoded JSON response
+            
+        Raises:
+            UpstreamUnavailable: If the circuit is open or the quota is exhausted
+        """
+        breaker = _breakers[provider]
+        if not breaker.allow_request():
+            raise UpstreamUnavailable(f"{provider} circuit is open")
+        if optional:
+            acquired = _limiters[provider].try_acquire_spare(config.GOOGLE_BOOKS_OPTIONAL_RESERVE)
+        else:
+            acquired = await _limiters[provider].acquire(config.RATE_LIMIT_MAX_WAIT)
+        if not acquired:
+            breaker.release()
+            raise UpstreamUnavailable(f"{provider} rate limit reached")
+        
+        try:
+            data = await http_client.get_json(url, params=params, timeout=timeout)
+        except aiohttp.ClientResponseError as e:
+            # Only throttling and server errors say the upstream is unhealthy
+            if e.status == 429 or e.status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.release()
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        
+        breaker.record_success()
+        return data
+    
+    @staticmethod
+    def get_upstream_health():
+        """
+        Get circuit breaker and rate limiter state per provider
+        
+        Returns:
+            dict: Breaker state, failure counters and limiter tokens per provider
+        """
+        return {
+            provider: {**_breakers[provider].stats(), "rate_limiter": _limiters[provider].stats()}
+            for provider in _breakers
+        }
+    
+    @staticmethod
+    async def search_google_books(params, rotate=True):
         """
         Search for books using Google Books API
         
         Args:
             params (dict): Search parameters
+            rotate (bool): Advance the page rotation for this query
             
         Returns:
-            list: Array of book data
+            list: Array of Book records
         """
         try:
             query = ""
@@ -37,89 +204,124 @@ class BookService:
             if not query.strip():
                 query = params.get('general_query', 'bestseller books')
                 
-            # Add some randomization to avoid same results
-            start_index = random.randint(0, 10)
+            # Serve from cache when this query and page were fetched recently
+            params_key = BookService._normalize_params(params)
+            start_index = BookService._next_start_index(params_key, advance=rotate)
+            cache_key = (params_key, start_index)
+            
+            cached_books = _search_cache.get(cache_key)
+            if cached_books is not None:
+                return list(cached_books)
                 
             # Make API request
-            response = requests.get(
+            data = await BookService._guarded_get_json(
+                'google_books',
                 f"{config.GOOGLE_BOOKS_BASE_URL}/volumes",
                 params={
                     'q': query.strip(),
                     'maxResults': 10,  # Get more results for variety
-                    'startIndex': start_index,  # Add randomization
+                    'startIndex': start_index,  # Rotated page for variety
+                    'fields': GOOGLE_SEARCH_FIELDS,
                     'key': config.GOOGLE_BOOKS_API_KEY
-                }
+                },
+                timeout=config.GOOGLE_BOOKS_TIMEOUT
             )
             
-            response.raise_for_status()
-            data = response.json()
-            
             if 'items' not in data:
+                _search_cache.set(cache_key, [])
                 return []
                 
             # Process results with null safety
-            books = []
-            for item in data['items']:
-                volume_info = item.get('volumeInfo', {})
-                books.append({
-                    'id': item.get('id'),
-                    'title': volume_info.get('title', 'Unknown Title'),
-                    'authors': volume_info.get('authors') or ['Unknown Author'],
-                    'description': volume_info.get('description', 'No description available'),
-                    'publishedDate': volume_info.get('publishedDate'),
-                    'categories': volume_info.get('categories') or [],
-                    'imageLinks': volume_info.get('imageLinks'),
-                    'previewLink': volume_info.get('previewLink')
-                })
+            books = [Book.from_google(item) for item in data['items']]
                 
-            return books
+            _search_cache.set(cache_key, books)
+            return list(books)
             
+        except UpstreamUnavailable:
+            raise
         except Exception as e:
             logger.error(f"Error searching Google Books: {e}")
             raise RuntimeError("Failed to search for books")
     
     @staticmethod
-    async def get_book_details(book_id):
+    async def get_book_details(book_id, optional=False):
         """
         Get detailed information about a book by ID
         
         Args:
             book_id (str): Google Books volume ID
+            optional (bool): Skip the request unless the Google Books limiter has
+                tokens to spare beyond GOOGLE_BOOKS_OPTIONAL_RESERVE
             
         Returns:
-            dict: Detailed book data
+            Book: Detailed book data
         """
+        cached_book = _details_cache.get(book_id)
+        if cached_book is not None:
+            return cached_book
+        
+        return await _details_flight.do((book_id, optional), BookService._fetch_book_details, book_id, optional)
+    
+    @staticmethod
+    async def _fetch_book_details(book_id, optional):
         try:
-            response = requests.get(
+            data = await BookService._guarded_get_json(
+                'google_books',
                 f"{config.GOOGLE_BOOKS_BASE_URL}/volumes/{book_id}",
-                params={'key': config.GOOGLE_BOOKS_API_KEY}
+                params={'fields': GOOGLE_DETAIL_FIELDS, 'key': config.GOOGLE_BOOKS_API_KEY},
+                timeout=config.GOOGLE_BOOKS_TIMEOUT,
+                optional=optional
             )
+            book = Book.from_google(data)
             
-            response.raise_for_status()
-            data = response.json()
-            volume_info = data.get('volumeInfo', {})
-            
-            return {
-                'id': data.get('id'),
-                'title': volume_info.get('title', 'Unknown Title'),
-                'authors': volume_info.get('authors') or ['Unknown Author'],
-                'description': volume_info.get('description', 'No description available'),
-                'publishedDate': volume_info.get('publishedDate'),
-                'categories': volume_info.get('categories') or [],
-                'pageCount': volume_info.get('pageCount'),
-                'imageLinks': volume_info.get('imageLinks'),
-                'previewLink': volume_info.get('previewLink'),
-                'infoLink': volume_info.get('infoLink'),
-                'language': volume_info.get('language'),
-                'publisher': volume_info.get('publisher'),
-                'averageRating': volume_info.get('averageRating'),
-                'ratingsCount': volume_info.get('ratingsCount')
-            }
+            _details_cache.set(book_id, book)
+            await CatalogService.add_books([book])
+            return book
             
+        except UpstreamUnavailable:
+            raise
         except Exception as e:
             logger.error(f"Error getting book details: {e}")
             raise RuntimeError("Failed to get book details")
     
+    @staticmethod
+    async def get_book_details_many(book_ids, optional=False):
+        """
+        Get detailed information about several books concurrently
+        
+        Duplicate IDs are fetched once and at most BOOK_DETAILS_CONCURRENCY requests
+        run at a time. Books that fail to load are left out of the result.
+        
+        Args:
+            book_ids (list): Google Books volume IDs
+            optional (bool): Skip uncached books when the Google Books limiter has no
+                tokens to spare, so the lookups never take quota from searches
+            
+        Returns:
+            dict: Detailed Book records keyed by ID
+        """
+        # Open Library keys look like "/works/OL1W" and have no Google volume
+        unique_ids = [book_id for book_id in dict.fromkeys(book_ids) if book_id and not book_id.startswith('/')]
+        semaphore = asyncio.Semaphore(config.BOOK_DETAILS_CONCURRENCY)
+        
+        async def fetch(book_id):
+            async with semaphore:
+                return await BookService.get_book_details(book_id, optional)
+        
+        results = await asyncio.gather(*(fetch(book_id) for book_id in unique_ids), return_exceptions=True)
+        
+        details = {}
+        for book_id, result in zip(unique_ids, results):
+            if isinstance(result, UpstreamUnavailable) and optional:
+                logger.debug(f"Skipped details for book {book_id}: {result}")
+                continue
+            if isinstance(result, Exception):
+                logger.warning(f"Could not load details for book {book_id}: {result}")
+                continue
+            details[book_id] = result
+            
+        return details
+    
     @staticmethod
     async def search_open_library(query):
         """
@@ -129,69 +331,352 @@ class BookService:
             query (str): Search query
             
         Returns:
-            list: Array of book data
+            list: Array of Book records
         """
         try:
-            response = requests.get(
+            data = await BookService._guarded_get_json(
+                'open_library',
                 f"{config.OPEN_LIBRARY_BASE_URL}/search.json",
-                params={'q': query, 'limit': 10}
+                params={'q': query, 'limit': 10, 'fields': OPEN_LIBRARY_FIELDS},
+                timeout=config.OPEN_LIBRARY_TIMEOUT
             )
             
-            response.raise_for_status()
-            data = response.json()
-            
             if 'docs' not in data or len(data['docs']) == 0:
                 return []
                 
             # Process results with null safety
-            books = []
-            for book in data['docs']:
-                books.append({
-                    'id': book.get('key'),
-                    'title': book.get('title', 'Unknown Title'),
-                    'authors': book.get('author_name') or ['Unknown Author'],
-                    'publishedDate': str(book.get('first_publish_year', '')),
-                    'categories': book.get('subject') or [],
-                    'imageLinks': {
-                        'thumbnail': f"https://covers.openlibrary.org/b/id/{book.get('cover_i')}-M.jpg" if book.get('cover_i') else None
-                    },
-                    'previewLink': f"https://openlibrary.org{book.get('key')}"
-                })
-                
-            return books
+            return [Book.from_open_library(doc) for doc in data['docs']]
             
+        except UpstreamUnavailable as e:
+            logger.info(f"Skipping Open Library: {e}")
+            return []
         except Exception as e:
             logger.error(f"Error searching Open Library: {e}")
             return []  # Return empty array as fallback
     
     @staticmethod
-    async def search_books(params):
+    def _fallback_query(params):
+        """Build the free-text query used for Open Library"""
+        return params.get('general_query', '') or \
+               ((params.get('title') or '') + ' ' + (params.get('author') or '')).strip()
+    
+    @staticmethod
+    async def _timed_search(provider, search):
+        """
+        Await a provider search and record its latency
+        
+        Args:
+            provider (str): Provider name used in the stats
+            search (coroutine): The provider search call
+            
+        Returns:
+            list: The provider's book results
+        """
+        started = time.perf_counter()
+        cancelled = False
+        try:
+            return await search
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        finally:
+            # Cancelled hedges never finished, so they say nothing about latency
+            if not cancelled:
+                _provider_stats[provider]["latency"].record(time.perf_counter() - started)
+    
+    @staticmethod
+    async def _delayed_open_library(query_string, delay):
+        """Start the Open Library search after the hedge delay"""
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return await BookService._timed_search('open_library', BookService.search_open_library(query_string))
+    
+    @staticmethod
+    async def _search_books_fanout(params, rotate=True):
         """
-        Search for books using both APIs, with Google Books as primary
+        Query Google Books and Open Library concurrently and keep the first non-empty answer
+        
+        Open Library is started after OPEN_LIBRARY_HEDGE_DELAY, so a fast Google reply
+        cancels it before any request is sent. Whatever is still running when a winner
+        is found, or when BOOK_SEARCH_BUDGET runs out, is cancelled. While the Google
+        circuit is open, Open Library is queried alone and without delay.
         
         Args:
             params (dict): Search parameters
+            rotate (bool): Advance the Google Books page rotation
             
         Returns:
-            list: Combined array of book data
+            list: Book data from the winning provider
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + config.BOOK_SEARCH_BUDGET
+        
+        tasks = {}
+        hedge_delay = config.OPEN_LIBRARY_HEDGE_DELAY
+        if _breakers['google_books'].state == CircuitBreaker.OPEN:
+            hedge_delay = 0
+        else:
+            tasks[asyncio.create_task(BookService._timed_search('google_books', BookService.search_google_books(params, rotate)))] = 'google_books'
+        tasks[asyncio.create_task(BookService._delayed_open_library(BookService._fallback_query(params), hedge_delay))] = 'open_library'
+        pending = set(tasks)
+        
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                    
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                
+                # Prefer Google Books when both finished in the same tick
+                for task in sorted(done, key=lambda t: tasks[t] != 'google_books'):
+                    if isinstance(task.exception(), UpstreamUnavailable):
+                        logger.info(f"Skipping {tasks[task]}: {task.exception()}")
+                        continue
+                    if task.exception() is not None:
+                        logger.error(f"Error in {tasks[task]} search: {task.exception()}")
+                        continue
+                    if task.result():
+                        _provider_stats[tasks[task]]["wins"] += 1
+                        return task.result()
+            
+            if pending:
+                _fanout_stats["budget_exceeded"] += 1
+                logger.warning(f"Book search exceeded {config.BOOK_SEARCH_BUDGET}s budget")
+            return []
+            
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    @staticmethod
+    def get_provider_stats():
+        """
+        Get per-provider search statistics
+        
+        Returns:
+            dict: Wins and latency summary per provider, plus fan-out budget overruns
+        """
+        stats = {
+            provider: {"wins": values["wins"], **values["latency"].summary()}
+            for provider, values in _provider_stats.items()
+        }
+        stats["budget_exceeded"] = _fanout_stats["budget_exceeded"]
+        return stats
+    
+    @staticmethod
+    async def _search_books_sequential(params, rotate=True):
+        """
+        Search Google Books, falling back to Open Library when it fails or finds nothing
+        
+        Args:
+            params (dict): Search parameters
+            rotate (bool): Advance the Google Books page rotation
+            
+        Returns:
+            list: Book data from the first provider with results
         """
         try:
             # Try Google Books API first
-            google_books = await BookService.search_google_books(params)
+            google_books = await BookService._timed_search('google_books', BookService.search_google_books(params, rotate))
             
             # If we got results, return them
             if google_books and len(google_books) > 0:
+                _provider_stats['google_books']["wins"] += 1
                 return google_books
                 
             # Otherwise fall back to Open Library
-            query_string = params.get('general_query', '') or \
-                          (params.get('title', '') + ' ' + params.get('author', '')).strip()
-                          
-            return await BookService.search_open_library(query_string)
+            query_string = BookService._fallback_query(params)
+            
+        except UpstreamUnavailable as e:
+            # Skip straight to Open Library without paying the failure latency
+            logger.info(f"Skipping Google Books: {e}")
+            query_string = BookService._fallback_query(params)
             
         except Exception as e:
             logger.error(f"Error in book search: {e}")
             # Try Open Library as last resort if Google Books fails
-            query_string = params.get('general_query', '') or \
-                          (params.get('title', '') + ' ' + params.get('author', '')).strip()
-            return await BookService.search_open_library(query_string) 
\ No newline at end of file
+            query_string = BookService._fallback_query(params)
+        
+        open_library_books = await BookService._timed_search('open_library', BookService.search_open_library(query_string))
+        if open_library_books:
+            _provider_stats['open_library']["wins"] += 1
+        return open_library_books
+    
+    @staticmethod
+    async def search_books(params):
+        """
+        Search for books in the local catalog first, then both APIs with Google Books as primary
+        
+        Concurrent calls with the same normalized parameters share one lookup.
+        
+        Args:
+            params (dict): Search parameters
+            
+        Returns:
+            list: Combined array of book data
+        """
+        return await _search_flight.do(BookService._normalize_params(params), BookService._search_and_remember, params)
+    
+    @staticmethod
+    async def _search_and_remember(params):
+        books, from_catalog = await BookService._search_books(params)
+        await BookService._remember_results(books, from_catalog)
+        return books
+    
+    @staticmethod
+    async def _search_books(params, rotate=True):
+        """
+        Search the local catalog, then the APIs, without prefetching covers or updating the catalog
+        
+        Args:
+            params (dict): Search parameters
+            rotate (bool): Advance the Google Books page rotation
+            
+        Returns:
+            tuple: Book records and whether they came from the local catalog
+        """
+        local_books = await BookService._timed_search('local_catalog', CatalogService.search(params))
+        if local_books:
+            _provider_stats['local_catalog']["wins"] += 1
+            return local_books, True
+        
+        if config.BOOK_SEARCH_FANOUT:
+            books = await BookService._search_books_fanout(params, rotate)
+        else:
+            books = await BookService._search_books_sequential(params, rotate)
+        return books, False
+    
+    @staticmethod
+    async def _remember_results(books, from_catalog):
+        """Prefetch the covers the cogs will display and keep API results in the catalog"""
+        # Warm the covers of the books the cogs will display while the reply is prepared
+        CoverService.prefetch(books[:3])
+        
+        # Remember everything we fetch so repeat lookups stay local
+        if not from_catalog:
+            await CatalogService.add_books(books)
+    
+    @staticmethod
+    def start_speculative_search(query):
+        """
+        Start searching for the raw query while it is still being parsed
+        
+        The search only begins once the caller yields to the event loop, so a
+        parse answered without awaiting anything never triggers it. It runs as
+        its own task outside the search coalescing, so discarding it cancels the
+        upstream requests, and it leaves the page rotation, cover cache and
+        catalog alone until resolve_speculative_search uses it.
+        
+        Args:
+            query (str): The user's unparsed query
+            
+        Returns:
+            dict: Handle for resolve_speculative_search, or None when disabled
+        """
+        if not config.SPECULATIVE_SEARCH:
+            return None
+        
+        speculation = {"started_at": None}
+        
+        async def search():
+            speculation["started_at"] = time.perf_counter()
+            _speculation_stats["started"] += 1
+            books, from_catalog = await BookService._search_books({'general_query': query}, rotate=False)
+            return books, from_catalog, time.perf_counter()
+        
+        speculation["task"] = asyncio.ensure_future(search())
+        return speculation
+    
+    @staticmethod
+    def discard_speculative_search(speculation):
+        """
+        Cancel a speculative search whose result will not be used
+        
+        Args:
+            speculation (dict): Handle from start_speculative_search, may be None
+        """
+        if speculation is None:
+            return
+        speculation["task"].cancel()
+        # Retrieve any error so an already failed search isn't reported as unhandled
+        speculation["task"].add_done_callback(lambda done: done.cancelled() or done.exception())
+    
+    @staticmethod
+    async def resolve_speculative_search(speculation, query, params):
+        """
+        Get the results for the parsed parameters, reusing the speculative search if equivalent
+        
+        Parsed parameters are equivalent when they carry no title, author or
+        genre and the same normalized query, which is also what a failed parse
+        returns. Otherwise the speculative search is cancelled and a normal
+        search runs. Parses resolved before the speculative search began, like
+        the rule-based fast path, count as neither hits nor misses, even when
+        its results are used.
+        
+        Args:
+            speculation (dict): Handle from start_speculative_search, may be None
+            query (str): The user's unparsed query
+            params (dict): Parsed search parameters
+            
+        Returns:
+            list: Array of Book records
+        """
+        if speculation is None:
+            return await BookService.search_books(params)
+        
+        parsed_at = time.perf_counter()
+        # A speculation that had not begun by the time the parse resolved saved nothing
+        overlapped = speculation["started_at"] is not None and speculation["started_at"] < parsed_at
+        raw_params = {'general_query': query}
+        if BookService._normalize_params(params) != BookService._normalize_params(raw_params):
+            if overlapped:
+                _speculation_stats["misses"] += 1
+            BookService.discard_speculative_search(speculation)
+            return await BookService.search_books(params)
+        
+        try:
+            books, from_catalog, search_finished = await speculation["task"]
+        except Exception as e:
+            logger.warning(f"Speculative search failed, searching again: {e}")
+            if overlapped:
+                _speculation_stats["misses"] += 1
+            return await BookService.search_books(params)
+        
+        # Now that the results are used, record the search as a normal one would
+        if not from_catalog:
+            BookService._next_start_index(BookService._normalize_params(raw_params))
+        await BookService._remember_results(books, from_catalog)
+        
+        # The part of the search that overlapped with parsing is the time saved
+        if overlapped:
+            _speculation_stats["hits"] += 1
+            _speculation_stats["latency_saved"] += max(0.0, min(parsed_at, search_finished) - speculation["started_at"])
+        return books
+    
+    @staticmethod
+    def get_speculation_stats():
+        """
+        Get speculative search counters
+        
+        Returns:
+            dict: Started speculations, hits, misses, hit rate and seconds saved
+        """
+        resolved = _speculation_stats["hits"] + _speculation_stats["misses"]
+        return {
+            "started": _speculation_stats["started"],
+            "hits": _speculation_stats["hits"],
+            "misses": _speculation_stats["misses"],
+            "hit_rate": _speculation_stats["hits"] / resolved if resolved else 0.0,
+            "latency_saved_seconds": round(_speculation_stats["latency_saved"], 2)
+        }
+    
+    @staticmethod
+    def get_coalescing_stats():
+        """
+        Get single-flight counters for book searches
+        
+        Returns:
+            dict: Calls, coalesced calls and coalescing ratio
+        """
+        return _search_flight.stats()
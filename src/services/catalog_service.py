@@ -0,0 +1,241 @@
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import sys
+import threading
+import time
+from src import config
+from src.models.book import Book
+
+logger = logging.getLogger('bookfinder.catalog')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(
+    id UNINDEXED,
+    title,
+    authors,
+    categories,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# One shared connection, serialized by a lock since queries run in worker threads
+_connection = None
+_lock = threading.Lock()
+
+def _connect():
+    global _connection
+    if _connection is None:
+        _connection = sqlite3.connect(config.CATALOG_DB_FILE, check_same_thread=False)
+        _connection.execute("PRAGMA journal_mode=WAL")
+        _connection.execute("PRAGMA synchronous=NORMAL")
+        _connection.executescript(SCHEMA)
+    return _connection
+
+def _normalize(text):
+    return " ".join(re.findall(r"\w+", str(text).casefold()))
+
+def _words(text):
+    return re.findall(r"\w+", str(text or ""))
+
+class CatalogService:
+    """Local SQLite FTS5 catalog of books previously fetched from the external APIs"""
+
+    @staticmethod
+    def _build_match(params):
+        """
+        Build an FTS5 match expression from the search parameters
+
+        The title and author must each appear as a phrase in their column,
+        with the last word matched as a prefix so partial titles such as
+        "harry pott" still hit, and every genre word must appear in the
+        categories. Queries
+        without a title or author are not answered locally.
+
+        Args:
+            params (dict): Search parameters
+
+        Returns:
+            str: FTS5 match expression, or None if the catalog should be skipped
+        """
+        terms = []
+        for field, column in (('title', 'title'), ('author', 'authors')):
+            words = _words(params.get(field))
+            if words:
+                terms.append(f'{column} : "{" ".join(words)}"*')
+        if not terms:
+            return None
+
+        genre_words = _words(params.get('genre') or params.get('categories'))
+        if genre_words:
+            terms.append("categories : (" + " AND ".join(f'"{word}"' for word in genre_words) + ")")
+
+        return " AND ".join(terms)
+
+    @staticmethod
+    def _search_sync(params, limit):
+        match = CatalogService._build_match(params)
+        if not match:
+            return None
+
+        # Books not refreshed within CATALOG_MAX_AGE no longer answer, so the APIs get asked again
+        oldest = time.time() - config.CATALOG_MAX_AGE if config.CATALOG_MAX_AGE > 0 else 0
+
+        with _lock:
+            rows = _connect().execute(
+                """
+                SELECT books.data FROM books_fts
+                JOIN books ON books.id = books_fts.id
+                WHERE books_fts MATCH ? AND books.updated_at >= ?
+                ORDER BY bm25(books_fts, 0.0, 10.0, 5.0, 1.0)
+                LIMIT ?
+                """,
+                (match, oldest, limit)
+            ).fetchall()
+
+        if not rows:
+            return None
+
+        books = [Book.from_dict(json.loads(row[0])) for row in rows]
+
+        # Confident when there are enough hits or the best hit is the exact title asked for
+        if len(books) >= config.CATALOG_MIN_RESULTS:
+            return books
+        if params.get('title') and _normalize(books[0].title) == _normalize(params['title']):
+            return books
+        return None
+
+    @staticmethod
+    def _upsert_sync(books):
+        rows = []
+        for book in books:
+            if not book or not book.id:
+                continue
+            rows.append((
+                book.id,
+                book.title or '',
+                ", ".join(book.authors),
+                ", ".join(book.categories),
+                json.dumps(book.to_dict(), ensure_ascii=False)
+            ))
+
+        if not rows:
+            return 0
+
+        now = time.time()
+        with _lock:
+            connection = _connect()
+            with connection:
+                connection.executemany("DELETE FROM books_fts WHERE id = ?", [(row[0],) for row in rows])
+                connection.executemany(
+                    "INSERT INTO books_fts (id, title, authors, categories) VALUES (?, ?, ?, ?)",
+                    [row[:4] for row in rows]
+                )
+                connection.executemany(
+                    "INSERT OR REPLACE INTO books (id, data, updated_at) VALUES (?, ?, ?)",
+                    [(row[0], row[4], now) for row in rows]
+                )
+        return len(rows)
+
+    @staticmethod
+    async def search(params, limit=10):
+        """
+        Look up books in the local catalog
+
+        Args:
+            params (dict): Search parameters
+            limit (int): Maximum number of books to return
+
+        Returns:
+            list: Book records, or None when the catalog has no confident match
+        """
+        if not config.CATALOG_ENABLED:
+            return None
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, CatalogService._search_sync, params, limit)
+        except Exception as e:
+            logger.error(f"Error searching local catalog: {e}")
+            return None
+
+    @staticmethod
+    async def add_books(books):
+        """
+        Add or refresh books in the local catalog
+
+        Args:
+            books (list): Book records as returned by BookService
+        """
+        if not config.CATALOG_ENABLED or not books:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, CatalogService._upsert_sync, list(books))
+        except Exception as e:
+            logger.error(f"Error adding books to local catalog: {e}")
+
+    @staticmethod
+    def bulk_import(path, batch_size=1000):
+        """
+        Preload the catalog from a dump file, for offline use
+
+        The dump is either a JSON array of book dicts or one book dict per line,
+        in the shape produced by Book.to_dict().
+
+        Args:
+            path (str): Path to the dump file
+            batch_size (int): Books written per transaction
+
+        Returns:
+            int: Number of books imported
+        """
+        with open(path, "r", encoding='utf-8') as f:
+            first_char = f.read(1)
+            f.seek(0)
+
+            if first_char == "[":
+                books = (Book.from_dict(data) for data in json.load(f))
+            else:
+                books = (Book.from_dict(json.loads(line)) for line in f if line.strip())
+
+            imported = 0
+            batch = []
+            for book in books:
+                batch.append(book)
+                if len(batch) >= batch_size:
+                    imported += CatalogService._upsert_sync(batch)
+                    batch = []
+            imported += CatalogService._upsert_sync(batch)
+
+        logger.info(f"Imported {imported} books into the local catalog from {path}")
+        return imported
+
+    @staticmethod
+    def close():
+        """Close the catalog database connection"""
+        global _connection
+        with _lock:
+            if _connection is not None:
+                _connection.close()
+                _connection = None
+
+if __name__ == "__main__":
+    # Usage: python -m src.services.catalog_service <dump.json|dump.jsonl> [...]
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m src.services.catalog_service <dump.json|dump.jsonl> [...]")
+        sys.exit(1)
+
+    for dump_path in sys.argv[1:]:
+        CatalogService.bulk_import(dump_path)
+    CatalogService.close()
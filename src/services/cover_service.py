@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from src import config
+from src.utils.cache import TTLCache
+from src.utils.http_client import http_client
+
+logger = logging.getLogger('bookfinder.covers')
+
+# Magic bytes of the image formats Discord can show as a thumbnail
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif')
+)
+
+# Open Library serves a tiny placeholder image for missing covers
+MIN_COVER_BYTES = 1024
+
+# Cached cover files ordered from least to most recently used: name -> size
+_index = None
+_total_bytes = 0
+
+# Cover URLs that failed validation recently, so they are neither refetched nor shown
+_missing = TTLCache(maxsize=2048, ttl=3600)
+
+# Running prefetch tasks keyed by cover URL
+_inflight = {}
+_semaphore = None
+_stats = {"hits": 0, "misses": 0, "fetched": 0, "rejected": 0, "evicted": 0}
+
+def _cache_key(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+def _image_extension(body):
+    """Return the file extension for a supported image, or None"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if body.startswith(signature):
+            return extension
+    if body[:4] == b'RIFF' and body[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+def _load_index():
+    """Build the index from the cache directory, oldest files first"""
+    global _index, _total_bytes
+    if _index is not None:
+        return _index
+
+    os.makedirs(config.COVER_CACHE_DIR, exist_ok=True)
+    entries = []
+    for name in os.listdir(config.COVER_CACHE_DIR):
+        path = os.path.join(config.COVER_CACHE_DIR, name)
+        if os.path.isfile(path) and not name.endswith('.tmp'):
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, name, stat.st_size))
+
+    _index = OrderedDict((name, size) for _, name, size in sorted(entries))
+    _total_bytes = sum(_index.values())
+    return _index
+
+def _find_cached(url):
+    """Return the cached file name for a cover URL, or None"""
+    index = _load_index()
+    key = _cache_key(url)
+    for extension in ('.jpg', '.png', '.gif', '.webp'):
+        if key + extension in index:
+            return key + extension
+    return None
+
+def _write_file(path, body):
+    temp_path = path + '.tmp'
+    with open(temp_path, "wb") as f:
+        f.write(body)
+    os.replace(temp_path, path)
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+class CoverService:
+    """Prefetches book cover thumbnails into a size-bounded local disk cache"""
+
+    @staticmethod
+    def get_cached_path(book):
+        """
+        Get the local file for a book's cover if it has been cached
+
+        Args:
+            book (Book): The book
+
+        Returns:
+            str: Path to the cover image, or None if it is not cached
+        """
+        if not config.COVER_CACHE_ENABLED or not book.thumbnail:
+            return None
+
+        name = _find_cached(book.thumbnail)
+        if name is None:
+            _stats["misses"] += 1
+            return None
+
+        _index.move_to_end(name)
+        _stats["hits"] += 1
+        return os.path.join(config.COVER_CACHE_DIR, name)
+
+    @staticmethod
+    def is_missing(book):
+        """
+        Check whether a book's cover URL recently failed to load or validate
+
+        Args:
+            book (Book): The book
+
+        Returns:
+            bool: True if the cover should not be shown
+        """
+        return bool(book.thumbnail) and _missing.get(book.thumbnail) is not None
+
+    @staticmethod
+    def prefetch(books):
+        """
+        Start downloading the covers of the given books in the background
+
+        Args:
+            books (list): Book records whose thumbnails should be cached
+        """
+        if not config.COVER_CACHE_ENABLED:
+            return
+
+        for book in books or []:
+            url = book.thumbnail
+            if not url or url in _inflight or _missing.get(url) is not None or _find_cached(url):
+                continue
+
+            task = asyncio.ensure_future(CoverService._fetch(url))
+            _inflight[url] = task
+            task.add_done_callback(lambda done, url=url: _inflight.pop(url, None))
+
+    @staticmethod
+    async def _fetch(url):
+        global _semaphore, _total_bytes
+        if _semaphore is None:
+            _semaphore = asyncio.Semaphore(config.COVER_PREFETCH_CONCURRENCY)
+
+        try:
+            async with _semaphore:
+                content_type, body = await http_client.get_bytes(
+                    url,
+                    timeout=config.COVER_FETCH_TIMEOUT,
+                    max_bytes=config.COVER_MAX_BYTES
+                )
+
+            extension = _image_extension(body)
+            if not content_type.startswith('image/') or extension is None or len(body) < MIN_COVER_BYTES:
+                _stats["rejected"] += 1
+                _missing.set(url, True)
+                logger.info(f"Rejected cover {url} ({content_type}, {len(body)} bytes)")
+                return
+
+            index = _load_index()
+            name = _cache_key(url) + extension
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, _write_file, os.path.join(config.COVER_CACHE_DIR, name), body)
+
+            _total_bytes += len(body) - index.pop(name, 0)
+            index[name] = len(body)
+            _stats["fetched"] += 1
+
+            # Evict least recently used covers once over the size budget
+            victims = []
+            while _total_bytes > config.COVER_CACHE_MAX_BYTES and len(index) > 1:
+                victim, size = index.popitem(last=False)
+                _total_bytes -= size
+                victims.append(os.path.join(config.COVER_CACHE_DIR, victim))
+            if victims:
+                _stats["evicted"] += len(victims)
+                await loop.run_in_executor(None, _remove_files, victims)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _missing.set(url, True)
+            logger.warning(f"Could not prefetch cover {url}: {e}")
+
+    @staticmethod
+    def get_stats():
+        """
+        Get cover cache counters
+
+        Returns:
+            dict: Hits, misses, fetch/reject/evict counts and current disk usage
+        """
+        index = _load_index()
+        return {**_stats, "files": len(index), "bytes": _total_bytes, "in_flight": len(_inflight)}
+
+    @staticmethod
+    async def close():
+        """Cancel covers that are still being prefetched"""
+        tasks = list(_inflight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
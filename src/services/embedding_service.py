@@ -0,0 +1,131 @@
+import logging
+import re
+import threading
+import unicodedata
+import zlib
+import numpy as np
+from src import config
+
+logger = logging.getLogger('bookfinder.embeddings')
+
+WORD = re.compile(r"\w+")
+
+class HashingEmbedder:
+    """Offline embedder hashing words and character trigrams into a fixed number of dimensions"""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        text = unicodedata.normalize('NFKD', text.casefold())
+        text = "".join(char for char in text if not unicodedata.combining(char))
+        for word in WORD.findall(text):
+            yield word, 1.0
+            # Trigrams let inflections and Swedish compounds share dimensions ("fantasy" / "fantasyböcker")
+            padded = f"#{word}#"
+            for start in range(len(padded) - 2):
+                yield padded[start:start + 3], 0.5
+
+    def embed(self, texts):
+        """
+        Embed texts
+
+        Args:
+            texts (list): Texts to embed
+
+        Returns:
+            numpy.ndarray: One unit vector per text, zero for texts without words
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                # crc32 is stable across processes, unlike hash()
+                digest = zlib.crc32(feature.encode('utf-8'))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self.dim] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+class SentenceTransformerEmbedder:
+    """Local neural embedder using a sentence-transformers model from the local cache"""
+
+    def __init__(self, model):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model)
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers:{model}"
+
+    def embed(self, texts):
+        return np.asarray(self._model.encode(list(texts), normalize_embeddings=True), dtype=np.float32)
+
+class OpenAIEmbedder:
+    """Embedder calling the OpenAI embeddings API, which needs network access"""
+
+    DIMENSIONS = {"text-embedding-3-small": 1536, "text-embedding-3-large": 3072, "text-embedding-ada-002": 1536}
+
+    def __init__(self, model):
+        import openai
+
+        # Embedding runs in worker threads, so this uses the synchronous client
+        self._client = openai.OpenAI(api_key=config.OPENAI_API_KEY, base_url=config.OPENAI_BASE_URL)
+        self._model = model
+        self.dim = self.DIMENSIONS.get(model, 1536)
+        self.name = f"openai:{model}"
+
+    def embed(self, texts):
+        response = self._client.embeddings.create(model=self._model, input=list(texts))
+        return np.asarray([item.embedding for item in response.data], dtype=np.float32)
+
+# Default model per backend when EMBEDDING_MODEL is unset
+DEFAULT_MODELS = {"sentence-transformers": "all-MiniLM-L6-v2", "openai": "text-embedding-3-small"}
+
+_embedder = None
+_lock = threading.Lock()
+
+class EmbeddingService:
+    """Text embeddings from the backend chosen by EMBEDDING_BACKEND"""
+
+    @staticmethod
+    def get_embedder():
+        """
+        Get the configured embedder, loading it on first use
+
+        An unknown backend, or one whose package or model is unavailable, falls
+        back to the hashing embedder so retrieval keeps working offline.
+
+        Returns:
+            Embedder with name, dim and embed(texts)
+        """
+        global _embedder
+        with _lock:
+            if _embedder is None:
+                backend = config.EMBEDDING_BACKEND
+                model = config.EMBEDDING_MODEL or DEFAULT_MODELS.get(backend)
+                try:
+                    if backend == "sentence-transformers":
+                        _embedder = SentenceTransformerEmbedder(model)
+                    elif backend == "openai":
+                        _embedder = OpenAIEmbedder(model)
+                    elif backend != "hashing":
+                        raise ValueError(f"unknown embedding backend {backend!r}")
+                except Exception as e:
+                    logger.warning(f"Could not load {backend} embeddings, using hashing embeddings: {e}")
+                if _embedder is None:
+                    _embedder = HashingEmbedder(config.EMBEDDING_DIM)
+                logger.info(f"Using {_embedder.name} embeddings")
+            return _embedder
+
+    @staticmethod
+    def embed(texts):
+        """
+        Embed texts with the configured backend (blocking, run it in a worker thread)
+
+        Args:
+            texts (list): Texts to embed
+
+        Returns:
+            numpy.ndarray: One vector per text
+        """
+        return EmbeddingService.get_embedder().embed(texts)
@@ -0,0 +1,561 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from src import config
+
+logger = logging.getLogger('bookfinder.interactions')
+
+# Bumped when the index layout changes; an older index is rebuilt from the log
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    user_id TEXT NOT NULL,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    command TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_user ON entries (user_id, segment, offset);
+CREATE INDEX IF NOT EXISTS entries_position ON entries (segment, offset);
+CREATE TABLE IF NOT EXISTS tombstones (
+    user_id TEXT PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirty_segments (
+    segment INTEGER PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value NOT NULL
+);
+"""
+
+TOMBSTONE = "tombstone"
+
+class InteractionStore:
+    """Segmented append-only JSONL interaction log with a SQLite index of each user's entries and usage counters"""
+
+    def __init__(self, log_path, index_path, segment_bytes=8 * 1024 * 1024, fsync="batch", fsync_interval=5.0):
+        """
+        Args:
+            log_path (str): Base name of the log; segments are "<log_path>.000001" and so on
+            index_path (str): SQLite file holding the per-user index, tombstones and counters
+            segment_bytes (int): Size at which the active segment is sealed and a new one started
+            fsync (str): "batch" to fsync every appended batch, "interval" to fsync at most
+                every fsync_interval seconds, "never" to leave it to the OS
+            fsync_interval (float): Seconds between fsyncs with the "interval" policy
+        """
+        self.log_path = log_path
+        self.index_path = index_path
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._last_fsync = 0.0
+        self._active = None
+        self._connection = None
+        self._lock = threading.RLock()
+        self._compaction = {"segments_compacted": 0, "records_purged": 0, "bytes_reclaimed": 0, "last_run": None}
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.index_path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+            migrate = (self._meta("schema_version") or 0) < SCHEMA_VERSION
+            if migrate:
+                self._connection.executescript("DROP TABLE IF EXISTS entries; DROP TABLE IF EXISTS counters;")
+                self._migrate()
+            self._connection.executescript(SCHEMA)
+
+            # A sealed segment may have no file yet if nothing was appended since
+            segments = self._segments()
+            self._active = max(segments[-1] if segments else 1, self._meta("indexed_segment") or 1)
+            self._catch_up(reset=migrate)
+        return self._connection
+
+    def open(self):
+        """Open the index, migrating an old log and indexing any lines it doesn't cover yet"""
+        with self._lock:
+            self._connect()
+
+    def _migrate(self):
+        """Turn a single-file log from before segmentation into the first segment"""
+        if os.path.exists(self.log_path) and not self._segments():
+            os.replace(self.log_path, self._segment_path(1))
+            logger.info(f"Moved {self.log_path} to the first log segment {self._segment_path(1)}")
+        with self._connection:
+            self._set_meta("schema_version", SCHEMA_VERSION)
+
+    def _meta(self, key):
+        row = self._connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _set_position(self, segment, offset):
+        """Record that the index covers the log up to this offset of this segment"""
+        self._set_meta("indexed_segment", segment)
+        self._set_meta("indexed_bytes", offset)
+
+    def _segment_path(self, segment):
+        return f"{self.log_path}.{segment:06d}"
+
+    def _segments(self):
+        """List the segment numbers on disk, oldest first"""
+        directory = os.path.dirname(self.log_path) or "."
+        if not os.path.isdir(directory):
+            return []
+        pattern = re.compile(re.escape(os.path.basename(self.log_path)) + r"\.(\d{6})$")
+        return sorted(int(match.group(1)) for match in map(pattern.match, os.listdir(directory)) if match)
+
+    def _catch_up(self, reset=False):
+        """
+        Index log lines written after the last indexed position
+
+        Normally this only picks up lines whose index rows were lost, e.g. to a
+        crash between the append and the index write. With reset, or when the
+        log no longer matches the index, everything is indexed from scratch.
+        """
+        segment = self._meta("indexed_segment") or 0
+        start = self._meta("indexed_bytes") or 0
+        segments = self._segments()
+
+        if not reset and segment in segments and start > os.path.getsize(self._segment_path(segment)):
+            # The log was replaced behind our back, so the offsets are meaningless
+            logger.warning(f"Interaction log {self.log_path} shrank below its index, rebuilding the index")
+            reset = True
+        if reset:
+            segment, start = 0, 0
+
+        indexed = 0
+        for number in [number for number in segments if number >= segment]:
+            offset = start if number == segment else 0
+            rows = []
+            with open(self._segment_path(number), "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Partially written last line
+                    row = self._row(line, number, offset)
+                    if row is not None:
+                        rows.append(row)
+                    offset += len(line)
+            self._index(rows, number, offset, reset=reset)
+            reset = False
+            indexed += len(rows)
+
+        if reset:
+            # No segments on disk at all
+            self._index([], self._active, 0, reset=True)
+        if indexed:
+            logger.info(f"Indexed {indexed} interaction log lines from {self.log_path}")
+
+    @staticmethod
+    def _row(line, segment, offset):
+        """Build the index row of a log line, or None for a malformed line"""
+        try:
+            entry = json.loads(line)
+            kind = TOMBSTONE if entry.get("type") == TOMBSTONE else "record"
+            return (kind, str(entry["user_id"]), segment, offset, len(line), entry.get("command", "unknown"), entry.get("timestamp"))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def _index(self, rows, segment, end, reset=False):
+        """
+        Add log lines to the index and the usage counters in one transaction
+
+        Args:
+            rows (list): (kind, user_id, segment, offset, length, command, timestamp) per line
+            segment (int): Segment the lines were appended to
+            end (int): Offset in that segment up to which the index is complete
+            reset (bool): Replace the index, tombstones and counters instead of adding to them
+
+        Returns:
+            int: Records hidden by tombstones among the lines
+        """
+        connection = self._connection
+        hidden = 0
+        with connection:
+            if reset:
+                for table in ("entries", "tombstones", "dirty_segments", "counters"):
+                    connection.execute(f"DELETE FROM {table}")
+
+            # Records are added in runs; a tombstone hides everything indexed before it
+            records = []
+            for row in rows:
+                if row[0] == TOMBSTONE:
+                    self._add_records(records)
+                    records = []
+                    hidden += self._add_tombstone(row[1], row[2], row[3])
+                else:
+                    records.append(row)
+            self._add_records(records)
+
+            self._set_position(segment, end)
+        return hidden
+
+    def _add_records(self, records):
+        connection = self._connection
+        new_users = [
+            user_id for user_id in {row[1] for row in records}
+            if connection.execute("SELECT 1 FROM entries WHERE user_id = ? LIMIT 1", (user_id,)).fetchone() is None
+        ]
+        connection.executemany(
+            "INSERT INTO entries (user_id, segment, offset, length, command) VALUES (?, ?, ?, ?, ?)",
+            [row[1:6] for row in records]
+        )
+
+        increments = Counter({"total": len(records), "users": len(new_users)})
+        increments.update(f"command:{row[5]}" for row in records)
+        self._add_counters(increments)
+        if records:
+            connection.execute(
+                "INSERT OR REPLACE INTO counters (name, value) VALUES ('last_activity', ?)",
+                (records[-1][6],)
+            )
+
+    def _add_tombstone(self, user_id, segment, offset):
+        """Hide a user's records logged before the tombstone and mark their segments for compaction"""
+        connection = self._connection
+        before = "user_id = ? AND (segment < ? OR (segment = ? AND offset < ?))"
+        arguments = (user_id, segment, segment, offset)
+
+        commands = connection.execute(f"SELECT command, COUNT(*) FROM entries WHERE {before} GROUP BY command", arguments).fetchall()
+        segments = connection.execute(f"SELECT DISTINCT segment FROM entries WHERE {before}", arguments).fetchall()
+        connection.execute(f"DELETE FROM entries WHERE {before}", arguments)
+
+        connection.execute(
+            "INSERT OR REPLACE INTO tombstones (user_id, segment, offset) VALUES (?, ?, ?)",
+            (user_id, segment, offset)
+        )
+        # The tombstone's own segment is compacted too, which purges the tombstone itself
+        connection.executemany(
+            "INSERT OR IGNORE INTO dirty_segments (segment) VALUES (?)",
+            segments + [(segment,)]
+        )
+
+        hidden = sum(count for _, count in commands)
+        decrements = Counter({"total": -hidden})
+        for command, count in commands:
+            decrements[f"command:{command}"] -= count
+        if hidden and connection.execute("SELECT 1 FROM entries WHERE user_id = ? LIMIT 1", (user_id,)).fetchone() is None:
+            decrements["users"] -= 1
+        self._add_counters(decrements)
+        if hidden:
+            self._reset_last_activity()
+        return hidden
+
+    def _reset_last_activity(self):
+        """Point last_activity at the newest interaction left after a deletion, or clear it if none is"""
+        connection = self._connection
+        newest = connection.execute(
+            "SELECT segment, offset, length FROM entries ORDER BY segment DESC, offset DESC LIMIT 1"
+        ).fetchall()
+        entry = self._read(newest)[0] if newest else None
+        if entry and entry.get("timestamp"):
+            connection.execute(
+                "INSERT OR REPLACE INTO counters (name, value) VALUES ('last_activity', ?)",
+                (entry["timestamp"],)
+            )
+        else:
+            connection.execute("DELETE FROM counters WHERE name = 'last_activity'")
+
+    def _add_counters(self, increments):
+        self._connection.executemany(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value",
+            increments.items()
+        )
+
+    def append_many(self, entries):
+        """
+        Append interactions to the active segment with one write and index them in one transaction
+
+        Args:
+            entries (list): Interactions, each with at least a user_id
+
+        Returns:
+            int: Records hidden by tombstones among the entries
+        """
+        lines = [(json.dumps(entry, ensure_ascii=False) + "\n").encode('utf-8') for entry in entries]
+        if not lines:
+            return 0
+
+        with self._lock:
+            self._connect()
+            path = self._segment_path(self._active)
+            if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+                self._active += 1
+                path = self._segment_path(self._active)
+
+            with open(path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(b"".join(lines))
+                f.flush()
+                self._sync(f)
+
+            rows = []
+            for line in lines:
+                rows.append(self._row(line, self._active, offset))
+                offset += len(line)
+            return self._index(rows, self._active, offset)
+
+    def _sync(self, f):
+        """Fsync the log according to the fsync policy"""
+        now = time.monotonic()
+        if self.fsync == "batch" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval):
+            os.fsync(f.fileno())
+            self._last_fsync = now
+
+    def recent(self, user_id, limit=10):
+        """
+        Get a user's most recent interactions without scanning the log
+
+        Args:
+            user_id (str): Discord user ID
+            limit (int): Maximum number of entries to return
+
+        Returns:
+            list: Interactions, oldest first
+        """
+        user_id = str(user_id)
+
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT segment, offset, length FROM entries WHERE user_id = ? "
+                "ORDER BY segment DESC, offset DESC LIMIT ?",
+                (user_id, limit)
+            ).fetchall()
+
+            entries = self._read(reversed(rows))
+            if any(not entry or str(entry.get("user_id")) != user_id for entry in entries):
+                # The log was edited without updating the index
+                logger.warning(f"Stale interaction index for {self.log_path}, rebuilding it")
+                self.rebuild()
+                return self.recent(user_id, limit)
+
+        return entries
+
+    def _read(self, rows):
+        """Read and decode the log lines at (segment, offset, length) positions, None where unreadable"""
+        entries = []
+        files = {}
+        try:
+            for segment, offset, length in rows:
+                if segment not in files:
+                    files[segment] = open(self._segment_path(segment), "rb")
+                files[segment].seek(offset)
+                try:
+                    entries.append(json.loads(files[segment].read(length)))
+                except ValueError:
+                    entries.append(None)
+        finally:
+            for f in files.values():
+                f.close()
+        return entries
+
+    def scan(self, page_size=500):
+        """
+        Iterate over every interaction that has not been deleted, oldest first
+
+        The lock is only held while a page is read, so appends and reads carry on
+        during a long scan.
+
+        Args:
+            page_size (int): Interactions read per page
+
+        Yields:
+            list: The interactions of one page
+        """
+        position = (0, -1)
+        while True:
+            with self._lock:
+                rows = self._connect().execute(
+                    "SELECT segment, offset, length FROM entries WHERE (segment, offset) > (?, ?) "
+                    "ORDER BY segment, offset LIMIT ?",
+                    (*position, page_size)
+                ).fetchall()
+                if not rows:
+                    return
+                page = [entry for entry in self._read(rows) if entry]
+            position = rows[-1][:2]
+            yield page
+
+    def delete_user(self, user_id):
+        """
+        Delete a user's interactions by appending a tombstone
+
+        Reads stop returning the user's earlier interactions at once; the records
+        are purged from disk when compact() rewrites the segments holding them.
+
+        Args:
+            user_id (str): Discord user ID
+
+        Returns:
+            int: Number of interactions deleted
+        """
+        tombstone = {"type": TOMBSTONE, "user_id": str(user_id), "timestamp": datetime.now().isoformat()}
+        return self.append_many([tombstone])
+
+    def compact(self):
+        """
+        Purge tombstoned records from the oldest segment that has any
+
+        Each call holds the lock only while one segment is rewritten. A dirty
+        active segment is sealed first, so appends move on to a new segment.
+
+        Returns:
+            bool: Whether a segment was compacted, False when nothing is left to purge
+        """
+        with self._lock:
+            connection = self._connect()
+            dirty = [row[0] for row in connection.execute("SELECT segment FROM dirty_segments ORDER BY segment")]
+            if not dirty:
+                return False
+
+            segment = dirty[0]
+            if segment >= self._active:
+                self._active += 1
+                with connection:
+                    self._set_position(self._active, 0)
+
+            self._compact_segment(segment)
+            logger.info(f"Compacted interaction log segment {segment}, {len(dirty) - 1} segments left to compact")
+            return True
+
+    def _compact_segment(self, segment):
+        """Rewrite a sealed segment without tombstoned records and tombstones, then reindex it"""
+        connection = self._connection
+        path = self._segment_path(segment)
+        tombstones = {row[0]: (row[1], row[2]) for row in connection.execute("SELECT user_id, segment, offset FROM tombstones")}
+
+        rows = []
+        purged = 0
+        purged_tombstones = []
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+
+        if old_size:
+            temp_path = path + ".tmp"
+            with open(path, "rb") as source, open(temp_path, "wb") as target:
+                offset = 0
+                for line in source:
+                    row = self._row(line, segment, target.tell())
+                    position = (segment, offset)
+                    offset += len(line)
+
+                    if row is not None and row[0] == TOMBSTONE:
+                        # Older segments are compacted first, so nothing it hides is left before it
+                        if tombstones.get(row[1]) == position:
+                            purged_tombstones.append(row[1])
+                        continue
+                    if row is not None and row[1] in tombstones and position < tombstones[row[1]]:
+                        purged += 1
+                        continue
+
+                    if row is not None:
+                        rows.append(row[1:6])
+                    target.write(line)
+                target.flush()
+                os.fsync(target.fileno())
+
+            if os.path.getsize(temp_path):
+                os.replace(temp_path, path)
+            else:
+                os.remove(temp_path)
+                os.remove(path)
+
+        with connection:
+            connection.execute("DELETE FROM entries WHERE segment = ?", (segment,))
+            connection.executemany(
+                "INSERT INTO entries (user_id, segment, offset, length, command) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            connection.executemany("DELETE FROM tombstones WHERE user_id = ?", [(user_id,) for user_id in purged_tombstones])
+            connection.execute("DELETE FROM dirty_segments WHERE segment = ?", (segment,))
+
+        new_size = os.path.getsize(path) if os.path.exists(path) else 0
+        self._compaction["segments_compacted"] += 1
+        self._compaction["records_purged"] += purged
+        self._compaction["bytes_reclaimed"] += old_size - new_size
+        self._compaction["last_run"] = time.time()
+
+    def compaction_stats(self):
+        """
+        Get compaction progress
+
+        Returns:
+            dict: Segments on disk, segments still holding tombstoned records, pending
+                tombstones, and segments compacted, records purged and bytes reclaimed so far
+        """
+        with self._lock:
+            connection = self._connect()
+            pending = connection.execute("SELECT COUNT(*) FROM dirty_segments").fetchone()[0]
+            tombstones = connection.execute("SELECT COUNT(*) FROM tombstones").fetchone()[0]
+            segments = len(self._segments())
+
+        return {"segments": segments, "pending_segments": pending, "tombstones": tombstones, **self._compaction}
+
+    def summary(self):
+        """
+        Get the usage counters kept up to date by every append and deletion
+
+        Returns:
+            dict: Total interactions, unique users, interactions per command and
+                the timestamp of the last interaction
+        """
+        with self._lock:
+            counters = dict(self._connect().execute("SELECT name, value FROM counters").fetchall())
+
+        return {
+            "total_interactions": counters.get("total", 0),
+            "unique_users": counters.get("users", 0),
+            "commands": {
+                name[len("command:"):]: value for name, value in counters.items() if name.startswith("command:") and value
+            },
+            "last_activity": counters.get("last_activity")
+        }
+
+    def rebuild(self):
+        """Drop the index, tombstones and counters and rebuild them from the log"""
+        with self._lock:
+            self._connect()
+            self._catch_up(reset=True)
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+if __name__ == "__main__":
+    # Usage: python -m src.services.interaction_store rebuild|compact
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if len(sys.argv) != 2 or sys.argv[1] not in ("rebuild", "compact"):
+        print("Usage: python -m src.services.interaction_store rebuild|compact")
+        sys.exit(1)
+
+    store = InteractionStore(
+        config.INTERACTION_LOG_FILE,
+        config.INTERACTION_INDEX_FILE,
+        segment_bytes=config.INTERACTION_SEGMENT_BYTES
+    )
+    if sys.argv[1] == "rebuild":
+        store.rebuild()
+    else:
+        while store.compact():
+            pass
+        print(store.compaction_stats())
+    store.close()
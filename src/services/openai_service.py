@@ -1,58 +1,777 @@
+import asyncio
+import httpx
 import openai
 import json
 import logging
+import re
+import time
+import unicodedata
 from src import config
+from src.services.query_parser import QueryParser
+from src.utils.cache import PersistentTTLCache, TTLCache
+from src.utils.metrics import LatencyStats
+from src.utils.resilience import CircuitBreaker
+from src.utils.scheduler import (
+    BACKGROUND, GENERATION, INTERACTIVE, DeadlineExceeded, PriorityScheduler, SchedulerRejected,
+    current_deadline, interaction_deadline
+)
+from src.utils.singleflight import SingleFlight
+from src.utils.tokens import (
+    count_message_tokens, count_tokens, fit_texts, load_encodings_in_background, strip_markup, truncate_to_tokens
+)
 
 logger = logging.getLogger('bookfinder.openai')
 
-# Configure OpenAI
-client = openai.OpenAI(api_key=config.OPENAI_API_KEY)
+# Configure OpenAI with a shared keep-alive connection pool
+client = openai.AsyncOpenAI(
+    api_key=config.OPENAI_API_KEY,
+    base_url=config.OPENAI_BASE_URL,
+    timeout=config.OPENAI_TIMEOUT,
+    max_retries=config.OPENAI_MAX_RETRIES,
+    http_client=httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config.OPENAI_POOL_SIZE,
+            max_keepalive_connections=config.OPENAI_POOL_SIZE
+        )
+    )
+)
+
+# Bounds concurrent completions; waiting calls are admitted by priority and dropped once their deadline passes
+_scheduler = PriorityScheduler(config.OPENAI_MAX_CONCURRENCY, {
+    INTERACTIVE: config.LLM_QUEUE_LIMIT_INTERACTIVE,
+    GENERATION: config.LLM_QUEUE_LIMIT_GENERATION,
+    BACKGROUND: config.LLM_QUEUE_LIMIT_BACKGROUND
+})
+
+# Clients retry internally; a model that has a fallback fails over instead of retrying
+_failover_client = client.with_options(max_retries=0)
+
+# Per-model circuit breaker plus latency and error counters, created on first use
+_model_health = {}
+
+# Query parsing blocks every /findbook reply, so it jumps ahead of longer generations
+CALL_PRIORITIES = {
+    "parse": INTERACTIVE,
+    "enhance": GENERATION,
+    "recommend": GENERATION,
+    "repair": GENERATION
+}
+
+# Identical concurrent parse/enhance calls share one completion
+_parse_flight = SingleFlight()
+_enhance_flight = SingleFlight()
+
+# Parsed search parameters (and refusals) by query fingerprint, kept across restarts
+_parse_cache = PersistentTTLCache(config.PARSE_CACHE_FILE, maxsize=config.PARSE_CACHE_SIZE, ttl=config.PARSE_CACHE_TTL)
+
+# Enhanced responses by (query fingerprint, top book IDs, prompt version), each
+# holding up to ENHANCE_CACHE_VARIANTS texts that are served in rotation
+ENHANCE_PROMPT_VERSION = 1
+_enhance_cache = TTLCache(maxsize=config.ENHANCE_CACHE_SIZE, ttl=config.ENHANCE_CACHE_TTL)
+_enhance_cache_stats = {"hits": 0, "misses": 0}
+
+# Returned instead of a completion while the API reports quota limits
+QUOTA_FALLBACK_MESSAGE = "I'm experiencing API quota limits, but I'll still search for books using the book databases."
+
+# Rule-based parsing hits versus completions actually spent on parsing
+_fast_path_stats = {"attempts": 0, "hits": 0}
+_fast_parse_latency = LatencyStats()
+_llm_parse_latency = LatencyStats()
+
+def _query_fingerprint(query):
+    """
+    Normalize a query so trivially different spellings share cache entries
+    
+    Case, Unicode compatibility forms, punctuation and whitespace are folded.
+    Letters such as å/ä/ö are kept since refusals answer in the query's language.
+    """
+    text = unicodedata.normalize('NFKC', str(query)).casefold()
+    return " ".join(re.findall(r"\w+", text))
+
+async def _parse_cache_call(method, *args):
+    """Run a parse cache operation off the event loop, treating cache errors as misses"""
+    if not config.PARSE_CACHE_ENABLED:
+        return None
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, method, *args)
+    except Exception as e:
+        logger.error(f"Error accessing parse cache: {e}")
+        return None
+
+# Shape of the single structured /recommend completion
+RECOMMENDATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "message": {"type": "string", "description": "Conversational recommendation text shown to the user"},
+        "books": {
+            "type": "array",
+            "maxItems": 5,
+            "items": {
+                "type": "object",
+                "properties": {"title": {"type": "string"}, "author": {"type": "string"}},
+                "required": ["title", "author"]
+            }
+        }
+    },
+    "required": ["message", "books"]
+}
+
+# Outcome counters of structured recommendation calls
+_recommend_stats = {"calls": 0, "valid": 0, "repaired_locally": 0, "repaired_by_model": 0, "fallbacks": 0}
+
+JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+def _partial_json_string(raw, key):
+    """
+    Decode the value of a string field from a possibly incomplete JSON document
+    
+    Used to show the recommendation text while the rest of the object streams in.
+    
+    Args:
+        raw (str): JSON text received so far
+        key (str): Name of the string field
+        
+    Returns:
+        str: The decoded value so far, empty if the field has not started
+    """
+    match = re.search(r'"' + re.escape(key) + r'"\s*:\s*"', raw)
+    if not match:
+        return ""
+    
+    decoded = []
+    index = match.end()
+    while index < len(raw):
+        char = raw[index]
+        if char == '"':
+            break
+        if char != '\\':
+            decoded.append(char)
+            index += 1
+            continue
+        
+        # Stop at an escape sequence that has not fully arrived yet
+        if index + 1 >= len(raw):
+            break
+        escape = raw[index + 1]
+        if escape == 'u':
+            digits = raw[index + 2:index + 6]
+            if len(digits) < 4:
+                break
+            try:
+                decoded.append(chr(int(digits, 16)))
+            except ValueError:
+                pass
+            index += 6
+        else:
+            decoded.append(JSON_ESCAPES.get(escape, escape))
+            index += 2
+    return "".join(decoded)
+
+def _extract_json_object(raw):
+    """Parse the outermost JSON object in a completion, ignoring code fences and surrounding prose"""
+    start = raw.find('{')
+    end = raw.rfind('}')
+    if start == -1 or end <= start:
+        raise ValueError("no JSON object found")
+    return json.loads(raw[start:end + 1])
+
+def _validate_recommendation(data):
+    """
+    Check a parsed completion against RECOMMENDATION_SCHEMA
+    
+    Book entries without a title are dropped rather than failing the whole answer.
+    
+    Args:
+        data: Parsed JSON value
+        
+    Returns:
+        dict: Normalized {"message": str, "books": [{"title", "author"}]}
+        
+    Raises:
+        ValueError: If the message or the books list is missing or malformed
+    """
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    
+    message = data.get("message")
+    if not isinstance(message, str) or not message.strip():
+        raise ValueError("'message' must be a non-empty string")
+    
+    books = data.get("books", [])
+    if not isinstance(books, list):
+        raise ValueError("'books' must be an array")
+    
+    valid_books = []
+    for book in books[:RECOMMENDATION_SCHEMA["properties"]["books"]["maxItems"]]:
+        if not isinstance(book, dict) or not isinstance(book.get("title"), str) or not book["title"].strip():
+            logger.warning(f"Dropping malformed recommended book: {book}")
+            continue
+        author = book.get("author")
+        valid_books.append({
+            "title": book["title"].strip(),
+            "author": author.strip() if isinstance(author, str) else ""
+        })
+    
+    return {"message": message.strip(), "books": valid_books}
+
+def _grounding_text(context):
+    """
+    Format retrieved past searches and known books for the recommendation prompt
+    
+    Args:
+        context (dict): Output of RAGService.retrieve_context
+        
+    Returns:
+        str: Prompt section within RECOMMEND_CONTEXT_BUDGET tokens, empty if nothing was retrieved
+    """
+    searches = []
+    for interaction in context.get("interactions", []):
+        line = f'- "{interaction["query"]}"'
+        if interaction.get("books"):
+            line += f" (found: {'; '.join(interaction['books'])})"
+        searches.append(line)
+    
+    books = []
+    for book in context.get("books", []):
+        line = f"- {book['title']} by {', '.join(book['authors']) or 'unknown author'}"
+        if book.get("categories"):
+            line += f" ({', '.join(book['categories'])})"
+        books.append(line)
+    
+    if not searches and not books:
+        return ""
+    
+    # Each line keeps its share of the budget; short lines pass theirs on
+    lines = fit_texts(searches + books, config.RECOMMEND_CONTEXT_BUDGET, config.AI_MODEL, min_tokens=10)
+    sections = []
+    if searches:
+        sections.append("Their related past searches:\n" + "\n".join(lines[:len(searches)]))
+    if books:
+        sections.append("Related books known to exist:\n" + "\n".join(lines[len(searches):]))
+    return "\n\n".join(sections)
+
+# Prompt and completion tokens spent per call type
+_token_usage = {}
+
+def _record_usage(call_type, prompt_tokens, completion_tokens, estimated=False):
+    usage = _token_usage.setdefault(call_type, {
+        "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated_calls": 0
+    })
+    usage["calls"] += 1
+    usage["prompt_tokens"] += prompt_tokens
+    usage["completion_tokens"] += completion_tokens
+    if estimated:
+        usage["estimated_calls"] += 1
+    logger.debug(f"{call_type} call used {prompt_tokens} prompt + {completion_tokens} completion tokens")
+
+def _messages(prompt, system_prompt):
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+
+def _enhance_key(books, user_query):
+    return (
+        _query_fingerprint(user_query),
+        tuple(book.id or book.title for book in (books or [])[:3]),
+        ENHANCE_PROMPT_VERSION
+    )
+
+def _cached_enhancement(key):
+    """
+    Serve the next cached variant for an enhancement, once all variants exist
+    
+    Returns:
+        str: A cached response, or None if a new completion should be made
+    """
+    entry = _enhance_cache.get(key) if config.ENHANCE_CACHE_ENABLED else None
+    if entry is None or len(entry["variants"]) < config.ENHANCE_CACHE_VARIANTS:
+        _enhance_cache_stats["misses"] += 1
+        return None
+    
+    _enhance_cache_stats["hits"] += 1
+    text = entry["variants"][entry["next"] % len(entry["variants"])]
+    entry["next"] += 1
+    return text
+
+def _store_enhancement(key, text):
+    """Add a completed enhancement as a cached variant"""
+    if not config.ENHANCE_CACHE_ENABLED or not text or text == QUOTA_FALLBACK_MESSAGE:
+        return
+    
+    entry = _enhance_cache.get(key)
+    if entry is None:
+        _enhance_cache.set(key, {"variants": [text], "next": 0})
+    elif len(entry["variants"]) < config.ENHANCE_CACHE_VARIANTS:
+        entry["variants"].append(text)
+
+def _response_format(json_mode):
+    return {"response_format": {"type": "json_object"}} if json_mode else {}
+
+def _model_state(model):
+    """Get the circuit breaker and latency/error counters of a model"""
+    state = _model_health.get(model)
+    if state is None:
+        state = _model_health[model] = {
+            "breaker": CircuitBreaker(f"model {model}", config.MODEL_FAILURE_THRESHOLD, config.MODEL_RESET_TIMEOUT),
+            "latency": LatencyStats(),
+            "calls": 0,
+            "errors": 0,
+            "slo_breaches": 0
+        }
+    return state
+
+def _model_attempts(call_type, total_timeout):
+    """
+    Plan the models to try for a call, in cascade order
+    
+    Models with an open circuit are skipped unless they are the last resort.
+    Every model but the last is cut off at the call type's latency SLO.
+    
+    Args:
+        call_type (str): Key into MODEL_CASCADE and MODEL_LATENCY_SLO
+        total_timeout (float): Seconds available for all attempts together
+        
+    Yields:
+        tuple: Model name, seconds allowed for this attempt, and whether it is the last model
+    """
+    models = config.MODEL_CASCADE.get(call_type) or [config.AI_MODEL]
+    slo = config.MODEL_LATENCY_SLO.get(call_type, config.OPENAI_TIMEOUT)
+    ends_at = time.monotonic() + total_timeout
+    
+    for index, model in enumerate(models):
+        is_last = index == len(models) - 1
+        left = ends_at - time.monotonic()
+        if left <= 0:
+            return
+        if not _model_state(model)["breaker"].allow_request() and not is_last:
+            continue
+        yield model, (left if is_last else min(slo, left)), is_last
+
+def _record_model_success(model, call_type, seconds):
+    """Record a completed attempt; finishing outside the SLO counts against the model like an error"""
+    state = _model_state(model)
+    state["calls"] += 1
+    state["latency"].record(seconds)
+    if seconds > config.MODEL_LATENCY_SLO.get(call_type, config.OPENAI_TIMEOUT):
+        state["slo_breaches"] += 1
+        state["breaker"].record_failure()
+    else:
+        state["breaker"].record_success()
+
+def _record_model_failure(model, call_type, error):
+    state = _model_state(model)
+    state["calls"] += 1
+    state["errors"] += 1
+    state["breaker"].record_failure()
+    logger.warning(f"{model} failed for {call_type or 'other'} call, trying the next model: {error!r}")
+
+def _is_quota_error(error):
+    return isinstance(error, openai.RateLimitError) or "insufficient_quota" in str(error) or "429" in str(error)
+
+async def _first_text(chunks):
+    """
+    Read a stream up to its first piece of text
+    
+    Returns:
+        tuple: The first text (None if the stream ended without any) and the usage seen so far
+    """
+    usage = None
+    async for chunk in chunks:
+        if chunk.usage is not None:
+            usage = chunk.usage
+        if chunk.choices and chunk.choices[0].delta.content:
+            return chunk.choices[0].delta.content, usage
+    return None, usage
+
+def _call_timeout(timeout, remaining):
+    """Per-call timeout, shortened so the call ends by the request's deadline"""
+    timeout = timeout or config.OPENAI_TIMEOUT
+    return timeout if remaining is None else max(0.1, min(timeout, remaining))
 
 class OpenAIService:
     """Service for interacting with OpenAI API"""
     
     @staticmethod
-    async def generate_response(prompt, system_prompt):
+    async def generate_response(prompt, system_prompt, timeout=None, json_mode=False, call_type=None):
         """
         Generate a response using OpenAI API
         
+        At most OPENAI_MAX_CONCURRENCY completions run at once. Further calls
+        wait for a slot by the priority of their call type and are refused if
+        the queue is full or the bound interaction's deadline passes first.
+        
+        The models of the call type's cascade are tried in order. A model that
+        fails, or misses the latency SLO when a fallback remains, hands over to
+        the next one; models whose circuit is open are skipped.
+        
         Args:
             prompt (str): The user's prompt
             system_prompt (str): The system message to guide the AI
+            timeout (float): Seconds allowed for this call, defaults to OPENAI_TIMEOUT
+            json_mode (bool): Constrain the output to a JSON object (the prompt must mention JSON)
+            call_type (str): Key into MAX_TOKENS_BY_CALL, CALL_PRIORITIES and MODEL_CASCADE,
+                also used for token usage stats
             
         Returns:
             str: The AI response
+            
+        Raises:
+            SchedulerRejected: If the call was refused a slot
         """
+        messages = _messages(prompt, system_prompt)
+        errors = []
         try:
-            response = client.chat.completions.create(
-                model=config.AI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=config.MAX_TOKENS,
-                temperature=0.9,
-            )
+            async with _scheduler.slot(CALL_PRIORITIES.get(call_type, BACKGROUND)) as remaining:
+                for model, attempt_timeout, is_last in _model_attempts(call_type, _call_timeout(timeout, remaining)):
+                    started = time.monotonic()
+                    try:
+                        response = await (client if is_last else _failover_client).chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            max_tokens=config.MAX_TOKENS_BY_CALL.get(call_type, config.MAX_TOKENS),
+                            temperature=0.9,
+                            timeout=attempt_timeout,
+                            **_response_format(json_mode)
+                        )
+                    except asyncio.CancelledError:
+                        _model_state(model)["breaker"].release()
+                        raise
+                    except Exception as e:
+                        _record_model_failure(model, call_type, e)
+                        errors.append(e)
+                        continue
+                    
+                    _record_model_success(model, call_type, time.monotonic() - started)
+                    content = response.choices[0].message.content
+                    if response.usage is not None:
+                        _record_usage(call_type or "other", response.usage.prompt_tokens, response.usage.completion_tokens)
+                    else:
+                        _record_usage(
+                            call_type or "other",
+                            count_message_tokens(messages, model),
+                            count_tokens(content, model),
+                            estimated=True
+                        )
+                    return content
+        except SchedulerRejected as e:
+            logger.warning(f"Skipped {call_type or 'other'} completion: {e}")
+            raise
+        
+        logger.error(f"Error generating OpenAI response: {errors[-1] if errors else 'no time left for any model'}")
+        # Return a fallback response when quota is exceeded
+        if any(_is_quota_error(e) for e in errors):
+            return QUOTA_FALLBACK_MESSAGE
+        raise RuntimeError("Failed to generate AI response")
+    
+    @staticmethod
+    async def stream_response(prompt, system_prompt, timeout=None, json_mode=False, call_type=None):
+        """
+        Generate a response using OpenAI API, yielding text as it is produced
+        
+        The scheduler slot is held until the stream is exhausted or closed, and
+        the stream is abandoned once the bound interaction's deadline passes.
+        Models fail over as in generate_response until one produces its first
+        text within the latency SLO; after that the stream stays on that model.
+        With OPENAI_STREAMING disabled the whole completion is yielded at once.
+        
+        Args:
+            prompt (str): The user's prompt
+            system_prompt (str): The system message to guide the AI
+            timeout (float): Seconds allowed for this call, defaults to OPENAI_TIMEOUT
+            json_mode (bool): Constrain the output to a JSON object (the prompt must mention JSON)
+            call_type (str): Key into MAX_TOKENS_BY_CALL, CALL_PRIORITIES and MODEL_CASCADE,
+                also used for token usage stats
+            
+        Yields:
+            str: Consecutive pieces of the AI response
+            
+        Raises:
+            SchedulerRejected: If the call was refused a slot or ran past its deadline
+        """
+        if not config.OPENAI_STREAMING:
+            yield await OpenAIService.generate_response(prompt, system_prompt, timeout, json_mode, call_type)
+            return
+        
+        messages = _messages(prompt, system_prompt)
+        async with _scheduler.slot(CALL_PRIORITIES.get(call_type, BACKGROUND)) as remaining:
+            expires_at = None if remaining is None else time.monotonic() + remaining
+            errors = []
+            stream = None
+            for model, attempt_timeout, is_last in _model_attempts(call_type, _call_timeout(timeout, remaining)):
+                started = time.monotonic()
+                try:
+                    stream = await (client if is_last else _failover_client).chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        max_tokens=config.MAX_TOKENS_BY_CALL.get(call_type, config.MAX_TOKENS),
+                        temperature=0.9,
+                        timeout=attempt_timeout,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        **_response_format(json_mode)
+                    )
+                    chunks = stream.__aiter__()
+                    first_text, usage = await asyncio.wait_for(
+                        _first_text(chunks),
+                        timeout=max(0.0, attempt_timeout - (time.monotonic() - started))
+                    )
+                except asyncio.CancelledError:
+                    _model_state(model)["breaker"].release()
+                    if stream is not None:
+                        await stream.close()
+                    raise
+                except Exception as e:
+                    if stream is not None:
+                        await stream.close()
+                        stream = None
+                    _record_model_failure(model, call_type, e)
+                    errors.append(e)
+                    continue
+                
+                _record_model_success(model, call_type, time.monotonic() - started)
+                break
+            
+            if stream is None:
+                logger.error(f"Error generating OpenAI response: {errors[-1] if errors else 'no time left for any model'}")
+                # Return a fallback response when quota is exceeded
+                if any(_is_quota_error(e) for e in errors):
+                    yield QUOTA_FALLBACK_MESSAGE
+                    return
+                raise RuntimeError("Failed to generate AI response")
+            
+            streamed = []
+            try:
+                if first_text:
+                    streamed.append(first_text)
+                    yield first_text
+                
+                async for chunk in chunks:
+                    # Nobody is waiting for the rest once the interaction expired
+                    if expires_at is not None and time.monotonic() >= expires_at:
+                        raise DeadlineExceeded("deadline passed while streaming")
+                    
+                    # The final chunk carries the usage and no choices
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        streamed.append(chunk.choices[0].delta.content)
+                        yield chunk.choices[0].delta.content
+            except DeadlineExceeded as e:
+                logger.warning(f"Abandoned {call_type or 'other'} stream: {e}")
+                raise
+            except Exception as e:
+                logger.error(f"Error streaming OpenAI response: {e}")
+                raise RuntimeError("Failed to generate AI response")
+            finally:
+                await stream.close()
+                if usage is not None:
+                    _record_usage(call_type or "other", usage.prompt_tokens, usage.completion_tokens)
+                else:
+                    _record_usage(
+                        call_type or "other",
+                        count_message_tokens(messages, model),
+                        count_tokens("".join(streamed), model),
+                        estimated=True
+                    )
+    
+    @staticmethod
+    def bind_interaction(interaction):
+        """
+        Tie the completions made by the current task to an interaction's deadline
+        
+        Call this at the start of a command handler. Completions still waiting or
+        streaming LLM_DEADLINE seconds after the interaction was created are dropped.
+        
+        Args:
+            interaction (discord.Interaction): The interaction being answered
+        """
+        current_deadline.set(interaction_deadline(interaction, config.LLM_DEADLINE))
+    
+    @staticmethod
+    def get_model_stats():
+        """
+        Get per-model health used by the cascade
+        
+        Returns:
+            dict: Circuit state, calls, errors, SLO breaches and latency summary per model
+        """
+        return {
+            model: {
+                **state["breaker"].stats(),
+                "calls": state["calls"],
+                "errors": state["errors"],
+                "slo_breaches": state["slo_breaches"],
+                **state["latency"].summary()
+            }
+            for model, state in _model_health.items()
+        }
+    
+    @staticmethod
+    def get_scheduler_stats():
+        """
+        Get completion scheduler counters
+        
+        Returns:
+            dict: Running and queued completions, rejections, expirations and queue waits
+        """
+        return _scheduler.stats()
+    
+    @staticmethod
+    async def recommend_books(preferences, on_text=None, context=None):
+        """
+        Get conversational recommendations and the recommended titles in one call
+        
+        The model answers with a JSON object matching RECOMMENDATION_SCHEMA. Its
+        message is passed to on_text while it streams. Invalid output is repaired
+        locally if possible, then by one corrective completion; if that fails too,
+        the text is returned without books.
+        
+        Args:
+            preferences (str): The user's (possibly history-enriched) preferences
+            on_text (callable): Optional coroutine function called with each new piece of the message
+            context (dict): Retrieved past searches and known books to ground the answer in,
+                as returned by RAGService.retrieve_context
             
-            return response.choices[0].message.content
+        Returns:
+            dict: {"message": str, "books": [{"title": str, "author": str}]}
+        """
+        system_prompt = f"""
+        You are a knowledgeable librarian who helps users find books they might enjoy.
+        Based on the user's preferences, suggest 3-5 specific books they might like.
+        
+        Respond with a JSON object matching this schema:
+        {json.dumps(RECOMMENDATION_SCHEMA)}
+        
+        Write "message" first. It is shown to the user as is, so make it a natural,
+        conversational recommendation, like a librarian talking to a customer, including:
+        - Book titles and authors
+        - Brief reasons why each book matches their preferences
+        - Mix of different genres if preferences are vague
+        
+        Then list every book mentioned in "message" in "books", with its title and author.
+        
+        If the user's past searches or known books are listed, use them to personalize:
+        build on what they searched for, don't repeat books they already found, and
+        prefer listed known books when they fit the preferences.
+        """
+        preferences = truncate_to_tokens(preferences, config.RECOMMEND_INPUT_BUDGET, config.AI_MODEL)
+        prompt = f"Based on these preferences, recommend specific books: {preferences}"
+        grounding = _grounding_text(context or {})
+        if grounding:
+            prompt += f"\n\n{grounding}"
+        _recommend_stats["calls"] += 1
+        
+        raw = ""
+        shown = 0
+        async for text in OpenAIService.stream_response(prompt, system_prompt, json_mode=True, call_type="recommend"):
+            raw += text
+            if on_text is not None:
+                message = _partial_json_string(raw, "message")
+                if len(message) > shown:
+                    await on_text(message[shown:])
+                    shown = len(message)
+        
+        try:
+            result = _validate_recommendation(json.loads(raw))
+            _recommend_stats["valid"] += 1
+            return result
+        except ValueError as e:
+            error = e
+        
+        try:
+            result = _validate_recommendation(_extract_json_object(raw))
+            _recommend_stats["repaired_locally"] += 1
+            return result
+        except ValueError as e:
+            error = e
+        
+        logger.warning(f"Invalid recommendation output ({error}), asking the model to repair it")
+        try:
+            repaired = await OpenAIService.generate_response(
+                f"Validation error: {error}\nOutput to fix:\n{raw}",
+                f"""
+                Fix the given output so it is a valid JSON object matching this schema:
+                {json.dumps(RECOMMENDATION_SCHEMA)}
+                Keep the original recommendations. Return only the corrected JSON object.
+                """,
+                json_mode=True,
+                call_type="repair"
+            )
+            result = _validate_recommendation(_extract_json_object(repaired))
+            _recommend_stats["repaired_by_model"] += 1
+            return result
         except Exception as e:
-            logger.error(f"Error generating OpenAI response: {e}")
-            # Return a fallback response when quota is exceeded
-            if "insufficient_quota" in str(e) or "429" in str(e):
-                return "I'm experiencing API quota limits, but I'll still search for books using the book databases."
+            logger.error(f"Could not repair recommendation output: {e}")
+        
+        # Show whatever text there is, without book lookups
+        _recommend_stats["fallbacks"] += 1
+        message = _partial_json_string(raw, "message") or raw.strip()
+        if not message:
             raise RuntimeError("Failed to generate AI response")
+        return {"message": message, "books": []}
+    
+    @staticmethod
+    def get_token_usage():
+        """
+        Get token usage per call type
+        
+        Returns:
+            dict: Calls, prompt and completion tokens per call type; estimated_calls
+                counts calls whose usage was counted locally instead of reported
+        """
+        return {call_type: dict(usage) for call_type, usage in _token_usage.items()}
+    
+    @staticmethod
+    def get_recommend_stats():
+        """
+        Get outcome counters of structured recommendation calls
+        
+        Returns:
+            dict: Calls answered with valid JSON, repaired locally or by the model,
+                and calls that fell back to text only
+        """
+        return dict(_recommend_stats)
     
     @staticmethod
     async def parse_book_query(query):
         """
         Parse user's natural language query about books
         
+        Simply structured queries are answered by the local rule-based parser
+        when it is confident enough. Otherwise concurrent calls with the same
+        normalized query share one completion.
+        
         Args:
             query (str): User's natural language query
             
         Returns:
             dict: Extracted search parameters
         """
+        if config.FAST_PARSE_ENABLED:
+            started = time.perf_counter()
+            params, confidence = QueryParser.parse(query)
+            _fast_parse_latency.record(time.perf_counter() - started)
+            _fast_path_stats["attempts"] += 1
+            
+            if params is not None and confidence >= config.FAST_PARSE_THRESHOLD:
+                _fast_path_stats["hits"] += 1
+                logger.info(f"Parsed query locally (confidence {confidence:.2f}): {query}")
+                return params
+        
+        return await _parse_flight.do(_query_fingerprint(query), OpenAIService._parse_book_query, query)
+    
+    @staticmethod
+    async def _parse_book_query(query):
+        fingerprint = _query_fingerprint(query)
+        cached_params = await _parse_cache_call(_parse_cache.get, fingerprint)
+        if cached_params is not None:
+            # The model echoes the query back, so hand back this caller's wording
+            if "general_query" in cached_params:
+                cached_params["general_query"] = query
+            return cached_params
+        
         system_prompt = """
         You are a helpful AI assistant that extracts search parameters from user queries about books.
         
@@ -83,7 +802,9 @@ class OpenAIService:
         """
         
         try:
-            response = await OpenAIService.generate_response(query, system_prompt)
+            started = time.perf_counter()
+            response = await OpenAIService.generate_response(query, system_prompt, call_type="parse")
+            _llm_parse_latency.record(time.perf_counter() - started)
             
             # Check if response is None or empty
             if not response:
@@ -93,6 +814,10 @@ class OpenAIService:
             # Try to parse JSON response
             try:
                 parsed_response = json.loads(response)
+                
+                # Only real model answers are cached, including {"error": ...} refusals
+                if isinstance(parsed_response, dict):
+                    await _parse_cache_call(_parse_cache.set, fingerprint, parsed_response)
                 return parsed_response
             except json.JSONDecodeError as json_error:
                 logger.warning(f"Failed to parse JSON response: {response}. Error: {json_error}")
@@ -108,44 +833,199 @@ class OpenAIService:
         """
         Enhance book descriptions or generate recommendations
         
+        Responses are cached per query and top books; concurrent calls for the
+        same query and top books share one completion.
+        
         Args:
-            books (list): Array of book data
+            books (list): Array of Book records
             user_query (str): The original user query
             
         Returns:
             str: Enhanced response about the books
         """
-        if not books or len(books) == 0:
+        key = _enhance_key(books, user_query)
+        if books:
+            cached = _cached_enhancement(key)
+            if cached is not None:
+                return cached
+        return await _enhance_flight.do(key, OpenAIService._enhance_book_results, books, user_query)
+    
+    @staticmethod
+    async def stream_enhance_book_results(books, user_query):
+        """
+        Streaming variant of enhance_book_results
+        
+        Falls back to a plain list of titles if the completion fails before
+        any text was produced; a stream that breaks off later is kept as is.
+        Concurrent calls for the same query and top books share one streamed
+        completion, and each caller receives all of its text.
+        
+        Args:
+            books (list): Array of Book records
+            user_query (str): The original user query
+            
+        Yields:
+            str: Consecutive pieces of the enhanced response
+        """
+        if not books:
+            yield OpenAIService._enhance_fallback(books, user_query)
+            return
+        
+        key = _enhance_key(books, user_query)
+        cached = _cached_enhancement(key)
+        if cached is not None:
+            yield cached
+            return
+        
+        async for text in _enhance_flight.stream(key, OpenAIService._stream_enhance_book_results, books, user_query):
+            yield text
+    
+    @staticmethod
+    async def _stream_enhance_book_results(books, user_query):
+        prompt, system_prompt = OpenAIService._enhance_prompt(books, user_query)
+        streamed = []
+        try:
+            async for text in OpenAIService.stream_response(prompt, system_prompt, call_type="enhance"):
+                streamed.append(text)
+                yield text
+        except Exception as e:
+            logger.error(f"Error streaming enhanced results: {e}")
+            if not streamed:
+                yield OpenAIService._enhance_fallback(books, user_query)
+            return
+        
+        _store_enhancement(_enhance_key(books, user_query), "".join(streamed))
+    
+    @staticmethod
+    def get_coalescing_stats():
+        """
+        Get single-flight counters for query parsing and result enhancement
+        
+        Returns:
+            dict: Calls, coalesced calls and coalescing ratio per call type,
+                plus hit/miss counters of the parse and enhancement caches
+        """
+        enhance_lookups = _enhance_cache_stats["hits"] + _enhance_cache_stats["misses"]
+        return {
+            "parse_book_query": _parse_flight.stats(),
+            "parse_cache": _parse_cache.stats(),
+            "enhance_book_results": _enhance_flight.stats(),
+            "enhance_cache": {
+                **_enhance_cache_stats,
+                "hit_rate": _enhance_cache_stats["hits"] / enhance_lookups if enhance_lookups else 0.0,
+                "size": len(_enhance_cache),
+                "variants": config.ENHANCE_CACHE_VARIANTS
+            }
+        }
+    
+    @staticmethod
+    def get_parse_stats():
+        """
+        Get fast-path parsing counters
+        
+        Latency saved is estimated as the average LLM parse time minus the
+        average local parse time, for every query the fast path answered.
+        
+        Returns:
+            dict: Attempts, hits, hit rate, estimated seconds saved and latency
+                summaries of local and LLM parsing
+        """
+        attempts = _fast_path_stats["attempts"]
+        hits = _fast_path_stats["hits"]
+        fast = _fast_parse_latency.summary()
+        llm = _llm_parse_latency.summary()
+        saved_per_hit = max(0.0, llm["avg_ms"] - fast["avg_ms"]) / 1000 if llm["count"] else 0.0
+        return {
+            "attempts": attempts,
+            "hits": hits,
+            "hit_rate": hits / attempts if attempts else 0.0,
+            "latency_saved_seconds": round(hits * saved_per_hit, 2),
+            "fast_path": fast,
+            "llm": llm
+        }
+    
+    @staticmethod
+    def _enhance_fallback(books, user_query):
+        """Response used when there are no books or the AI is unavailable"""
+        if not books:
             return f"I couldn't find any books matching '{user_query}'. You might want to try different keywords or check the spelling."
         
+        book_titles = [book.title or "Unknown" for book in books[:3]]
+        return f"Found {len(books)} books matching '{user_query}': {', '.join(book_titles)}"
+    
+    @staticmethod
+    def _enhance_prompt(books, user_query):
+        """
+        Build the prompts for describing the top books
+        
+        Returns:
+            tuple: User prompt and system prompt
+        """
         # Prepare book data for the AI with null safety
         books_data = []
+        descriptions = []
         for book in books[:3]:  # Limit to top 3 books
-            authors = book.get("authors") or ["Unknown"]
-            categories = book.get("categories") or ["Unknown"]
-            
             books_data.append({
-                "title": book.get("title", "Unknown"),
-                "author": ", ".join(authors),
-                "description": book.get("description", "No description available"),
-                "publishedDate": book.get("publishedDate", "Unknown"),
-                "categories": ", ".join(categories)
+                "title": book.title or "Unknown",
+                "author": ", ".join(book.authors or ["Unknown"]),
+                "description": "",
+                "publishedDate": book.published_date or "Unknown",
+                "categories": ", ".join(book.categories or ["Unknown"])
             })
+            descriptions.append(strip_markup(book.description) or "No description available")
+        
+        # Bump ENHANCE_PROMPT_VERSION when changing this prompt so cached responses are not reused
+        system_prompt = """
+        You are a knowledgeable librarian who helps users find books they might enjoy.
+        Based on the user's query and the books found, create a helpful, conversational response that:
+        1. Mentions the books found
+        2. Provides brief context about each book's content, themes, or significance
+        3. Explains why these books might match what the user is looking for
+        
+        Keep your response concise and focused on the books' relevance to the query.
+        """
+        
+        def build_prompt():
+            return f"User query: \"{user_query}\"\nBooks found: {json.dumps(books_data, ensure_ascii=False, separators=(',', ':'))}"
+        
+        # Descriptions share whatever the input budget leaves after everything else
+        overhead = count_message_tokens(_messages(build_prompt(), system_prompt), config.AI_MODEL)
+        descriptions = fit_texts(descriptions, config.ENHANCE_INPUT_BUDGET - overhead, config.AI_MODEL)
+        for book_data, description in zip(books_data, descriptions):
+            book_data["description"] = description
+        
+        prompt = build_prompt()
+        return prompt, system_prompt
+    
+    @staticmethod
+    async def _enhance_book_results(books, user_query):
+        if not books or len(books) == 0:
+            return OpenAIService._enhance_fallback(books, user_query)
         
         try:
-            system_prompt = """
-            You are a knowledgeable librarian who helps users find books they might enjoy.
-            Based on the user's query and the books found, create a helpful, conversational response that:
-            1. Mentions the books found
-            2. Provides brief context about each book's content, themes, or significance
-            3. Explains why these books might match what the user is looking for
-            
-            Keep your response concise and focused on the books' relevance to the query.
-            """
-            
-            prompt = f"User query: \"{user_query}\"\nBooks found: {json.dumps(books_data)}"
-            return await OpenAIService.generate_response(prompt, system_prompt)
+            prompt, system_prompt = OpenAIService._enhance_prompt(books, user_query)
+            response = await OpenAIService.generate_response(prompt, system_prompt, call_type="enhance")
         except:
             # Fallback response when AI is unavailable
-            book_titles = [book.get("title", "Unknown") for book in books[:3]]
-            return f"Found {len(books)} books matching '{user_query}': {', '.join(book_titles)}" 
\ No newline at end of file
+            return OpenAIService._enhance_fallback(books, user_query)
+        
+        _store_enhancement(_enhance_key(books, user_query), response)
+        return response
+    
+    @staticmethod
+    def load_tokenizers():
+        """
+        Start loading the tokenizers of every configured model in the background
+        
+        Token counts are estimated from characters until they are loaded.
+        """
+        models = {config.AI_MODEL}
+        for cascade in config.MODEL_CASCADE.values():
+            models.update(cascade)
+        load_encodings_in_background(sorted(models))
+    
+    @staticmethod
+    async def close():
+        """Close the OpenAI client, its connection pool and the parse cache"""
+        await client.close()
+        _parse_cache.close()
@@ -0,0 +1,293 @@
+import re
+import unicodedata
+
+# Genre vocabulary in English and Swedish, mapped to the English subject sent to the book APIs
+GENRE_LEXICON = {
+    # English
+    "fantasy": "fantasy",
+    "epic fantasy": "epic fantasy",
+    "high fantasy": "high fantasy",
+    "urban fantasy": "urban fantasy",
+    "dark fantasy": "dark fantasy",
+    "science fiction": "science fiction",
+    "sci-fi": "science fiction",
+    "scifi": "science fiction",
+    "space opera": "space opera",
+    "cyberpunk": "cyberpunk",
+    "steampunk": "steampunk",
+    "dystopian": "dystopian",
+    "dystopia": "dystopian",
+    "mystery": "mystery",
+    "mysteries": "mystery",
+    "cozy mystery": "cozy mystery",
+    "cozy mysteries": "cozy mystery",
+    "crime": "crime",
+    "true crime": "true crime",
+    "thriller": "thriller",
+    "thrillers": "thriller",
+    "romance": "romance",
+    "horror": "horror",
+    "paranormal": "paranormal",
+    "historical fiction": "historical fiction",
+    "literary fiction": "literary fiction",
+    "fiction": "fiction",
+    "nonfiction": "nonfiction",
+    "non-fiction": "nonfiction",
+    "young adult": "young adult",
+    "ya": "young adult",
+    "children's": "children's",
+    "childrens": "children's",
+    "kids": "children's",
+    "biography": "biography",
+    "biographies": "biography",
+    "memoir": "memoir",
+    "memoirs": "memoir",
+    "poetry": "poetry",
+    "poems": "poetry",
+    "self-help": "self-help",
+    "self help": "self-help",
+    "history": "history",
+    "philosophy": "philosophy",
+    "psychology": "psychology",
+    "business": "business",
+    "economics": "economics",
+    "science": "science",
+    "travel": "travel",
+    "cooking": "cooking",
+    "cookbooks": "cooking",
+    "graphic novels": "graphic novels",
+    "comics": "comics",
+    "manga": "manga",
+    "classics": "classics",
+    "classic": "classics",
+    "adventure": "adventure",
+    "humor": "humor",
+    "humour": "humor",
+    "western": "western",
+    "westerns": "western",
+    "drama": "drama",
+    "satire": "satire",
+    # Swedish
+    "deckare": "mystery",
+    "kriminal": "crime",
+    "kriminalromaner": "crime",
+    "krim": "crime",
+    "spänning": "thriller",
+    "skräck": "horror",
+    "romantik": "romance",
+    "kärlek": "romance",
+    "kärleks": "romance",
+    "historiska romaner": "historical fiction",
+    "historisk": "historical fiction",
+    "historiska": "historical fiction",
+    "biografi": "biography",
+    "biografier": "biography",
+    "memoarer": "memoir",
+    "poesi": "poetry",
+    "dikter": "poetry",
+    "självhjälp": "self-help",
+    "historia": "history",
+    "filosofi": "philosophy",
+    "psykologi": "psychology",
+    "ekonomi": "economics",
+    "vetenskap": "science",
+    "resor": "travel",
+    "matlagning": "cooking",
+    "kok": "cooking",
+    "barn": "children's",
+    "ungdom": "young adult",
+    "ungdoms": "young adult",
+    "klassiker": "classics",
+    "serieromaner": "graphic novels",
+    "äventyr": "adventure",
+    "dystopi": "dystopian",
+    "dystopiska": "dystopian",
+    "skönlitteratur": "fiction",
+    "facklitteratur": "nonfiction"
+}
+
+# Words meaning "book(s)"; Swedish also glues them onto a genre ("fantasyböcker")
+CONTAINER_WORDS = {
+    "book", "books", "novel", "novels", "read", "reads", "stories", "story", "series",
+    "bok", "boken", "böcker", "böckerna", "roman", "romaner", "berättelser"
+}
+COMPOUND_SUFFIXES = ("böckerna", "böcker", "boken", "bok", "romaner", "roman")
+
+# Request phrasing that carries no search meaning
+FILLER_WORDS = {
+    # English
+    "a", "an", "the", "some", "any", "few", "good", "great", "best", "top", "popular", "new",
+    "latest", "recent", "i", "me", "want", "wanna", "looking", "look", "for", "recommend",
+    "suggest", "find", "show", "give", "get", "please", "need", "to", "can", "you", "could",
+    "would", "of", "all", "list", "search", "ideas",
+    # Swedish
+    "en", "ett", "några", "bra", "bästa", "populära", "nya", "senaste", "jag", "vill", "ha",
+    "söker", "letar", "efter", "rekommendera", "tips", "på", "ge", "mig", "visa", "hitta",
+    "snälla", "tack", "att", "läsa", "gärna", "lite", "kan", "du", "alla", "förslag"
+}
+
+# Words that mean the "author" is not a name the book APIs can look up
+NON_NAME_WORDS = {
+    # English
+    "my", "our", "your", "his", "her", "its", "their", "the", "a", "an", "this", "that", "someone",
+    "somebody", "anyone", "anybody", "people", "friend", "friends", "neighbor", "neighbour",
+    "teacher", "mom", "dad", "mother", "father", "author", "authors", "writer", "writers",
+    "women", "men", "famous", "unknown", "new", "me", "myself", "you", "them", "him",
+    # Swedish
+    "min", "mitt", "mina", "vår", "vårt", "våra", "din", "ditt", "dina", "hans", "hennes",
+    "dess", "sin", "sitt", "sina", "deras", "någon", "folk", "vän", "vänner", "granne", "grannen",
+    "lärare", "mamma", "pappa", "författare", "författaren", "kvinnor", "män", "kända", "okända", "den", "det", "de", "mig"
+}
+
+# Lowercase particles allowed inside an otherwise capitalized name ("Ursula K. Le Guin", "von Trier")
+NAME_PARTICLES = {"de", "da", "del", "der", "den", "di", "du", "la", "le", "van", "von", "af", "al", "bin", "ibn"}
+
+QUOTED_TITLE = re.compile(r'"([^"]+)"|“([^”]+)”|”([^”]+)”|«([^»]+)»|(?:^|(?<=\s))\'([^\']+)\'(?=\s|$|[.,!?])')
+AUTHOR_CLAUSE = re.compile(
+    r'(?:^|\s)(?:written by|authored by|by|skrivna av|skriven av|skrivet av|av)\s+(?P<author>[^,;!?"]+?)[\s.!?]*$',
+    re.IGNORECASE
+)
+NAME_TOKEN = re.compile(r"^[^\W\d_](?:[^\W\d_]|[.'\-])*$")
+WORD = re.compile(r"[\w'\-]+")
+
+# Confidence of each kind of evidence
+TITLE_CONFIDENCE = 0.95
+FULL_NAME_CONFIDENCE = 0.95
+LOWERCASE_NAME_CONFIDENCE = 0.6
+SURNAME_CONFIDENCE = 0.85
+LOWERCASE_SURNAME_CONFIDENCE = 0.6
+GENRE_CONFIDENCE = 0.9
+BARE_GENRE_CONFIDENCE = 0.85
+# Cap applied when words are left that none of the rules understood
+UNEXPLAINED_CONFIDENCE = 0.4
+
+class QueryParser:
+    """Rule- and lexicon-based parser for simply structured English and Swedish book queries"""
+
+    @staticmethod
+    def parse(query):
+        """
+        Extract search parameters without calling the LLM
+
+        Recognizes quoted titles, "by <author>"/"av <författare>" clauses and genre
+        words. Anything the rules cannot explain lowers the confidence, so
+        free-form requests still go to the LLM.
+
+        Args:
+            query (str): The user's search query
+
+        Returns:
+            tuple: (params, confidence) where params has the same shape as the LLM
+                parser's output (or is None) and confidence is between 0 and 1
+        """
+        text = unicodedata.normalize('NFKC', str(query)).replace('’', "'").strip()
+        if not text:
+            return None, 0.0
+
+        params = {}
+        confidences = []
+
+        # Quoted title
+        match = QUOTED_TITLE.search(text)
+        if match:
+            title = next(group for group in match.groups() if group is not None).strip()
+            if title:
+                params["title"] = title
+                confidences.append(TITLE_CONFIDENCE)
+            text = (text[:match.start()] + " " + text[match.end():]).strip()
+
+        # Trailing author clause
+        match = AUTHOR_CLAUSE.search(text)
+        if match:
+            author, confidence = QueryParser._parse_author(match.group("author"))
+            if author is None:
+                return None, 0.0
+            params["author"] = author
+            confidences.append(confidence)
+            text = text[:match.start()]
+
+        # Genre, container and filler words
+        genre, unexplained = QueryParser._parse_words(text)
+        if genre:
+            params["genre"] = genre
+            has_container = any(word in CONTAINER_WORDS or word.endswith(COMPOUND_SUFFIXES) for word in QueryParser._words(text))
+            confidences.append(GENRE_CONFIDENCE if has_container or len(params) > 1 else BARE_GENRE_CONFIDENCE)
+
+        if not confidences:
+            return None, 0.0
+
+        confidence = min(confidences)
+        if unexplained:
+            confidence = min(confidence, UNEXPLAINED_CONFIDENCE)
+
+        params["general_query"] = query
+        return params, confidence
+
+    @staticmethod
+    def _words(text):
+        return [word.casefold() for word in WORD.findall(text)]
+
+    @staticmethod
+    def _parse_author(candidate):
+        """
+        Validate an author name taken from a "by"/"av" clause
+
+        Returns:
+            tuple: (author, confidence), author is None when it is not a plausible name
+        """
+        tokens = candidate.split()
+        if not 1 <= len(tokens) <= 4:
+            return None, 0.0
+
+        for token in tokens:
+            word = token.casefold()
+            if not NAME_TOKEN.match(token) or word in NON_NAME_WORDS or word in CONTAINER_WORDS or word in GENRE_LEXICON:
+                return None, 0.0
+
+        capitalized = all(token[0].isupper() or token in NAME_PARTICLES for token in tokens) and tokens[-1][0].isupper()
+        if len(tokens) > 1:
+            confidence = FULL_NAME_CONFIDENCE if capitalized else LOWERCASE_NAME_CONFIDENCE
+        else:
+            confidence = SURNAME_CONFIDENCE if capitalized else LOWERCASE_SURNAME_CONFIDENCE
+        return " ".join(tokens), confidence
+
+    @staticmethod
+    def _parse_words(text):
+        """
+        Match genre phrases and skip container and filler words
+
+        Returns:
+            tuple: (genre or None, number of words nothing accounted for)
+        """
+        words = QueryParser._words(text)
+        genres = []
+        unexplained = 0
+        index = 0
+
+        while index < len(words):
+            # Longest genre phrase first ("science fiction" before "science")
+            for length in (3, 2, 1):
+                phrase = " ".join(words[index:index + length])
+                if len(words) - index >= length and phrase in GENRE_LEXICON:
+                    genres.append(GENRE_LEXICON[phrase])
+                    index += length
+                    break
+            else:
+                word = words[index]
+                index += 1
+                if word in CONTAINER_WORDS or word in FILLER_WORDS:
+                    continue
+
+                # Swedish compounds such as "fantasyböcker" or "skräckromaner"
+                stem = next((word[:-len(suffix)] for suffix in COMPOUND_SUFFIXES if word.endswith(suffix)), None)
+                if stem and stem in GENRE_LEXICON:
+                    genres.append(GENRE_LEXICON[stem])
+                    continue
+
+                unexplained += 1
+
+        # Mixed genres ("fantasy romance") are left to the LLM
+        distinct = list(dict.fromkeys(genres))
+        if len(distinct) > 1:
+            return None, unexplained + len(genres)
+        return (distinct[0] if distinct else None), unexplained
@@ -1,24 +1,186 @@
-import json
+import asyncio
 from datetime import datetime
-import os
 import logging
+import os
+import threading
+from src import config
+from src.services.embedding_service import EmbeddingService
+from src.services.interaction_store import InteractionStore
+from src.utils.batch_writer import BatchWriter
+from src.utils.vector_store import VectorStore
 
 logger = logging.getLogger('bookfinder.rag')
 
+# Segmented interaction log with a per-user index, so history lookups don't scan the whole log
+_store = InteractionStore(
+    config.INTERACTION_LOG_FILE,
+    config.INTERACTION_INDEX_FILE,
+    segment_bytes=config.INTERACTION_SEGMENT_BYTES,
+    fsync=config.INTERACTION_FSYNC,
+    fsync_interval=config.INTERACTION_FSYNC_INTERVAL
+)
+
+# Commands only queue their entry; a background task appends queued entries in batches
+_writer = BatchWriter(
+    _store.append_many,
+    max_batch=config.INTERACTION_BATCH_SIZE,
+    interval=config.INTERACTION_FLUSH_INTERVAL,
+    max_queue=config.INTERACTION_QUEUE_SIZE,
+    enqueue_timeout=config.INTERACTION_ENQUEUE_TIMEOUT
+)
+
+# Deleted history is hidden at once by a tombstone and purged from disk by this task
+_compactor = None
+
+async def _compact_periodically():
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(config.INTERACTION_COMPACT_INTERVAL)
+        try:
+            # One segment per call, so appends and reads only wait for a single rewrite
+            while await loop.run_in_executor(None, _store.compact):
+                pass
+        except Exception as e:
+            logger.error(f"Error compacting the interaction log: {e}")
+
+# Embeddings of past queries (per user) and logged books (shared), loaded on first use
+_vectors = None
+_vectors_lock = threading.Lock()
+_needs_backfill = False
+_backfill = None
+
+def _vector_store():
+    global _vectors, _needs_backfill
+    with _vectors_lock:
+        if _vectors is None:
+            embedder = EmbeddingService.get_embedder()
+            _vectors = VectorStore(
+                embedder.name,
+                embedder.dim,
+                approximate=config.EMBEDDING_APPROXIMATE,
+                lists=config.EMBEDDING_IVF_LISTS,
+                probes=config.EMBEDDING_IVF_PROBES
+            )
+            _needs_backfill = not _vectors.load(config.EMBEDDING_STORE_FILE)
+            if _needs_backfill and os.path.exists(config.EMBEDDING_STORE_FILE):
+                # Vectors of another model are useless and may hold deleted users' queries
+                os.remove(config.EMBEDDING_STORE_FILE)
+        return _vectors
+
+def _embed_interactions(entries):
+    """Embed logged queries and the books they found into the vector store (blocking)"""
+    vectors = _vector_store()
+    items = []
+    for entry in entries:
+        user_id = str(entry["user_id"])
+        books = [book for book in entry.get("books") or [] if book.get("title") and book["title"] != "Unknown"]
+        items.append((
+            f"interaction:{user_id}:{entry['timestamp']}",
+            f"user:{user_id}",
+            entry.get("query") or "",
+            {
+                "query": entry.get("query"),
+                "command": entry.get("command"),
+                "timestamp": entry.get("timestamp"),
+                "books": [f"{book['title']} by {', '.join(book.get('authors') or [])}" for book in books]
+            }
+        ))
+        for book in books:
+            authors = ", ".join(book.get("authors") or [])
+            categories = ", ".join(book.get("categories") or [])
+            items.append((
+                f"book:{book['title'].casefold()}|{authors.casefold()}",
+                "books",
+                f"{book['title']} by {authors}. {categories}",
+                {"title": book["title"], "authors": book.get("authors") or [], "categories": book.get("categories") or []}
+            ))
+
+    # Skip known keys before embedding, which is the expensive part
+    items = [item for item in items if item[2].strip() and item[0] not in vectors]
+    if not items:
+        return
+    embeddings = EmbeddingService.embed([item[2] for item in items])
+    vectors.add([(key, namespace, embedding, payload) for (key, namespace, _, payload), embedding in zip(items, embeddings)])
+    if vectors.unsaved >= config.EMBEDDING_SAVE_EVERY:
+        vectors.save(config.EMBEDDING_STORE_FILE)
+
+def _backfill_vectors():
+    """Embed interactions logged before the vector store existed or under another embedding model"""
+    vectors = _vector_store()
+    if not _needs_backfill:
+        return
+    logger.info("Embedding past interactions for retrieval")
+    try:
+        for page in _store.scan():
+            _embed_interactions(page)
+        vectors.save(config.EMBEDDING_STORE_FILE)
+        logger.info(f"Embedded past interactions, {len(vectors)} vectors")
+    except Exception as e:
+        logger.error(f"Error embedding past interactions: {e}")
+
+def _retrieve(user_id, query, k):
+    vectors = _vector_store()
+    embedding = EmbeddingService.embed([query])[0]
+    return {
+        "interactions": [
+            payload for _, _, payload in
+            vectors.search(embedding, k, namespace=f"user:{user_id}", min_score=config.EMBEDDING_MIN_SCORE)
+        ],
+        "books": [
+            payload for _, _, payload in
+            vectors.search(embedding, k, namespace="books", min_score=config.EMBEDDING_MIN_SCORE)
+        ]
+    }
+
+def _forget_user_vectors(user_id):
+    vectors = _vector_store()
+    if vectors.remove_namespace(f"user:{user_id}"):
+        # Saved right away so the deleted queries don't stay on disk
+        vectors.save(config.EMBEDDING_STORE_FILE)
+
+# Embedding is best effort: entries are dropped rather than waited for when the queue is full
+_embedding_writer = BatchWriter(
+    _embed_interactions,
+    max_batch=64,
+    interval=config.INTERACTION_FLUSH_INTERVAL,
+    max_queue=config.INTERACTION_QUEUE_SIZE,
+    enqueue_timeout=0
+)
+
+def _start_background_tasks():
+    global _compactor, _backfill
+    if _compactor is None:
+        _compactor = asyncio.create_task(_compact_periodically())
+    if _backfill is None and config.EMBEDDING_ENABLED:
+        _backfill = asyncio.get_running_loop().run_in_executor(None, _backfill_vectors)
+
 class RAGService:
     """Retrieval-Augmented Generation service for logging and retrieving user interactions"""
     
-    LOG_FILE = "user_interactions.log"
+    @staticmethod
+    async def start():
+        """
+        Open the interaction index and start the background tasks
+        
+        Migrating or catching up the index reads the whole log, so it runs in a
+        worker thread at startup rather than inside the first command.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, _store.open)
+        _start_background_tasks()
     
     @staticmethod
-    def log_interaction(user_id, query, books_found, command_type, response_text=None):
+    async def log_interaction(user_id, query, books_found, command_type, response_text=None):
         """
         Log user interactions for future analysis and personalization
         
+        The entry is queued for the background writer, so this only waits when
+        the queue is full because the disk has fallen behind.
+        
         Args:
             user_id (int): Discord user ID
             query (str): User's search query or preferences
-            books_found (list): List of book results
+            books_found (list): List of Book results
             command_type (str): Type of command (findbook/recommend)
             response_text (str): AI-generated response text
         """
@@ -31,17 +193,20 @@ class RAGService:
                 "books_found": len(books_found) if books_found else 0,
                 "books": [
                     {
-                        "title": book.get("title", "Unknown"),
-                        "authors": book.get("authors", ["Unknown"]),
-                        "categories": book.get("categories", [])
+                        "title": book.title or "Unknown",
+                        "authors": list(book.authors or ["Unknown"]),
+                        "categories": list(book.categories)
                     } for book in (books_found[:3] if books_found else [])
                 ],
                 "ai_response": response_text[:200] if response_text else None  # First 200 chars
             }
             
-            # Append to log file
-            with open(RAGService.LOG_FILE, "a", encoding='utf-8') as f:
-                f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+            # Queue for the log file and the user's index, and for embedding
+            _start_background_tasks()
+            if not await _writer.put(log_entry):
+                return
+            if config.EMBEDDING_ENABLED:
+                await _embedding_writer.put(log_entry)
                 
             logger.info(f"Logged interaction for user {user_id}: {command_type} - {query[:50]}...")
             
@@ -49,10 +214,13 @@ class RAGService:
             logger.error(f"Error logging interaction: {e}")
     
     @staticmethod
-    def get_user_history(user_id, limit=10):
+    async def get_user_history(user_id, limit=10):
         """
         Get user's search history
         
+        The index is read in a worker thread, since it may be waiting for a
+        batch append or a segment compaction to finish.
+        
         Args:
             user_id (int): Discord user ID
             limit (int): Maximum number of entries to return
@@ -60,29 +228,78 @@ class RAGService:
         Returns:
             list: List of user's recent interactions
         """
-        if not os.path.exists(RAGService.LOG_FILE):
-            return []
-            
-        user_interactions = []
         try:
-            with open(RAGService.LOG_FILE, "r", encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line.strip())
-                        if entry["user_id"] == str(user_id):
-                            user_interactions.append(entry)
-                    except json.JSONDecodeError:
-                        continue
-                        
-            # Return most recent interactions
-            return user_interactions[-limit:] if user_interactions else []
+            # Taken before reading, so entries written meanwhile are either on disk or still in this list
+            pending = _writer.pending()
+            loop = asyncio.get_running_loop()
+            history = await loop.run_in_executor(None, _store.recent, user_id, limit)
             
+            # Entries still queued for the writer are newer than anything on disk
+            newest = history[-1]["timestamp"] if history else ""
+            pending = [
+                entry for entry in pending
+                if entry["user_id"] == str(user_id) and entry["timestamp"] > newest
+            ]
+            return (history + pending)[-limit:]
         except Exception as e:
             logger.error(f"Error reading user history: {e}")
             return []
     
     @staticmethod
-    def get_user_preferences(user_id):
+    async def delete_user_history(user_id):
+        """
+        Delete all of a user's logged interactions (GDPR compliance)
+        
+        The deletion takes effect for reads immediately; the records are purged
+        from disk by the background compactor within INTERACTION_COMPACT_INTERVAL.
+        
+        Args:
+            user_id (int): Discord user ID
+            
+        Returns:
+            int: Number of interactions deleted
+        """
+        # Write queued entries first so the tombstone covers all of them
+        _start_background_tasks()
+        await _writer.flush()
+        await _embedding_writer.flush()
+        if _backfill is not None:
+            # The backfill reads the log a page at a time and would re-add vectors of pages read before the delete
+            await asyncio.shield(_backfill)
+        loop = asyncio.get_running_loop()
+        deleted_count = await loop.run_in_executor(None, _store.delete_user, user_id)
+        if config.EMBEDDING_ENABLED or os.path.exists(config.EMBEDDING_STORE_FILE):
+            await loop.run_in_executor(None, _forget_user_vectors, str(user_id))
+        logger.info(f"GDPR: Deleted {deleted_count} interactions for user {user_id}")
+        return deleted_count
+    
+    @staticmethod
+    async def retrieve_context(user_id, query, k=None):
+        """
+        Find the user's past interactions and the known books most similar to a query
+        
+        Args:
+            user_id (int): Discord user ID
+            query (str): Text to match, usually the user's preferences
+            k (int): Maximum results of each kind, defaults to EMBEDDING_TOP_K
+            
+        Returns:
+            dict: "interactions" (query, command, timestamp, books) and "books"
+                (title, authors, categories), most similar first; empty when
+                retrieval is disabled or fails
+        """
+        if not config.EMBEDDING_ENABLED or not query.strip():
+            return {"interactions": [], "books": []}
+        
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, _retrieve, str(user_id), query, k or config.EMBEDDING_TOP_K)
+        except Exception as e:
+            logger.error(f"Error retrieving context: {e}")
+            return {"interactions": [], "books": []}
+    
+    @staticmethod
+    async def get_user_preferences(user_id):
         """
         Analyze user's search history to extract preferences
         
@@ -92,7 +309,7 @@ class RAGService:
         Returns:
             dict: User preferences analysis
         """
-        history = RAGService.get_user_history(user_id, limit=20)
+        history = await RAGService.get_user_history(user_id, limit=20)
         
         if not history:
             return {"genres": [], "authors": [], "recent_queries": []}
@@ -122,41 +339,62 @@ class RAGService:
         }
     
     @staticmethod
-    def get_analytics():
+    async def get_analytics():
         """
         Get overall system analytics
         
         Returns:
             dict: System-wide usage analytics
         """
-        if not os.path.exists(RAGService.LOG_FILE):
-            return {"total_interactions": 0, "unique_users": 0}
-        
-        interactions = []
-        users = set()
-        commands = {"findbook": 0, "recommend": 0}
-        
         try:
-            with open(RAGService.LOG_FILE, "r", encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        entry = json.loads(line.strip())
-                        interactions.append(entry)
-                        users.add(entry["user_id"])
-                        command_type = entry.get("command", "unknown")
-                        if command_type in commands:
-                            commands[command_type] += 1
-                    except json.JSONDecodeError:
-                        continue
-                        
+            # Counters are maintained on every append, so this doesn't read the log
+            loop = asyncio.get_running_loop()
+            summary = await loop.run_in_executor(None, _store.summary)
             return {
-                "total_interactions": len(interactions),
-                "unique_users": len(users),
-                "findbook_uses": commands["findbook"],
-                "recommend_uses": commands["recommend"],
-                "last_activity": interactions[-1]["timestamp"] if interactions else None
+                "total_interactions": summary["total_interactions"],
+                "unique_users": summary["unique_users"],
+                "findbook_uses": summary["commands"].get("findbook", 0),
+                "recommend_uses": summary["commands"].get("recommend", 0),
+                "last_activity": summary["last_activity"]
             }
             
         except Exception as e:
             logger.error(f"Error getting analytics: {e}")
-            return {"total_interactions": 0, "unique_users": 0} 
\ No newline at end of file
+            return {"total_interactions": 0, "unique_users": 0}
+    
+    @staticmethod
+    def get_log_writer_stats():
+        """
+        Get background log writer counters
+        
+        Returns:
+            dict: Queued, written, failed and dropped entries
+        """
+        return _writer.stats()
+    
+    @staticmethod
+    async def get_compaction_stats():
+        """
+        Get interaction log compaction progress
+        
+        Returns:
+            dict: Log segments, segments and tombstones waiting to be purged, and
+                records purged and bytes reclaimed so far
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _store.compaction_stats)
+    
+    @staticmethod
+    async def close():
+        """Write queued interactions and embeddings, stop the compactor and close the interaction index"""
+        global _compactor
+        await _writer.close()
+        await _embedding_writer.close()
+        if _compactor is not None:
+            _compactor.cancel()
+            _compactor = None
+        if _backfill is not None and not _backfill.done():
+            await _backfill
+        if _vectors is not None and _vectors.unsaved:
+            _vectors.save(config.EMBEDDING_STORE_FILE)
+        _store.close()
@@ -0,0 +1,135 @@
+import asyncio
+import collections
+import logging
+
+logger = logging.getLogger('bookfinder.batch_writer')
+
+class BatchWriter:
+    """Background task that hands queued items to a blocking writer in batches, off the event loop"""
+
+    def __init__(self, write_batch, max_batch=100, interval=1.0, max_queue=10000, enqueue_timeout=1.0):
+        """
+        Args:
+            write_batch (callable): Blocking function taking a list of items, run in a worker thread
+            max_batch (int): Items written per call; a full batch is written without waiting
+            interval (float): Longest time, in seconds, an item waits in the queue
+            max_queue (int): Items allowed to wait before put() blocks its caller
+            enqueue_timeout (float): Seconds put() blocks on a full queue before dropping the item
+        """
+        self.write_batch = write_batch
+        self.max_batch = max_batch
+        self.interval = interval
+        self.max_queue = max_queue
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = collections.deque()
+        self._in_flight = []
+        self._wake = None
+        self._changed = None
+        self._task = None
+        self._counters = {"written": 0, "batches": 0, "failed": 0, "dropped": 0, "blocked": 0}
+
+    def _start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._changed = asyncio.Condition()
+            self._task = asyncio.create_task(self._run())
+
+    def pending(self):
+        """
+        Get the items accepted but not yet written, oldest first
+
+        Returns:
+            list: Items in the batch being written followed by queued ones
+        """
+        return self._in_flight + list(self._queue)
+
+    async def put(self, item):
+        """
+        Queue an item for writing, waiting only while the queue is full
+
+        Args:
+            item: Item passed to write_batch later
+
+        Returns:
+            bool: False if the queue stayed full for enqueue_timeout and the item was dropped
+        """
+        self._start()
+
+        if len(self._queue) >= self.max_queue:
+            # Backpressure: the disk is behind, so hold the caller until a batch is written
+            self._counters["blocked"] += 1
+            self._wake.set()
+            try:
+                async with self._changed:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(lambda: len(self._queue) < self.max_queue),
+                        self.enqueue_timeout
+                    )
+            except asyncio.TimeoutError:
+                self._counters["dropped"] += 1
+                logger.warning(f"Write queue full for {self.enqueue_timeout}s, dropping an item")
+                return False
+
+        self._queue.append(item)
+        if len(self._queue) >= self.max_batch:
+            self._wake.set()
+        return True
+
+    async def flush(self):
+        """Write everything queued so far and wait until it is written"""
+        if self._task is None:
+            return
+        async with self._changed:
+            while self._queue or self._in_flight:
+                self._wake.set()
+                await self._changed.wait()
+
+    async def close(self):
+        """Drain the queue and stop the background task"""
+        if self._task is None:
+            return
+        await self.flush()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            while self._queue:
+                count = min(self.max_batch, len(self._queue))
+                self._in_flight = [self._queue.popleft() for _ in range(count)]
+                try:
+                    await loop.run_in_executor(None, self.write_batch, self._in_flight)
+                    self._counters["written"] += count
+                    self._counters["batches"] += 1
+                except Exception as e:
+                    self._counters["failed"] += count
+                    logger.error(f"Error writing a batch of {count} items: {e}")
+                finally:
+                    self._in_flight = []
+
+                async with self._changed:
+                    self._changed.notify_all()
+
+                # Items that arrived during the write wait for the next interval unless a batch is full
+                if len(self._queue) < self.max_batch and not self._wake.is_set():
+                    break
+
+    def stats(self):
+        """
+        Get writer counters
+
+        Returns:
+            dict: Items queued and written, batches, failures, drops and blocked puts
+        """
+        return {"queued": len(self._queue) + len(self._in_flight), **self._counters}
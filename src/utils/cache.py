@@ -0,0 +1,193 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after a fixed time-to-live"""
+
+    def __init__(self, maxsize=256, ttl=600):
+        """
+        Args:
+            maxsize (int): Maximum number of entries before the least recently used is evicted
+            ttl (float): Seconds an entry stays valid after it was stored
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        """
+        Look up a key, counting the hit or miss
+
+        Args:
+            key: Hashable cache key
+            default: Value returned when the key is missing or expired
+
+        Returns:
+            The cached value or default
+        """
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value, evicting the least recently used entries if full
+
+        Args:
+            key: Hashable cache key
+            value: Value to store
+            ttl (float): Overrides the default time-to-live for this entry
+        """
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, None)
+        return item[1] if item is not None else default
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """
+        Get cache counters
+
+        Returns:
+            dict: Hits, misses, hit rate and current size
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._data),
+            "maxsize": self.maxsize
+        }
+
+class PersistentTTLCache:
+    """SQLite-backed TTL cache with a size limit, for JSON values that should survive restarts"""
+
+    def __init__(self, path, maxsize=10000, ttl=86400):
+        """
+        Args:
+            path (str): SQLite database file
+            maxsize (int): Maximum number of entries before the least recently used are evicted
+            ttl (float): Seconds an entry stays valid after it was stored
+        """
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS cache_last_used ON cache (last_used)")
+        return self._connection
+
+    def get(self, key, default=None):
+        """
+        Look up a key, counting the hit or miss
+
+        Args:
+            key (str): Cache key
+            default: Value returned when the key is missing or expired
+
+        Returns:
+            The decoded cached value or default
+        """
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+
+            if row is None or row[1] <= now:
+                if row is not None:
+                    with connection:
+                        connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self.misses += 1
+                return default
+
+            with connection:
+                connection.execute("UPDATE cache SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a JSON-serializable value, evicting the least recently used entries if full
+
+        Args:
+            key (str): Cache key
+            value: Value to store
+            ttl (float): Overrides the default time-to-live for this entry
+        """
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), now + (self.ttl if ttl is None else ttl), now)
+                )
+                connection.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+                connection.execute(
+                    "DELETE FROM cache WHERE key IN ("
+                    "SELECT key FROM cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.maxsize,)
+                )
+
+    def stats(self):
+        """
+        Get cache counters
+
+        Returns:
+            dict: Hits, misses, hit rate and current size
+        """
+        with self._lock:
+            size = self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": size,
+            "maxsize": self.maxsize
+        }
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
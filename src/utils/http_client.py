@@ -0,0 +1,180 @@
+import asyncio
+import json
+import logging
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+from src import config
+from src.utils.metrics import LatencyStats
+
+logger = logging.getLogger('bookfinder.http')
+
+class HTTPClient:
+    """Shared async HTTP client with one keep-alive connection pool per upstream host"""
+
+    def __init__(self, pool_size=None, timeout=None, connect_timeout=None):
+        """
+        Args:
+            pool_size (int): Maximum open connections per upstream host
+            timeout (float): Default total timeout per request in seconds
+            connect_timeout (float): Timeout for establishing a connection in seconds
+        """
+        self.pool_size = pool_size or config.HTTP_POOL_SIZE
+        self.timeout = timeout or config.HTTP_TIMEOUT
+        self.connect_timeout = connect_timeout or config.HTTP_CONNECT_TIMEOUT
+        self._sessions = {}
+        self._stats = {}
+
+    @staticmethod
+    def _host_key(url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _host_stats(self, host):
+        return self._stats.setdefault(host, {
+            "requests": 0,
+            "bytes": 0,
+            "parse": LatencyStats(),
+            "connections_opened": 0,
+            "connections_reused": 0
+        })
+
+    def _trace_config(self, host):
+        """Count new versus reused pool connections for the host"""
+        async def on_create(session, context, params):
+            self._host_stats(host)["connections_opened"] += 1
+
+        async def on_reuse(session, context, params):
+            self._host_stats(host)["connections_reused"] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_create)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        return trace_config
+
+    def _get_session(self, url):
+        """Return the pooled session for the URL's host, creating it on first use"""
+        host = self._host_key(url)
+        session = self._sessions.get(host)
+
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                ttl_dns_cache=300
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout, sock_connect=self.connect_timeout),
+                trace_configs=[self._trace_config(host)]
+            )
+            self._sessions[host] = session
+            logger.info(f"Opened HTTP connection pool for {host} (size {self.pool_size})")
+
+        return session
+
+    async def start(self, base_urls=()):
+        """
+        Open the connection pools up front, typically at bot startup
+
+        Args:
+            base_urls (iterable): Upstream base URLs to create pools for
+        """
+        for url in base_urls:
+            self._get_session(url)
+
+    async def get_json(self, url, params=None, timeout=None):
+        """
+        Perform a GET request and decode the JSON body
+
+        Args:
+            url (str): Request URL
+            params (dict): Query parameters, None values are dropped
+            timeout (float): Total timeout for this request, overrides the default
+
+        Returns:
+            dict: Decoded JSON response
+        """
+        session = self._get_session(url)
+        query = {key: value for key, value in (params or {}).items() if value is not None}
+
+        request_kwargs = {}
+        if timeout:
+            request_kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout, sock_connect=self.connect_timeout)
+
+        async with session.get(url, params=query, **request_kwargs) as response:
+            response.raise_for_status()
+            body = await response.read()
+
+        started = time.perf_counter()
+        data = json.loads(body)
+
+        stats = self._host_stats(self._host_key(url))
+        stats["requests"] += 1
+        stats["bytes"] += len(body)
+        stats["parse"].record(time.perf_counter() - started)
+        return data
+
+    async def get_bytes(self, url, timeout=None, max_bytes=None):
+        """
+        Perform a GET request and return the raw body
+
+        Args:
+            url (str): Request URL
+            timeout (float): Total timeout for this request, overrides the default
+            max_bytes (int): Abort if the body is larger than this
+
+        Returns:
+            tuple: Content type and body bytes
+        """
+        session = self._get_session(url)
+
+        request_kwargs = {}
+        if timeout:
+            request_kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout, sock_connect=self.connect_timeout)
+
+        async with session.get(url, **request_kwargs) as response:
+            response.raise_for_status()
+            if max_bytes and response.content_length and response.content_length > max_bytes:
+                raise ValueError(f"Response from {url} is larger than {max_bytes} bytes")
+
+            body = bytearray()
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                body.extend(chunk)
+                if max_bytes and len(body) > max_bytes:
+                    raise ValueError(f"Response from {url} is larger than {max_bytes} bytes")
+
+            return response.content_type, bytes(body)
+
+    def get_stats(self):
+        """
+        Get payload and connection pool statistics per upstream host
+
+        Returns:
+            dict: Request count, total and average response bytes, JSON parse latency
+                and opened/reused pool connections per host
+        """
+        return {
+            host: {
+                "requests": stats["requests"],
+                "connections_opened": stats["connections_opened"],
+                "connections_reused": stats["connections_reused"],
+                "bytes": stats["bytes"],
+                "avg_bytes": stats["bytes"] // stats["requests"] if stats["requests"] else 0,
+                "parse": stats["parse"].summary()
+            }
+            for host, stats in self._stats.items()
+        }
+
+    async def close(self):
+        """Close every pooled session, waiting for connections to be released"""
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+
+        await asyncio.gather(*(session.close() for session in sessions), return_exceptions=True)
+        if sessions:
+            logger.info(f"Closed {len(sessions)} HTTP connection pool(s)")
+
+# Shared client used by the book services
+http_client = HTTPClient()
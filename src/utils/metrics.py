@@ -0,0 +1,55 @@
+from collections import deque
+
+class LatencyStats:
+    """Rolling window of latency samples with percentile summaries"""
+
+    def __init__(self, window=500):
+        """
+        Args:
+            window (int): Number of most recent samples kept for percentiles
+        """
+        self.count = 0
+        self.total = 0.0
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds):
+        """
+        Record one latency sample
+
+        Args:
+            seconds (float): Observed latency in seconds
+        """
+        self.count += 1
+        self.total += seconds
+        self._samples.append(seconds)
+
+    def percentile(self, pct):
+        """
+        Get a percentile over the recent window
+
+        Args:
+            pct (float): Percentile between 0 and 100
+
+        Returns:
+            float: Latency in seconds, 0.0 when no samples were recorded
+        """
+        if not self._samples:
+            return 0.0
+
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        """
+        Get a summary of the recorded latencies
+
+        Returns:
+            dict: Sample count plus average, p50 and p95 in milliseconds
+        """
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 1) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * 1000, 1),
+            "p95_ms": round(self.percentile(95) * 1000, 1)
+        }
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger('bookfinder.resilience')
+
+class UpstreamUnavailable(Exception):
+    """Raised when a call is skipped because its upstream is rate limited or its circuit is open"""
+
+class TokenBucket:
+    """Token-bucket rate limiter refilled continuously at a fixed rate"""
+
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate (float): Tokens added per second
+            capacity (int): Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.rejected = 0
+        self.spared = 0
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """
+        Take a token if one is available
+
+        Returns:
+            bool: True if a token was taken
+        """
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def try_acquire_spare(self, reserve):
+        """
+        Take a token only if at least reserve tokens stay available afterwards
+
+        For optional calls that must not eat into the burst kept for required ones.
+
+        Args:
+            reserve (int): Tokens to leave untouched
+
+        Returns:
+            bool: True if a token was taken
+        """
+        self._refill()
+        if self._tokens >= reserve + 1:
+            self._tokens -= 1
+            return True
+        self.spared += 1
+        return False
+
+    async def acquire(self, max_wait=0.0):
+        """
+        Take a token, waiting up to max_wait seconds for one to become available
+
+        Args:
+            max_wait (float): Longest time to wait for a token
+
+        Returns:
+            bool: True if a token was taken, False if the caller should not proceed
+        """
+        deadline = time.monotonic() + max_wait
+        while not self.try_acquire():
+            wait = (1 - self._tokens) / self.rate if self.rate > 0 else max_wait
+            if time.monotonic() + wait > deadline:
+                self.rejected += 1
+                return False
+            await asyncio.sleep(wait)
+        return True
+
+    def stats(self):
+        self._refill()
+        return {
+            "rate_per_second": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(self._tokens, 2),
+            "rejected": self.rejected,
+            "spared": self.spared
+        }
+
+class CircuitBreaker:
+    """Circuit breaker that stops calling an upstream after repeated failures"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        """
+        Args:
+            name (str): Upstream name used in logs
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before a trial call is allowed
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.short_circuited = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self):
+        """Current state, moving from open to half-open once the reset timeout has passed"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._transition(self.HALF_OPEN)
+        return self._state
+
+    def _transition(self, state):
+        if state != self._state:
+            logger.warning(f"Circuit for {self.name} changed from {self._state} to {state}")
+            self._state = state
+
+    def allow_request(self):
+        """
+        Check whether a call may go to the upstream
+
+        Half-open circuits let a single trial call through at a time.
+
+        Returns:
+            bool: True if the call should be made
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+
+        self.short_circuited += 1
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self._probe_in_flight = False
+        self._transition(self.CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._transition(self.OPEN)
+
+    def release(self):
+        """Forget an in-flight trial call that ended without a verdict"""
+        self._probe_in_flight = False
+
+    def stats(self):
+        state = self.state
+        return {
+            "state": state,
+            "consecutive_failures": self.failures,
+            "short_circuited": self.short_circuited,
+            "retry_in_seconds": round(max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at)), 1) if state == self.OPEN else 0.0
+        }
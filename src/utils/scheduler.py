@@ -0,0 +1,179 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from src.utils.metrics import LatencyStats
+
+logger = logging.getLogger('bookfinder.scheduler')
+
+# Priority classes, lower runs first
+INTERACTIVE = 0
+GENERATION = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", GENERATION: "generation", BACKGROUND: "background"}
+
+# Discord invalidates interaction tokens after 15 minutes
+INTERACTION_TOKEN_LIFETIME = 15 * 60
+
+# Monotonic deadline of the request being handled in the current task, if any
+current_deadline = contextvars.ContextVar('current_deadline', default=None)
+
+class SchedulerRejected(Exception):
+    """Raised when a call is refused a slot instead of being run"""
+
+class QueueFull(SchedulerRejected):
+    """Raised when too many calls of the same or higher priority are already waiting"""
+
+class DeadlineExceeded(SchedulerRejected):
+    """Raised when a call's deadline passed, or would pass, before it gets a slot"""
+
+def interaction_deadline(interaction, budget):
+    """
+    Get the monotonic deadline for work done on behalf of a Discord interaction
+
+    Args:
+        interaction (discord.Interaction): The interaction being answered
+        budget (float): Seconds after the interaction was created that a reply is still useful
+
+    Returns:
+        float: Deadline comparable with time.monotonic()
+    """
+    age = (datetime.now(timezone.utc) - interaction.created_at).total_seconds()
+    return time.monotonic() - max(0.0, age) + min(budget, INTERACTION_TOKEN_LIFETIME)
+
+class PriorityScheduler:
+    """Bounded-concurrency gate that admits waiting calls by priority, then arrival, and drops expired ones"""
+
+    def __init__(self, max_concurrency, queue_limits):
+        """
+        Args:
+            max_concurrency (int): Calls allowed to run at once
+            queue_limits (dict): Per priority, the most calls allowed to wait ahead of a new one
+        """
+        self.max_concurrency = max_concurrency
+        self.queue_limits = queue_limits
+        self._running = 0
+        self._queue = []
+        self._sequence = itertools.count()
+        self._service_time = LatencyStats()
+        self._wait_time = {priority: LatencyStats() for priority in PRIORITY_NAMES}
+        self._counters = {"admitted": 0, "queue_full": 0, "rejected_early": 0, "expired": 0}
+
+    def _waiting(self):
+        return [entry for entry in self._queue if not entry[2].done()]
+
+    @asynccontextmanager
+    async def slot(self, priority=BACKGROUND, deadline=None):
+        """
+        Hold a concurrency slot for the duration of the block
+
+        Args:
+            priority (int): INTERACTIVE, GENERATION or BACKGROUND
+            deadline (float): Monotonic time after which the call is useless,
+                defaults to the deadline bound to the current task
+
+        Yields:
+            float: Seconds left until the deadline, or None without one
+
+        Raises:
+            QueueFull: If the queue for this priority is at its limit
+            DeadlineExceeded: If the deadline passed or the expected wait exceeds it
+        """
+        if deadline is None:
+            deadline = current_deadline.get()
+
+        await self._acquire(priority, deadline)
+        started = time.monotonic()
+        try:
+            yield None if deadline is None else max(0.0, deadline - started)
+        finally:
+            self._service_time.record(time.monotonic() - started)
+            self._release()
+
+    async def _acquire(self, priority, deadline):
+        queued_at = time.monotonic()
+        if deadline is not None and queued_at >= deadline:
+            self._counters["expired"] += 1
+            raise DeadlineExceeded("deadline passed before the call was queued")
+
+        waiting = self._waiting()
+        if self._running < self.max_concurrency and not waiting:
+            self._admit(priority, queued_at)
+            return
+
+        ahead = sum(1 for entry in waiting if entry[0] <= priority)
+        if ahead >= self.queue_limits.get(priority, 0):
+            self._counters["queue_full"] += 1
+            raise QueueFull(f"{ahead} {PRIORITY_NAMES[priority]} calls already waiting")
+
+        # Refuse now rather than after waiting if the slot would come too late anyway
+        expected_wait = (ahead + 1) / self.max_concurrency * self._service_time.percentile(50)
+        if deadline is not None and queued_at + expected_wait >= deadline:
+            self._counters["rejected_early"] += 1
+            raise DeadlineExceeded(f"expected wait {expected_wait:.1f}s exceeds the deadline")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), future, deadline))
+
+        try:
+            timeout = None if deadline is None else deadline - time.monotonic()
+            await asyncio.wait({future}, timeout=timeout)
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+
+        if not future.done():
+            self._abandon(future)
+            self._counters["expired"] += 1
+            raise DeadlineExceeded("deadline passed while queued")
+
+        future.result()
+        self._wait_time[priority].record(time.monotonic() - queued_at)
+
+    def _admit(self, priority, queued_at):
+        self._running += 1
+        self._counters["admitted"] += 1
+        self._wait_time[priority].record(time.monotonic() - queued_at)
+
+    def _abandon(self, future):
+        """Withdraw a waiter, handing its slot on if it had just been granted one"""
+        if future.done() and not future.cancelled() and future.exception() is None:
+            self._release()
+        else:
+            future.cancel()
+
+    def _release(self):
+        self._running -= 1
+        now = time.monotonic()
+        while self._queue and self._running < self.max_concurrency:
+            priority, _, future, deadline = heapq.heappop(self._queue)
+            if future.done():
+                continue
+            if deadline is not None and now >= deadline:
+                self._counters["expired"] += 1
+                future.set_exception(DeadlineExceeded("deadline passed while queued"))
+                continue
+            self._running += 1
+            self._counters["admitted"] += 1
+            future.set_result(None)
+
+    def stats(self):
+        """
+        Get scheduler counters
+
+        Returns:
+            dict: Running and queued calls, admission and rejection counters, and
+                queue wait summaries per priority class
+        """
+        waiting = self._waiting()
+        return {
+            "running": self._running,
+            "queued": {name: sum(1 for entry in waiting if entry[0] == priority) for priority, name in PRIORITY_NAMES.items()},
+            **self._counters,
+            "service_time": self._service_time.summary(),
+            "queue_wait": {name: self._wait_time[priority].summary() for priority, name in PRIORITY_NAMES.items()}
+        }
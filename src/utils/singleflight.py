@@ -0,0 +1,110 @@
+import asyncio
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one shared in-flight task"""
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._inflight = {}
+        self._streams = {}
+
+    async def do(self, key, func, *args):
+        """
+        Run func(*args) unless an identical call is already in flight, then share its result
+
+        Args:
+            key: Hashable key identifying identical calls
+            func (callable): Coroutine function doing the actual work
+            *args: Arguments passed to func
+
+        Returns:
+            The result of the shared call
+        """
+        self.calls += 1
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(func(*args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.shared += 1
+
+        # Shield so one caller giving up does not cancel the work for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def stream(self, key, func, *args):
+        """
+        Iterate func(*args) unless an identical iteration is already in flight, then share its items
+
+        The iteration runs in its own task, so a caller giving up does not stop
+        it for the others. Callers that join late first get the items produced
+        so far, so every caller sees the whole sequence.
+
+        Args:
+            key: Hashable key identifying identical calls
+            func (callable): Async generator function doing the actual work
+            *args: Arguments passed to func
+
+        Yields:
+            The items of the shared iteration
+        """
+        self.calls += 1
+        flight = self._streams.get(key)
+
+        if flight is None:
+            flight = {"items": [], "done": False, "error": None, "changed": asyncio.Condition()}
+            self._streams[key] = flight
+            flight["task"] = asyncio.ensure_future(self._pump(key, flight, func(*args)))
+        else:
+            self.shared += 1
+
+        index = 0
+        while True:
+            async with flight["changed"]:
+                await flight["changed"].wait_for(lambda: index < len(flight["items"]) or flight["done"])
+            if index < len(flight["items"]):
+                index += 1
+                yield flight["items"][index - 1]
+            elif flight["error"] is not None:
+                raise flight["error"]
+            else:
+                return
+
+    async def _pump(self, key, flight, iterator):
+        """Collect the items of a shared iteration and wake the callers waiting for them"""
+        try:
+            async for item in iterator:
+                async with flight["changed"]:
+                    flight["items"].append(item)
+                    flight["changed"].notify_all()
+        except asyncio.CancelledError:
+            flight["error"] = RuntimeError("Shared stream was cancelled")
+            raise
+        except Exception as e:
+            flight["error"] = e
+        finally:
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            async with flight["changed"]:
+                flight["done"] = True
+                flight["changed"].notify_all()
+
+    def stats(self):
+        """
+        Get coalescing counters
+
+        Returns:
+            dict: Total calls, calls served by another in-flight call, their ratio and current in-flight count
+        """
+        return {
+            "calls": self.calls,
+            "coalesced": self.shared,
+            "coalescing_ratio": self.shared / self.calls if self.calls else 0.0,
+            "in_flight": len(self._inflight) + len(self._streams)
+        }
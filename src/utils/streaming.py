@@ -0,0 +1,95 @@
+import time
+from src import config
+
+# Discord rejects message content longer than this
+MESSAGE_LIMIT = 2000
+CURSOR = " ▌"
+# Sent instead of empty content, which Discord rejects on a message without embeds or files
+EMPTY_REPLY = "No response was generated."
+
+class StreamingReply:
+    """Interaction follow-up that is created on the first streamed text and edited as more arrives"""
+
+    def __init__(self, interaction, prefix="", interval=None):
+        """
+        Args:
+            interaction (discord.Interaction): Deferred interaction to reply to
+            prefix (str): Text shown above the streamed content
+            interval (float): Minimum seconds between edits, defaults to STREAM_EDIT_INTERVAL
+        """
+        self.interaction = interaction
+        self.prefix = prefix
+        self.interval = config.STREAM_EDIT_INTERVAL if interval is None else interval
+        self.text = ""
+        self.message = None
+        self._last_edit = 0.0
+
+    def _render(self, content, cursor=False):
+        if cursor:
+            content += CURSOR
+        if len(content) > MESSAGE_LIMIT:
+            content = content[:MESSAGE_LIMIT - 1] + "…"
+        return content
+
+    async def append(self, text):
+        """
+        Add streamed text, sending or editing the message when the throttle allows
+
+        Args:
+            text (str): Next piece of the response
+        """
+        self.text += text
+
+        if self.message is None:
+            # Show the first words immediately instead of waiting for the interval
+            if self.text.strip():
+                self.message = await self.interaction.followup.send(
+                    content=self._render(self.prefix + self.text, cursor=True),
+                    wait=True
+                )
+                self._last_edit = time.monotonic()
+        elif time.monotonic() - self._last_edit >= self.interval:
+            await self.message.edit(content=self._render(self.prefix + self.text, cursor=True))
+            self._last_edit = time.monotonic()
+
+    async def consume(self, chunks):
+        """
+        Render an async iterator of text pieces progressively
+
+        Args:
+            chunks (AsyncIterator[str]): Streamed response pieces
+
+        Returns:
+            str: The complete streamed text, without the prefix
+        """
+        async for text in chunks:
+            await self.append(text)
+        return self.text
+
+    async def finish(self, content=None, **kwargs):
+        """
+        Write the final message, sending it if nothing was streamed yet
+
+        Args:
+            content (str): Final content, defaults to the prefix plus the streamed text;
+                empty content is dropped when there are embeds or files, else replaced by EMPTY_REPLY
+            **kwargs: Extra message fields such as embeds or files
+
+        Returns:
+            discord.WebhookMessage: The reply message
+        """
+        content = self._render(self.prefix + self.text if content is None else content)
+        if not content.strip():
+            has_attachments = any(kwargs.get(key) for key in ("embed", "embeds", "file", "files"))
+            content = None if has_attachments else EMPTY_REPLY
+
+        if self.message is None:
+            self.message = await self.interaction.followup.send(content=content, wait=True, **kwargs)
+        else:
+            # Edits take attachments rather than files
+            files = kwargs.pop("files", None)
+            if files:
+                kwargs["attachments"] = files
+            self.message = await self.message.edit(content=content, **kwargs)
+
+        return self.message
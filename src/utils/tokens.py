@@ -0,0 +1,158 @@
+import logging
+import math
+import re
+import threading
+
+try:
+    import tiktoken
+except ImportError:  # Counting falls back to a character estimate
+    tiktoken = None
+
+logger = logging.getLogger('bookfinder.tokens')
+
+# Roughly four characters per token for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+# Chat formatting overhead per message and per reply, as documented for OpenAI chat models
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+# Filled by load_encodings; counting never loads an encoding itself
+_encodings = {}
+
+def load_encodings(models):
+    """
+    Load the tiktoken encodings of several models (blocking)
+
+    Encodings are downloaded on first use without a timeout, so this belongs
+    in a background thread; counting estimates until it has finished.
+
+    Args:
+        models (list): Model names
+    """
+    for model in models:
+        if model in _encodings or tiktoken is None:
+            continue
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # The download fails offline
+            logger.warning(f"Could not load tokenizer for {model}, estimating token counts: {e}")
+            encoding = None
+        _encodings[model] = encoding
+
+def load_encodings_in_background(models):
+    """
+    Start loading encodings on a daemon thread, so a stalled download never blocks startup or shutdown
+
+    Args:
+        models (list): Model names
+    """
+    threading.Thread(target=load_encodings, args=(list(models),), name="tokenizer-loader", daemon=True).start()
+
+def _encoding_for(model):
+    """Return the tiktoken encoding for a model, or None until load_encodings has loaded it"""
+    return _encodings.get(model)
+
+def count_tokens(text, model="gpt-3.5-turbo"):
+    """
+    Count the tokens of a text
+
+    Args:
+        text (str): Text to count
+        model (str): Model whose tokenizer is used
+
+    Returns:
+        int: Exact count with tiktoken, otherwise an estimate that errs high
+    """
+    if not text:
+        return 0
+    encoding = _encoding_for(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def count_message_tokens(messages, model="gpt-3.5-turbo"):
+    """
+    Count the prompt tokens of a chat completion request
+
+    Args:
+        messages (list): Chat messages with role and content
+        model (str): Model whose tokenizer is used
+
+    Returns:
+        int: Prompt tokens including chat formatting overhead
+    """
+    total = TOKENS_PER_REPLY
+    for message in messages:
+        total += TOKENS_PER_MESSAGE + count_tokens(message.get("content") or "", model)
+    return total
+
+def truncate_to_tokens(text, max_tokens, model="gpt-3.5-turbo"):
+    """
+    Shorten a text to a token budget, preferring to cut at a sentence or word end
+
+    Args:
+        text (str): Text to shorten
+        max_tokens (int): Token budget for the result
+        model (str): Model whose tokenizer is used
+
+    Returns:
+        str: The text itself if it fits, otherwise a shortened text ending in "…"
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    if max_tokens <= 1:
+        return ""
+
+    # Leave one token for the ellipsis
+    encoding = _encoding_for(model)
+    if encoding is not None:
+        cut = encoding.decode(encoding.encode(text)[:max_tokens - 1])
+    else:
+        cut = text[:(max_tokens - 1) * CHARS_PER_TOKEN]
+
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if sentence_end >= len(cut) // 2:
+        return cut[:sentence_end + 1] + " …"
+    word_end = cut.rfind(" ")
+    if word_end >= len(cut) // 2:
+        cut = cut[:word_end]
+    return cut.rstrip(" ,;:") + "…"
+
+def fit_texts(texts, budget, model="gpt-3.5-turbo", min_tokens=20):
+    """
+    Shorten several texts so together they fit a token budget
+
+    Short texts keep their full length and hand their unused share to longer ones.
+
+    Args:
+        texts (list): Texts sharing the budget
+        budget (int): Total tokens available for all texts
+        model (str): Model whose tokenizer is used
+        min_tokens (int): Smallest share any text is cut down to
+
+    Returns:
+        list: The texts, shortened where needed
+    """
+    counts = [count_tokens(text, model) for text in texts]
+    if sum(counts) <= budget:
+        return list(texts)
+
+    shares = [0] * len(texts)
+    remaining = max(budget, min_tokens * len(texts))
+    pending = sorted(range(len(texts)), key=lambda i: counts[i])
+    while pending:
+        share = remaining // len(pending)
+        index = pending.pop(0)
+        shares[index] = max(min_tokens, min(counts[index], share))
+        remaining -= shares[index]
+
+    return [truncate_to_tokens(text, share, model) for text, share in zip(texts, shares)]
+
+def strip_markup(text):
+    """Remove HTML tags and collapse whitespace, as found in Google Books descriptions"""
+    return " ".join(re.sub(r"<[^>]+>", " ", text or "").split())
@@ -0,0 +1,254 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import numpy as np
+
+logger = logging.getLogger('bookfinder.vectors')
+
+class VectorStore:
+    """In-memory NumPy store of unit vectors with cosine top-k search and an optional IVF approximate index"""
+
+    def __init__(self, model, dim, approximate=False, lists=64, probes=8):
+        """
+        Args:
+            model (str): Name of the embedding model; vectors from another model are never mixed in
+            dim (int): Vector dimensions
+            approximate (bool): Search an inverted-file index instead of every vector once
+                there are enough vectors to train it
+            lists (int): Clusters in the approximate index
+            probes (int): Clusters searched per query in the approximate index
+        """
+        self.model = model
+        self.dim = dim
+        self.approximate = approximate
+        self.lists = lists
+        self.probes = probes
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._namespaces = np.zeros(0, dtype=np.int32)
+        self._keys = []
+        self._payloads = []
+        self._rows = {}
+        self._namespace_codes = {}
+        # Codes only go up, so a removed namespace's code is never given to another namespace
+        self._next_code = itertools.count()
+        self._size = 0
+        self._centroids = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._trained_size = 0
+        self.unsaved = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def add(self, items):
+        """
+        Add vectors, skipping keys that are already stored
+
+        Args:
+            items (list): (key, namespace, vector, payload) tuples; vectors are normalized here
+        """
+        with self._lock:
+            items = [item for item in dict((item[0], item) for item in items).values() if item[0] not in self._rows]
+            if not items:
+                return
+
+            vectors = np.asarray([item[2] for item in items], dtype=np.float32).reshape(len(items), self.dim)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms > 0, norms, 1.0)
+
+            self._reserve(self._size + len(items))
+            start = self._size
+            self._vectors[start:start + len(items)] = vectors
+            for offset, (key, namespace, _, payload) in enumerate(items):
+                code = self._namespace_codes.get(namespace)
+                if code is None:
+                    code = self._namespace_codes[namespace] = next(self._next_code)
+                self._namespaces[start + offset] = code
+                self._rows[key] = start + offset
+                self._keys.append(key)
+                self._payloads.append(payload)
+            self._size += len(items)
+            self.unsaved += len(items)
+
+            if self._centroids is not None:
+                self._assignments[start:self._size] = self._nearest_centroids(vectors)
+            if self.approximate and self._size >= max(self.lists * 40, 2 * self._trained_size):
+                self._train()
+
+    def _reserve(self, size):
+        """Grow the arrays geometrically so adds are amortized O(1)"""
+        capacity = len(self._vectors)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 256)
+        for name in ("_vectors", "_namespaces", "_assignments"):
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            setattr(self, name, grown)
+
+    def _train(self, iterations=10):
+        """Cluster the vectors with spherical k-means and assign every vector to a cluster"""
+        vectors = self._vectors[:self._size]
+        rng = np.random.default_rng(0)
+        sample = vectors[rng.choice(self._size, size=min(self._size, self.lists * 256), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=self.lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(self.lists):
+                members = sample[labels == cluster]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[cluster] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+        self._centroids = centroids
+        self._assignments[:self._size] = self._nearest_centroids(vectors)
+        self._trained_size = self._size
+        logger.info(f"Trained approximate vector index with {self.lists} lists on {self._size} vectors")
+
+    def _nearest_centroids(self, vectors):
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def search(self, vector, k=5, namespace=None, min_score=None):
+        """
+        Find the stored vectors most similar to a query vector
+
+        Args:
+            vector (array-like): Query vector
+            k (int): Maximum number of results
+            namespace (str): Only search vectors added under this namespace
+            min_score (float): Drop results with a lower cosine similarity
+
+        Returns:
+            list: (score, key, payload) tuples, most similar first
+        """
+        query = np.asarray(vector, dtype=np.float32).reshape(self.dim)
+        norm = np.linalg.norm(query)
+        if not norm:
+            return []
+        query = query / norm
+
+        with self._lock:
+            if namespace is not None and namespace not in self._namespace_codes:
+                return []
+
+            candidates = None
+            if namespace is not None:
+                candidates = self._namespaces[:self._size] == self._namespace_codes[namespace]
+            if self._centroids is not None:
+                probed = np.argsort(self._centroids @ query)[-self.probes:]
+                in_probed = np.isin(self._assignments[:self._size], probed)
+                candidates = in_probed if candidates is None else candidates & in_probed
+
+            rows = np.arange(self._size) if candidates is None else np.flatnonzero(candidates)
+            if not len(rows):
+                return []
+
+            scores = self._vectors[rows] @ query
+            if len(rows) > k:
+                top = np.argpartition(scores, -k)[-k:]
+            else:
+                top = np.arange(len(rows))
+            top = top[np.argsort(scores[top])[::-1]]
+
+            return [
+                (float(scores[i]), self._keys[rows[i]], self._payloads[rows[i]])
+                for i in top
+                if min_score is None or scores[i] >= min_score
+            ]
+
+    def remove_namespace(self, namespace):
+        """
+        Remove every vector added under a namespace
+
+        Args:
+            namespace (str): Namespace to remove
+
+        Returns:
+            int: Number of vectors removed
+        """
+        with self._lock:
+            code = self._namespace_codes.pop(namespace, None)
+            if code is None:
+                return 0
+
+            keep = self._namespaces[:self._size] != code
+            removed = self._size - int(keep.sum())
+            self._vectors = self._vectors[:self._size][keep]
+            self._namespaces = self._namespaces[:self._size][keep]
+            self._assignments = self._assignments[:self._size][keep]
+            self._keys = [key for key, kept in zip(self._keys, keep) if kept]
+            self._payloads = [payload for payload, kept in zip(self._payloads, keep) if kept]
+            self._rows = {key: row for row, key in enumerate(self._keys)}
+            self._size = len(self._keys)
+            self.unsaved += removed
+            return removed
+
+    def save(self, path):
+        """
+        Write the vectors and payloads to an .npz file, replacing it atomically
+
+        Args:
+            path (str): Target file
+        """
+        with self._lock:
+            codes = {code: namespace for namespace, code in self._namespace_codes.items()}
+            meta = {
+                "model": self.model,
+                "keys": self._keys,
+                "payloads": self._payloads,
+                "namespaces": [codes[code] for code in self._namespaces[:self._size]]
+            }
+            temp_path = path + ".tmp"
+            with open(temp_path, "wb") as f:
+                np.savez(
+                    f,
+                    vectors=self._vectors[:self._size],
+                    meta=np.frombuffer(json.dumps(meta, ensure_ascii=False).encode('utf-8'), dtype=np.uint8)
+                )
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+            self.unsaved = 0
+
+    def load(self, path):
+        """
+        Replace the contents with vectors saved by save()
+
+        Args:
+            path (str): File written by save()
+
+        Returns:
+            bool: False if the file is missing or holds vectors of another model
+        """
+        if not os.path.exists(path):
+            return False
+
+        with np.load(path, allow_pickle=False) as data:
+            vectors = data["vectors"]
+            meta = json.loads(data["meta"].tobytes().decode('utf-8'))
+
+        if meta["model"] != self.model or vectors.shape[1:] != (self.dim,):
+            logger.info(f"Ignoring vectors in {path} from embedding model {meta['model']}")
+            return False
+
+        with self._lock:
+            self._size = 0
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self._namespaces = np.zeros(0, dtype=np.int32)
+            self._assignments = np.zeros(0, dtype=np.int32)
+            self._keys, self._payloads, self._rows, self._namespace_codes = [], [], {}, {}
+            self._next_code = itertools.count()
+            self._centroids = None
+            self._trained_size = 0
+
+        self.add(list(zip(meta["keys"], meta["namespaces"], vectors, meta["payloads"])))
+        self.unsaved = 0
+        return True